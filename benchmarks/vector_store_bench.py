@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the DreamOS vector store.
+Generates synthetic corpora with metadata and measures add (single and
+bulk), search at several k, filtered and keyword search, delete, save,
+load and resident memory. Runs offline: no LLM or API key is needed.
+
+Usage:
+    python benchmarks/vector_store_bench.py --sizes 1000 10000 100000
+    python benchmarks/vector_store_bench.py --sizes 1000000 --queries 100 --output big.json
+    python benchmarks/vector_store_bench.py --compare old.json new.json
+"""
+import os
+import sys
+import gc
+import json
+import time
+import types
+import shutil
+import argparse
+import platform
+import datetime
+import tempfile
+import subprocess
+from typing import List, Dict, Any
+
+import numpy as np
+import psutil
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+# The dreamos package __init__ imports the agents, which need a Groq API key.
+# The memory subsystem doesn't, so register the package without running it.
+if "dreamos" not in sys.modules:
+    _package = types.ModuleType("dreamos")
+    _package.__path__ = [os.path.join(ROOT, "dreamos")]
+    sys.modules["dreamos"] = _package
+
+import faiss  # noqa: E402
+from dreamos.memory.vector_store import VectorStore  # noqa: E402
+
+MEMORY_TYPES = ["command", "response", "fact", "interaction"]
+TOOLS = ["calculator", "web_browser", "code_runner", "calendar", "file_agent"]
+WORDS = (
+    "note file memory agent search index vector plugin tool task reminder goal status help "
+    "project meeting report budget schedule deploy server config error warning result query "
+    "python script data chart table user system response command fact summary draft idea"
+).split()
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples given in seconds.
+
+    Args:
+        samples: Latencies in seconds
+
+    Returns:
+        Mean, p50, p95 and p99 in milliseconds
+    """
+    ms = np.asarray(samples) * 1000
+    return {
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99))
+    }
+
+
+class SyntheticCorpus:
+    """
+    Deterministic synthetic memories: clustered vectors, short texts and
+    metadata with types, tools and timestamps spread over 30 days.
+    """
+
+    def __init__(self, dim: int, seed: int = 0, num_clusters: int = 256):
+        """
+        Initialize the corpus generator.
+
+        Args:
+            dim: Vector dimension
+            seed: Random seed
+            num_clusters: Number of cluster centers the vectors are drawn around
+        """
+        self.dim = dim
+        self.rng = np.random.default_rng(seed)
+        self.centers = self.rng.standard_normal((num_clusters, dim)).astype(np.float32)
+        self.start = datetime.datetime(2024, 1, 1)
+
+    def vectors(self, n: int) -> np.ndarray:
+        """Draw n vectors around random cluster centers."""
+        centers = self.centers[self.rng.integers(len(self.centers), size=n)]
+        return centers + 0.5 * self.rng.standard_normal((n, self.dim), dtype=np.float32)
+
+    def batch(self, first: int, n: int):
+        """
+        Generate a batch of memories.
+
+        Args:
+            first: Sequence number of the first memory, used in the texts
+            n: Number of memories
+
+        Returns:
+            Tuple of (texts, vectors, metadatas)
+        """
+        words = self.rng.integers(len(WORDS), size=(n, 8))
+        types = self.rng.integers(len(MEMORY_TYPES), size=n)
+        tools = self.rng.random((n, len(TOOLS))) < 0.2
+        seconds = self.rng.integers(30 * 86400, size=n)
+
+        texts = [
+            f"memory {first + i} " + " ".join(WORDS[w] for w in words[i])
+            for i in range(n)
+        ]
+        metadatas = [
+            {
+                "type": MEMORY_TYPES[types[i]],
+                "timestamp": (self.start + datetime.timedelta(seconds=int(seconds[i]))).isoformat(),
+                "tools_used": [tool for tool, used in zip(TOOLS, tools[i]) if used]
+            }
+            for i in range(n)
+        ]
+        return texts, self.vectors(n), metadatas
+
+
+def dir_size(path: str) -> int:
+    """Total size in bytes of the files in a directory."""
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+               if os.path.isfile(os.path.join(path, name)))
+
+
+def bench_size(size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run all measurements for one corpus size.
+
+    Args:
+        size: Number of memories in the corpus
+        args: Command-line arguments
+
+    Returns:
+        Result dictionary for this size
+    """
+    print(f"== {size:,} memories", flush=True)
+    corpus = SyntheticCorpus(args.dim, seed=args.seed)
+    path = tempfile.mkdtemp(prefix=f"dreamos-bench-{size}-", dir=args.workdir)
+    result = {"size": size}
+
+    gc.collect()
+    rss_start = rss_mb()
+    store = VectorStore(
+        path, index_type=args.index_type, ann_threshold=args.ann_threshold, codec=args.codec
+    )
+
+    # Bulk add, in batches so the corpus never has to fit in memory twice
+    elapsed = 0.0
+    for first in range(0, size, args.batch_size):
+        texts, vectors, metadatas = corpus.batch(first, min(args.batch_size, size - first))
+        start = time.perf_counter()
+        store.add_memories(texts, vectors, metadatas)
+        elapsed += time.perf_counter() - start
+    result["bulk_add"] = {"seconds": elapsed, "per_second": size / elapsed, "batch_size": args.batch_size}
+
+    # Wait for an index migration the bulk add may have started
+    start = time.perf_counter()
+    store.wait_for_maintenance()
+    result["maintenance_wait_s"] = time.perf_counter() - start
+    result["index"] = {key: value for key, value in store.get_index_stats().items() if key != "report"}
+    result["rss_after_add_mb"] = rss_mb() - rss_start
+
+    # Single adds, each one logged to the write-ahead log
+    texts, vectors, metadatas = corpus.batch(size, args.singles)
+    samples = []
+    for text, vector, metadata in zip(texts, vectors, metadatas):
+        start = time.perf_counter()
+        store.add_memory(text, vector, metadata)
+        samples.append(time.perf_counter() - start)
+    result["single_add"] = percentiles(samples)
+    store.wait_for_maintenance()
+
+    # Searches at several k, one query at a time and as one batch
+    queries = corpus.vectors(args.queries)
+    result["search"] = {}
+    for k in args.k:
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            store.search_batch(query[None], k)
+            samples.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        store.search_batch(queries, k)
+        batch_elapsed = time.perf_counter() - start
+        result["search"][str(k)] = dict(percentiles(samples), batch_qps=len(queries) / batch_elapsed)
+
+    # Filtered vector search and keyword search at k=10
+    samples = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        store.search_batch(query[None], 10, memory_type=MEMORY_TYPES[i % len(MEMORY_TYPES)])
+        samples.append(time.perf_counter() - start)
+    result["filtered_search"] = percentiles(samples)
+
+    samples = []
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        store.search_text(f"{WORDS[i % len(WORDS)]} {WORDS[(i * 7) % len(WORDS)]}", 10)
+        samples.append(time.perf_counter() - start)
+    result["keyword_search"] = percentiles(samples)
+
+    # Deletes of random memories, one call each
+    rng = np.random.default_rng(args.seed + 1)
+    delete_ids = rng.choice(size, size=min(args.deletes, size), replace=False)
+    samples = []
+    for memory_id in delete_ids:
+        start = time.perf_counter()
+        store.delete_memory(int(memory_id))
+        samples.append(time.perf_counter() - start)
+    result["delete"] = percentiles(samples)
+    store.wait_for_maintenance()
+
+    # Save: fold the log into the index file
+    start = time.perf_counter()
+    store.checkpoint()
+    result["save"] = {"seconds": time.perf_counter() - start, "disk_bytes": dir_size(path)}
+
+    store.close()
+    del store
+    gc.collect()
+
+    # Load the saved store from disk, configured like the one that wrote it
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    store = VectorStore(
+        path, index_type=args.index_type, ann_threshold=args.ann_threshold, codec=args.codec
+    )
+    result["load"] = {"seconds": time.perf_counter() - start, "rss_mb": rss_mb() - rss_before,
+                      "mmap": store.get_index_stats()["mmap"]}
+
+    # Don't time the first search against a migration started by the load
+    start = time.perf_counter()
+    store.wait_for_maintenance()
+    result["load"]["maintenance_wait_s"] = time.perf_counter() - start
+    start = time.perf_counter()
+    store.search_batch(queries[:1], 10)
+    result["load"]["first_search_ms"] = (time.perf_counter() - start) * 1000
+    result["load"]["rss_after_first_search_mb"] = rss_mb() - rss_before
+    store.close()
+
+    if not args.keep:
+        shutil.rmtree(path, ignore_errors=True)
+
+    print(json.dumps(result, indent=2), flush=True)
+    return result
+
+
+def run_metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    """Describe the environment, so results from different runs can be told apart."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "faiss": faiss.__version__,
+        "numpy": np.__version__,
+        "args": {key: value for key, value in vars(args).items() if key not in ("compare", "output")}
+    }
+
+
+def flatten(result: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten the numeric values of a nested result into dotted keys."""
+    flat = {}
+    for key, value in result.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """
+    Print the change of every metric between two result files.
+
+    Args:
+        old_path: Baseline result file
+        new_path: Result file to compare with the baseline
+    """
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    old_results = {result["size"]: flatten(result) for result in old["results"]}
+    for result in new["results"]:
+        if result["size"] not in old_results:
+            continue
+        print(f"\n== {result['size']:,} memories")
+        before = old_results[result["size"]]
+        for key, value in flatten(result).items():
+            if key in before and before[key]:
+                print(f"{key:40s} {before[key]:14.4f} {value:14.4f} {value / before[key] - 1:+8.1%}")
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the DreamOS vector store on synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Corpus sizes to benchmark (up to 1000000)")
+    parser.add_argument("--dim", type=int, default=768, help="Vector dimension")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 10, 100], help="Numbers of results to search for")
+    parser.add_argument("--queries", type=int, default=200, help="Number of search queries per k")
+    parser.add_argument("--singles", type=int, default=200, help="Number of single adds")
+    parser.add_argument("--deletes", type=int, default=200, help="Number of deletes")
+    parser.add_argument("--batch-size", type=int, default=10000,
+                        help="Memories per bulk add call (a batch holds batch-size * dim * 4 bytes of vectors)")
+    parser.add_argument("--index-type", help="Index type for the stores (default: VECTOR_INDEX_TYPE)")
+    parser.add_argument("--ann-threshold", type=int, help="Size that triggers ANN migration (default: VECTOR_ANN_THRESHOLD)")
+    parser.add_argument("--codec", help="Vector storage codec (default: VECTOR_CODEC)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic corpus")
+    parser.add_argument("--workdir", help="Directory for the temporary stores (default: system temp)")
+    parser.add_argument("--keep", action="store_true", help="Keep the stores after the run")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/vector_store-<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    meta = run_metadata(args)
+    results = [bench_size(size, args) for size in args.sizes]
+
+    output = args.output
+    if output is None:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(ROOT, "benchmarks", "results", f"vector_store-{meta['commit'] or 'unknown'}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
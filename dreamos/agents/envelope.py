@@ -0,0 +1,109 @@
+"""
+Structured single-call responses for DreamOS - one LLM call picks the agent and answers
+"""
+import re
+import json
+from typing import Dict, List, Any, Optional
+
+from .router import AGENT_NAMES
+
+# Prompt asking for the routing decision, tool call and answer in one JSON object
+ENVELOPE_PROMPT = """
+        You are the Terminal Agent in DreamOS, a multi-agent AI operating system. Handle this command in one step.
+        
+        Agents:
+        - file_agent: files, notes, reading, writing, or searching file content
+        - memory_agent: remembering facts, storing information, or retrieving past context
+        - plugin_agent: tools such as calculator, web search, or code execution
+        - terminal_agent: system-level commands, help, general conversation, anything else
+        
+        Available tools (plugin_agent only):
+        {tools}
+        
+        Respond with a single JSON object and nothing else:
+        {{"agent": "<agent name>", "tool": "<tool name or null>", "arguments": "<tool input or null>", "answer": "<reply to the user or null>"}}
+        
+        Set "tool" and "arguments" only if a tool must run to answer; the tool's result is then shown to the user
+        and "answer" may be null. Otherwise "tool" and "arguments" are null and "answer" is your complete reply.
+        NEVER say "as an AI model." You are part of DreamOS.
+        """
+
+# Keys of a tool-argument object that hold the tool input, in order of preference
+_INPUT_KEYS = ("input", "expression", "query", "url", "code", "text")
+
+
+def render_envelope_prompt(tool_descriptions: Dict[str, str]) -> str:
+    """
+    Fill the envelope prompt with the available tools.
+    
+    Args:
+        tool_descriptions: Tool descriptions by tool name
+    
+    Returns:
+        System prompt for the single-call mode
+    """
+    tools = "\n        ".join(f"- {name}: {description}" for name, description in tool_descriptions.items())
+    return ENVELOPE_PROMPT.format(tools=tools or "- none")
+
+
+def parse_envelope(response: str, available_tools: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse and validate an envelope returned by the LLM.
+    
+    Args:
+        response: Raw LLM response
+        available_tools: Names of the tools the plugin agent can run
+    
+    Returns:
+        Dictionary with agent, tool, tool_input and answer, or None if the
+        response isn't a valid envelope
+    """
+    # Tolerate code fences or text around the object
+    match = re.search(r"\{.*\}", response, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    
+    agent_name = str(data.get("agent") or "").strip().lower()
+    if agent_name not in AGENT_NAMES:
+        return None
+    
+    tool_name = data.get("tool")
+    tool_input = data.get("arguments")
+    answer = data.get("answer")
+    
+    if isinstance(tool_name, str) and tool_name.strip() and tool_name.strip().lower() not in ("null", "none"):
+        tool_name = tool_name.strip().lower()
+        if agent_name != "plugin_agent" or tool_name not in available_tools:
+            return None
+        
+        if isinstance(tool_input, dict):
+            tool_input = next((tool_input[key] for key in _INPUT_KEYS if key in tool_input), None)
+        if tool_input is None or isinstance(tool_input, (dict, list)):
+            return None
+        tool_input = str(tool_input).strip()
+        if not tool_input:
+            return None
+    else:
+        tool_name = None
+        tool_input = None
+    
+    if answer is not None and not isinstance(answer, str):
+        return None
+    answer = answer.strip() if answer else None
+    
+    # Without a tool to run, the answer is the whole response
+    if tool_name is None and not answer:
+        return None
+    
+    return {
+        "agent": agent_name,
+        "tool": tool_name,
+        "tool_input": tool_input,
+        "answer": answer
+    }
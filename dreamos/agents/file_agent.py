@@ -7,8 +7,9 @@ from pathlib import Path
 from typing import Dict, List, Optional, Union, Any
 import datetime
 
-from ..config import PSEUDO_FILES_PATH, SYSTEM_PROMPTS, DEBUG_MODE
-from ..utils.llm_utils import generate_agent_response
+from ..config import PSEUDO_FILES_PATH, SYSTEM_PROMPTS, DEBUG_MODE, CONTEXT_TOKEN_BUDGETS
+from ..utils.llm_utils import generate_agent_response, generate_agent_response_async
+from ..utils.context_builder import truncate_tokens
 from ..utils.logging_utils import get_logger
 
 # Initialize logger
@@ -323,23 +324,56 @@ class FileAgent:
         """
         logger.info(f"Processing command: {command}")
         
-        # Prepare file system context
-        file_list = "\n".join(self.list_files())
-        fs_context = f"Current files in system:\n{file_list}"
-        
-        # Combine contexts
-        full_context = fs_context
-        if context:
-            full_context = f"{full_context}\n\nAdditional context:\n{context}"
-            logger.debug("Added additional context to command")
-        
         # Generate response using LLM
         logger.debug("Sending command to LLM")
         response = generate_agent_response(
             system_prompt=self.system_prompt,
             user_input=command,
-            context=full_context
+            context=self._build_context(context)
         )
         
         logger.info(f"Command processed, response length: {len(response)} chars")
-        return response 
\ No newline at end of file
+        return response
+    
+    async def process_command_async(self, command: str, context: Optional[str] = None) -> str:
+        """
+        Process a file-related command without blocking the event loop.
+        
+        Args:
+            command: The file operation command
+            context: Additional context for the command
+            
+        Returns:
+            Response from the File Agent
+        """
+        logger.info(f"Processing command asynchronously: {command}")
+        
+        response = await generate_agent_response_async(
+            system_prompt=self.system_prompt,
+            user_input=command,
+            context=self._build_context(context)
+        )
+        
+        logger.info(f"Command processed, response length: {len(response)} chars")
+        return response
+    
+    def _build_context(self, context: Optional[str] = None) -> str:
+        """
+        Combine the file listing with the caller's context.
+        
+        Args:
+            context: Additional context for the command
+            
+        Returns:
+            Context for the LLM call
+        """
+        # Prepare file system context, capped so large file systems don't crowd out the prompt
+        file_list = truncate_tokens("\n".join(self.list_files()), CONTEXT_TOKEN_BUDGETS["file_list"])
+        fs_context = f"Current files in system:\n{file_list}"
+        
+        # Combine contexts
+        full_context = fs_context
+        if context:
+            full_context = f"{full_context}\n\nAdditional context:\n{context}"
+            logger.debug("Added additional context to command")
+        return full_context 
\ No newline at end of file
@@ -3,13 +3,22 @@ Memory Agent for DreamOS - Manages the system's knowledge and context
 """
 import os
 import json
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Union, Iterator, ContextManager
 import numpy as np
 import datetime
+from concurrent.futures import Future
 
-from ..config import SYSTEM_PROMPTS, DEFAULT_MEMORY_K, DEBUG_MODE
+from ..config import (
+    SYSTEM_PROMPTS, DEFAULT_MEMORY_K, DEBUG_MODE, MEMORY_DEDUP, MEMORY_SEARCH_MODE,
+    EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_DISK_MB
+)
 from ..memory.vector_store import VectorStore
-from ..utils.llm_utils import generate_agent_response
+from ..memory.store_manager import get_store_manager, DEFAULT_NAMESPACE
+from ..memory.embeddings import Embedder, get_embedder
+from ..memory.embedding_cache import CachedEmbedder
+from ..utils.llm_utils import generate_agent_response, generate_agent_response_async
+from ..utils.context_builder import ContextBuilder
 from ..utils.logging_utils import get_logger
 
 # Initialize logger
@@ -21,27 +30,63 @@ class MemoryAgent:
     Stores and retrieves memories using a vector database.
     """
     
-    def __init__(self):
-        """Initialize the Memory Agent."""
-        logger.info("Initializing Memory Agent")
+    def __init__(self, namespace: Optional[str] = None, embedder: Optional[Embedder] = None):
+        """
+        Initialize the Memory Agent.
+        
+        Args:
+            namespace: Memory namespace to use (defaults to the shared namespace)
+            embedder: Embedding backend (defaults to the EMBEDDING_BACKEND backend)
+        """
+        self.namespace = namespace or DEFAULT_NAMESPACE
+        logger.info(f"Initializing Memory Agent for namespace {self.namespace}")
         
-        # Initialize vector store
+        # The store manager owns the vector store, see lease_store
         logger.debug("Initializing vector store")
-        self.vector_store = VectorStore()
+        self.store_manager = get_store_manager()
         self.system_prompt = SYSTEM_PROMPTS["memory_agent"]
         
-        # For demonstration, we'll use random vectors as embeddings
-        # In a production system, we would use a proper embedding model
-        self._embedding_dim = 768
+        # Embeddings must match the dimension of the vector store
+        with self.lease_store() as store:
+            self._embedding_dim = store.embedding_dim
+        self.embedder = embedder or get_embedder(dim=self._embedding_dim)
+        if self.embedder.dim != self._embedding_dim:
+            raise ValueError(
+                f"Embedder dimension {self.embedder.dim} doesn't match the vector store ({self._embedding_dim})"
+            )
+        logger.debug(f"Using embedder {self.embedder.name}")
+        
+        # Vectors from another embedder (or the old per-process random ones) can't be searched
+        with self.lease_store() as store:
+            reembedded = store.ensure_embedder(self.embedder.name, self.embedder.embed)
+        if reembedded:
+            logger.warning(f"Re-embedded {reembedded} memories with {self.embedder.name}")
+        
+        # Repeated commands and queries are answered from the embedding cache
+        if EMBEDDING_CACHE_SIZE > 0 or EMBEDDING_CACHE_DISK_MB > 0:
+            self.embedder = CachedEmbedder(self.embedder)
+        
+        # Token-budgeted prompt context, shared with the Terminal Agent
+        self.context_builder = ContextBuilder(self)
         
         # Log memory stats
-        memory_count = self.vector_store.count_memories()
+        memory_count = self.count_memories()
         logger.info(f"Memory Agent initialized with {memory_count} memories")
     
+    def lease_store(self) -> ContextManager[VectorStore]:
+        """
+        Use the vector store of the agent's namespace.
+        Idle namespaces are closed by the store manager, so the store is looked
+        up on each use and only kept open for the duration of the with block.
+        
+        Returns:
+            Context manager yielding the vector store
+        """
+        return self.store_manager.lease(self.namespace)
+    
     def _get_embedding(self, text: str) -> np.ndarray:
         """
         Get an embedding vector for the text.
-        This is a placeholder - in production, use a real embedding model.
         
         Args:
             text: Text to embed
@@ -51,24 +96,39 @@ class MemoryAgent:
         """
         logger.debug(f"Generating embedding for text: {text[:50]}{'...' if len(text) > 50 else ''}")
         
-        # This is a placeholder - normally you'd use a real embedding model
-        # For demonstration, we'll use a deterministic random vector based on the text
-        np.random.seed(hash(text) % 2**32)
-        embedding = np.random.randn(self._embedding_dim).astype(np.float32)
+        embedding = self.embedder.embed_one(text)
         
         logger.debug(f"Embedding generated with shape: {embedding.shape}")
         return embedding
     
-    def add_memory(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> int:
+    def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Get embedding vectors for a batch of texts.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            Matrix of embeddings with one row per text
+        """
+        return self.embedder.embed(texts)
+    
+    def add_memory(self, 
+                   text: str, 
+                   metadata: Optional[Dict[str, Any]] = None,
+                   dedup: Optional[bool] = None) -> int:
         """
         Add a memory to the store.
+        A memory that repeats an existing one of the same type is merged into
+        it, bumping its seen_count and last_seen, instead of being added.
         
         Args:
             text: Text content of the memory
             metadata: Additional metadata for the memory
+            dedup: Whether to merge duplicates (defaults to MEMORY_DEDUP)
             
         Returns:
-            ID of the added memory
+            ID of the added memory, or of the existing memory it was merged into
         """
         logger.info(f"Adding memory: {text[:50]}{'...' if len(text) > 50 else ''}")
         
@@ -81,18 +141,121 @@ class MemoryAgent:
         embedding = self._get_embedding(text)
         
         # Add the memory to the vector store
-        memory_id = self.vector_store.add_memory(text, embedding, metadata)
+        if dedup is None:
+            dedup = MEMORY_DEDUP
+        with self.lease_store() as store:
+            memory_id = store.add_memory(text, embedding, metadata, dedup=dedup)
         
-        logger.info(f"Memory added with ID: {memory_id}")
+        logger.info(f"Memory stored with ID: {memory_id}")
         return memory_id
     
-    def search_memories(self, query: str, k: int = None) -> List[Dict[str, Any]]:
+    def add_memory_async(self, 
+                         text: str, 
+                         metadata: Optional[Dict[str, Any]] = None,
+                         dedup: Optional[bool] = None) -> Future:
+        """
+        Queue a memory for the background writer and return immediately.
+        Queued memories are embedded and stored in batches by the writer the
+        store manager keeps for the namespace; they become searchable once
+        committed, which flush() waits for.
+        
+        Args:
+            text: Text content of the memory
+            metadata: Additional metadata for the memory
+            dedup: Whether to merge duplicates (defaults to MEMORY_DEDUP)
+            
+        Returns:
+            Future resolving to the ID of the memory
+        """
+        logger.debug(f"Queueing memory: {text[:50]}{'...' if len(text) > 50 else ''}")
+        
+        if dedup is None:
+            dedup = MEMORY_DEDUP
+        return self.store_manager.write(self.namespace, self.embedder.embed, text, metadata or {}, dedup)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all memories queued with add_memory_async are stored.
+        
+        Args:
+            timeout: Maximum number of seconds to wait (None waits indefinitely)
+            
+        Returns:
+            True if all queued memories were stored, False on timeout
+        """
+        return self.store_manager.flush(self.namespace, timeout)
+    
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Store the memories still queued, e.g. when the agent's session ends.
+        The writer and store are shared with other agents of the namespace, so
+        they stay with the store manager, which closes them with the namespace.
+        
+        Args:
+            timeout: Maximum number of seconds to wait (None waits indefinitely)
+            
+        Returns:
+            True if all queued memories were stored, False on timeout
+        """
+        logger.info(f"Closing Memory Agent for namespace {self.namespace}")
+        return self.flush(timeout)
+    
+    def add_memories(self, 
+                     texts: List[str], 
+                     metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+                     batch_size: int = 1024) -> List[int]:
+        """
+        Add many memories to the store at once.
+        Texts are embedded in batches and persisted with a single write.
+        
+        Args:
+            texts: Text content of the memories
+            metadatas: Additional metadata for each memory
+            batch_size: Number of texts to embed per batch
+            
+        Returns:
+            IDs of the added memories, in input order
+        """
+        logger.info(f"Adding {len(texts)} memories in bulk")
+        
+        if not texts:
+            return []
+        
+        if metadatas is not None and len(metadatas) != len(texts):
+            raise ValueError("texts and metadatas must have the same length")
+        
+        # Generate embeddings batch by batch into one matrix
+        embeddings = np.vstack([
+            self._get_embeddings(texts[start:start + batch_size])
+            for start in range(0, len(texts), batch_size)
+        ])
+        
+        # Add all memories to the vector store in one call
+        with self.lease_store() as store:
+            memory_ids = store.add_memories(texts, embeddings, metadatas)
+        
+        logger.info(f"Added {len(memory_ids)} memories")
+        return memory_ids
+    
+    def search_memories(self, 
+                        query: str, 
+                        k: int = None,
+                        memory_type: Optional[Union[str, List[str]]] = None,
+                        since: Optional[Union[str, datetime.datetime]] = None,
+                        until: Optional[Union[str, datetime.datetime]] = None,
+                        tools_used: Optional[List[str]] = None,
+                        mode: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Search for memories similar to the query.
         
         Args:
             query: Search query
             k: Number of results to return (default: DEFAULT_MEMORY_K)
+            memory_type: Only return memories of this type (or list of types)
+            since: Only return memories with a timestamp at or after this
+            until: Only return memories with a timestamp before this
+            tools_used: Only return memories that used at least one of these tools
+            mode: "vector", "lexical" (keyword) or "hybrid" (default: MEMORY_SEARCH_MODE)
             
         Returns:
             List of memory dictionaries
@@ -102,13 +265,27 @@ class MemoryAgent:
         if k is None:
             k = DEFAULT_MEMORY_K
         
-        logger.debug(f"Using k={k} for memory search")
+        mode = mode or MEMORY_SEARCH_MODE
+        if mode not in ("vector", "lexical", "hybrid"):
+            raise ValueError(f"Unknown memory search mode: {mode}")
+        
+        logger.debug(f"Using k={k} and mode={mode} for memory search")
+        
+        filters = {"memory_type": memory_type, "since": since, "until": until, "tools_used": tools_used}
+        if any(value is not None for value in filters.values()):
+            logger.debug(f"Memory search filters: {filters}")
         
-        # Generate embedding for the query
-        query_embedding = self._get_embedding(query)
+        # Embed before taking the store, so a slow embedder doesn't keep it open
+        embedding = None if mode == "lexical" else self._get_embedding(query)
         
-        # Search the vector store
-        results = self.vector_store.search(query_embedding, k)
+        with self.lease_store() as store:
+            if mode == "lexical":
+                # Keyword lookups don't need an embedding
+                results = store.search_text(query, k, **filters)
+            elif mode == "hybrid":
+                results = store.search_hybrid(query, embedding, k, **filters)
+            else:
+                results = store.search(embedding, k, **filters)
         
         logger.info(f"Memory search returned {len(results)} results")
         
@@ -133,7 +310,8 @@ class MemoryAgent:
         """
         logger.info(f"Getting memory with ID: {memory_id}")
         
-        memory = self.vector_store.get_memory_by_id(memory_id)
+        with self.lease_store() as store:
+            memory = store.get_memory_by_id(memory_id)
         
         if memory:
             logger.debug(f"Memory found: {memory.get('text', '')[:50]}...")
@@ -154,7 +332,8 @@ class MemoryAgent:
         """
         logger.info(f"Deleting memory with ID: {memory_id}")
         
-        success = self.vector_store.delete_memory(memory_id)
+        with self.lease_store() as store:
+            success = store.delete_memory(memory_id)
         
         if success:
             logger.info(f"Memory {memory_id} successfully deleted")
@@ -163,25 +342,113 @@ class MemoryAgent:
         
         return success
     
+    def delete_memories(self, memory_ids: List[int]) -> int:
+        """
+        Delete several memories at once.
+        
+        Args:
+            memory_ids: IDs of the memories to delete
+            
+        Returns:
+            Number of memories deleted
+        """
+        logger.info(f"Deleting {len(memory_ids)} memories")
+        
+        with self.lease_store() as store:
+            deleted = store.delete_memories(memory_ids)
+        
+        logger.info(f"Deleted {deleted} of {len(memory_ids)} memories")
+        return deleted
+    
     def get_all_memories(self) -> List[Dict[str, Any]]:
         """
         Get all memories.
+        Loads every memory; prefer list_memories, iter_memories or count_memories.
         
         Returns:
             List of all memory dictionaries
         """
         logger.info("Getting all memories")
         
-        memories = self.vector_store.get_all_memories()
+        with self.lease_store() as store:
+            memories = store.get_all_memories()
         
         logger.debug(f"Retrieved {len(memories)} memories")
         return memories
     
+    def list_memories(self, 
+                      cursor: Optional[int] = None, 
+                      page_size: int = 100,
+                      newest_first: bool = False,
+                      **filters) -> Dict[str, Any]:
+        """
+        Get one page of memories.
+        
+        Args:
+            cursor: next_cursor of the previous page, None for the first page
+            page_size: Maximum number of memories per page
+            newest_first: List the newest memories first
+            **filters: memory_type, since, until and tools_used, as in search_memories
+            
+        Returns:
+            Dictionary with the "memories" of the page and the "next_cursor" (None on the last page)
+        """
+        logger.info(f"Listing memories (cursor={cursor}, page_size={page_size})")
+        
+        with self.lease_store() as store:
+            page = store.list_memories(cursor, page_size, newest_first, **filters)
+        
+        logger.debug(f"Listed {len(page['memories'])} memories, next cursor: {page['next_cursor']}")
+        return page
+    
+    def iter_memories(self, batch_size: int = 1000, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over memories without loading them all at once.
+        
+        Args:
+            batch_size: Number of memories loaded at a time
+            **filters: memory_type, since, until and tools_used, as in search_memories
+            
+        Returns:
+            Iterator of memory dictionaries
+        """
+        with self.lease_store() as store:
+            yield from store.iter_memories(batch_size, **filters)
+    
+    def export_memories(self, include_vectors: bool = False, **filters) -> Iterator[str]:
+        """
+        Export memories as JSON lines.
+        
+        Args:
+            include_vectors: Add each memory's vector, base64-encoded float32
+            **filters: memory_type, since, until and tools_used, as in search_memories
+            
+        Returns:
+            Iterator of JSON lines
+        """
+        logger.info("Exporting memories")
+        with self.lease_store() as store:
+            yield from store.export_memories(include_vectors=include_vectors, **filters)
+    
+    def count_memories(self, **filters) -> int:
+        """
+        Count memories, optionally matching metadata filters.
+        
+        Args:
+            **filters: memory_type, since, until and tools_used, as in search_memories
+            
+        Returns:
+            Number of matching memories
+        """
+        with self.lease_store() as store:
+            return store.count_memories(**filters)
+    
     def clear_all_memories(self) -> None:
         """Clear all memories from the store."""
         logger.warning("Clearing all memories from store")
         
-        self.vector_store.clear_store()
+        with self.lease_store() as store:
+            store.clear_store()
         
         logger.info("All memories cleared")
     
@@ -266,16 +533,9 @@ class MemoryAgent:
         """
         logger.info(f"Getting {limit} most recent memories")
         
-        all_memories = self.get_all_memories()
-        
-        # Sort by timestamp (newest first)
-        sorted_memories = sorted(
-            all_memories, 
-            key=lambda m: m.get("timestamp", ""), 
-            reverse=True
-        )
-        
-        recent_memories = sorted_memories[:limit]
+        # Served from the store's recency index, newest first
+        with self.lease_store() as store:
+            recent_memories = store.get_recent_memories(limit)
         
         logger.debug(f"Retrieved {len(recent_memories)} recent memories")
         return recent_memories
@@ -293,29 +553,55 @@ class MemoryAgent:
         """
         logger.info(f"Processing command: {command}")
         
-        # Get recent memories for context
-        logger.debug("Getting recent memories for context")
-        recent_memories = self.get_recent_memories(5)
-        recent_memory_text = "\n".join([
-            f"[{m.get('id')}] {m.get('text', '')[:100]}..." 
-            for m in recent_memories
-        ])
-        
-        memory_context = f"Recent memories:\n{recent_memory_text}\n\nTotal memories: {self.vector_store.count_memories()}"
-        
-        # Combine contexts
-        full_context = memory_context
-        if context:
-            full_context = f"{full_context}\n\nAdditional context:\n{context}"
-            logger.debug("Added additional context to command")
-        
         # Generate response using LLM
         logger.debug("Sending command to LLM")
         response = generate_agent_response(
+            system_prompt=self.system_prompt,
+            user_input=command,
+            context=self._build_context(command, context)
+        )
+        
+        logger.info(f"Command processed, response length: {len(response)} chars")
+        return response
+    
+    async def process_command_async(self, command: str, context: Optional[str] = None) -> str:
+        """
+        Process a memory-related command without blocking the event loop.
+        The memory lookups run in a worker thread.
+        
+        Args:
+            command: The memory operation command
+            context: Additional context for the command
+            
+        Returns:
+            Response from the Memory Agent
+        """
+        logger.info(f"Processing command asynchronously: {command}")
+        
+        full_context = await asyncio.to_thread(self._build_context, command, context)
+        response = await generate_agent_response_async(
             system_prompt=self.system_prompt,
             user_input=command,
             context=full_context
         )
         
         logger.info(f"Command processed, response length: {len(response)} chars")
-        return response 
\ No newline at end of file
+        return response
+    
+    def _build_context(self, command: str, context: Optional[str] = None) -> str:
+        """
+        Build the context of a memory command.
+        
+        Args:
+            command: The memory operation command
+            context: Memory context built by the caller, if any
+            
+        Returns:
+            Context for the LLM call
+        """
+        # Callers such as the Terminal Agent pass memory context built for this agent's budget
+        if context is None:
+            logger.debug("Building memory context")
+            context = self.context_builder.build("memory_agent", command)
+        
+        return f"{context}\n\nTotal memories: {self.count_memories()}"
\ No newline at end of file
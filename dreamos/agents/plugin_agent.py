@@ -4,10 +4,11 @@ Plugin Agent for DreamOS - Manages and executes tools
 from typing import Dict, List, Any, Optional, Union
 import re
 import json
+import asyncio
 
 from ..config import SYSTEM_PROMPTS, DEBUG_MODE
 from ..utils.tool_loader import ToolLoader
-from ..utils.llm_utils import generate_agent_response
+from ..utils.llm_utils import generate_agent_response, generate_agent_response_async
 
 class PluginAgent:
     """
@@ -62,6 +63,27 @@ class PluginAgent:
         
         return result
     
+    def run_tool(self, tool_name: str, tool_input: str) -> Dict[str, Any]:
+        """
+        Execute a tool chosen elsewhere, e.g. by a single-call LLM response.
+        
+        Args:
+            tool_name: Name of the tool to execute
+            tool_input: Input for the tool
+            
+        Returns:
+            Dictionary with command processing result, like process_command
+        """
+        tool_result = self.execute_tool(tool_name, tool_input)
+        
+        return {
+            "status": "success",
+            "tool_used": tool_name,
+            "input": tool_input,
+            "result": tool_result,
+            "response": self._format_tool_response(tool_name, tool_input, tool_result)
+        }
+    
     def parse_tool_command(self, command: str) -> Optional[Dict[str, str]]:
         """
         Parse a tool command from natural language.
@@ -164,85 +186,149 @@ class PluginAgent:
         
         if parsed_command:
             # If we successfully parsed a tool command, execute it directly
-            tool_name = parsed_command["tool_name"]
-            tool_input = parsed_command["tool_input"]
-            
-            # Extract any additional parameters
-            kwargs = {k: v for k, v in parsed_command.items() 
-                     if k not in ["tool_name", "tool_input"]}
-            
-            # Execute the tool with all parameters
-            if kwargs:
-                tool_result = self.tool_loader.execute_tool(tool_name, tool_input, **kwargs)
-            else:
-                tool_result = self.tool_loader.execute_tool(tool_name, tool_input)
-            
-            return {
-                "status": "success",
-                "tool_used": tool_name,
-                "input": tool_input,
-                "result": tool_result,
-                "response": self._format_tool_response(tool_name, tool_input, tool_result)
-            }
+            return self._execute_parsed_command(parsed_command)
         else:
             # Use LLM to determine the appropriate tool and input
             available_tools = self.get_available_tools()
-            tools_context = "Available tools:\n" + "\n".join(
-                [f"- {tool}: {self.get_tool_info(tool).get('description', 'No description')}" 
-                 for tool in available_tools]
-            )
-            
-            # Combine contexts
-            full_context = tools_context
-            if context:
-                full_context = f"{full_context}\n\nAdditional context:\n{context}"
             
             # Generate response using LLM to determine tool and input
             llm_response = generate_agent_response(
                 system_prompt=self.system_prompt,
                 user_input=f"Determine which tool to use for this command: {command}",
-                context=full_context
+                context=self._build_tools_context(available_tools, context)
             )
             
-            # Try to extract tool information from LLM response
-            try:
-                # Check if LLM response contains a structured tool usage
-                tool_info_match = re.search(r"Tool: ([\w_]+)\nInput: (.+)", llm_response, re.DOTALL)
+            return self._handle_tool_decision(llm_response, available_tools)
+    
+    async def process_command_async(self, command: str, context: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process a plugin-related command without blocking the event loop.
+        Tools run in a worker thread, since many of them block on I/O.
+        
+        Args:
+            command: The plugin operation command
+            context: Additional context for the command
+            
+        Returns:
+            Dictionary with command processing result
+        """
+        parsed_command = self.parse_tool_command(command)
+        
+        if parsed_command:
+            return await asyncio.to_thread(self._execute_parsed_command, parsed_command)
+        
+        available_tools = self.get_available_tools()
+        llm_response = await generate_agent_response_async(
+            system_prompt=self.system_prompt,
+            user_input=f"Determine which tool to use for this command: {command}",
+            context=self._build_tools_context(available_tools, context)
+        )
+        
+        return await asyncio.to_thread(self._handle_tool_decision, llm_response, available_tools)
+    
+    def _execute_parsed_command(self, parsed_command: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Execute a tool command parsed from the user's input.
+        
+        Args:
+            parsed_command: Result of parse_tool_command
+            
+        Returns:
+            Dictionary with command processing result
+        """
+        tool_name = parsed_command["tool_name"]
+        tool_input = parsed_command["tool_input"]
+        
+        # Extract any additional parameters
+        kwargs = {k: v for k, v in parsed_command.items() 
+                 if k not in ["tool_name", "tool_input"]}
+        
+        # Execute the tool with all parameters
+        if kwargs:
+            tool_result = self.tool_loader.execute_tool(tool_name, tool_input, **kwargs)
+        else:
+            tool_result = self.tool_loader.execute_tool(tool_name, tool_input)
+        
+        return {
+            "status": "success",
+            "tool_used": tool_name,
+            "input": tool_input,
+            "result": tool_result,
+            "response": self._format_tool_response(tool_name, tool_input, tool_result)
+        }
+    
+    def _build_tools_context(self, available_tools: List[str], context: Optional[str] = None) -> str:
+        """
+        Describe the available tools for the LLM.
+        
+        Args:
+            available_tools: Names of the tools
+            context: Additional context for the command
+            
+        Returns:
+            Context for the LLM call
+        """
+        tools_context = "Available tools:\n" + "\n".join(
+            [f"- {tool}: {self.get_tool_info(tool).get('description', 'No description')}" 
+             for tool in available_tools]
+        )
+        
+        # Combine contexts
+        full_context = tools_context
+        if context:
+            full_context = f"{full_context}\n\nAdditional context:\n{context}"
+        return full_context
+    
+    def _handle_tool_decision(self, llm_response: str, available_tools: List[str]) -> Dict[str, Any]:
+        """
+        Execute the tool chosen by the LLM, or return its response if it chose none.
+        
+        Args:
+            llm_response: Response of the LLM to the tool selection prompt
+            available_tools: Names of the tools
+            
+        Returns:
+            Dictionary with command processing result
+        """
+        # Try to extract tool information from LLM response
+        try:
+            # Check if LLM response contains a structured tool usage
+            tool_info_match = re.search(r"Tool: ([\w_]+)\nInput: (.+)", llm_response, re.DOTALL)
+            
+            if tool_info_match:
+                tool_name = tool_info_match.group(1).strip().lower()
+                tool_input = tool_info_match.group(2).strip()
                 
-                if tool_info_match:
-                    tool_name = tool_info_match.group(1).strip().lower()
-                    tool_input = tool_info_match.group(2).strip()
+                # Verify tool exists
+                if tool_name in available_tools:
+                    # Execute the tool
+                    tool_result = self.execute_tool(tool_name, tool_input)
                     
-                    # Verify tool exists
-                    if tool_name in available_tools:
-                        # Execute the tool
-                        tool_result = self.execute_tool(tool_name, tool_input)
-                        
-                        return {
-                            "status": "success",
-                            "tool_used": tool_name,
-                            "input": tool_input,
-                            "result": tool_result,
-                            "response": self._format_tool_response(tool_name, tool_input, tool_result)
-                        }
-                    else:
-                        return {
-                            "status": "error",
-                            "error": f"Tool '{tool_name}' not found",
-                            "response": f"I couldn't find the tool '{tool_name}' to complete your request."
-                        }
+                    return {
+                        "status": "success",
+                        "tool_used": tool_name,
+                        "input": tool_input,
+                        "result": tool_result,
+                        "response": self._format_tool_response(tool_name, tool_input, tool_result)
+                    }
                 else:
-                    # Fallback to treating the LLM response as the final response
                     return {
-                        "status": "no_tool_needed",
-                        "response": llm_response
+                        "status": "error",
+                        "error": f"Tool '{tool_name}' not found",
+                        "response": f"I couldn't find the tool '{tool_name}' to complete your request."
                     }
-            except Exception as e:
+            else:
+                # Fallback to treating the LLM response as the final response
                 return {
-                    "status": "error",
-                    "error": str(e),
-                    "response": "I had trouble determining which tool to use for your request."
+                    "status": "no_tool_needed",
+                    "response": llm_response
                 }
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": str(e),
+                "response": "I had trouble determining which tool to use for your request."
+            }
     
     def _format_tool_response(self, tool_name: str, tool_input: str, tool_result: Dict[str, Any]) -> str:
         """
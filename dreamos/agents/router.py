@@ -0,0 +1,574 @@
+"""
+Local command router for DreamOS - picks the handling agent without an LLM call
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import (
+    ROUTER_CONFIDENCE_THRESHOLD, ROUTING_CACHE_SIZE, ROUTING_CACHE_TTL_SECONDS, ROUTING_CACHE_PATH
+)
+from ..memory.embeddings import Embedder
+from ..utils.logging_utils import get_logger
+
+# Initialize logger
+logger = get_logger("router")
+
+AGENT_NAMES = ("file_agent", "memory_agent", "plugin_agent", "terminal_agent")
+
+# Commands the Terminal Agent answers itself, matched exactly
+_TERMINAL_COMMANDS = {
+    "help", "?", "commands", "status", "system status", "clear", "cls", "exit", "quit"
+}
+
+# Keyword rules. A command matching exactly one agent's rule is routed to that agent; the
+# classifier only decides between agents whose rules all match, so verbs that also occur
+# in chat ("write a poem", "save the whales") don't count as file commands on their own
+_RULES = {
+    "file_agent": re.compile(
+        r"\b(files?|folders?|director(y|ies)|documents?|list files)\b|"
+        r"\b(create|make|open|show|read|list|delete|edit|write|save|append|search|rename)\b.*\bnotes?\b|"
+        r"\.(txt|md|json|csv|py|log)\b|^\s*(ls|cat|rm|mkdir)\s",
+        re.IGNORECASE
+    ),
+    "memory_agent": re.compile(
+        r"\b(remember|recall|forget|memor(y|ies)|remind me|what did i|did i (say|tell|ask)|"
+        r"(do you )?know about me|my (name|favou?rite|birthday))\b",
+        re.IGNORECASE
+    ),
+    "plugin_agent": re.compile(
+        r"\b(calculate|calculator|compute|solve|square root|percent of|search (the web|online)|google|"
+        r"browse|look up|website|url|run (this|the|my)? ?(code|script|python)|execute|convert)\b|"
+        r"https?://|\d+(\.\d+)?\s*([-+*/^%x]|\*\*|times|plus|minus|divided by)\s*\(?\d",
+        re.IGNORECASE
+    ),
+    "terminal_agent": re.compile(
+        r"\b(help|system status|uptime|dreamos|settings|voice mode|who are you|what can you do)\b",
+        re.IGNORECASE
+    )
+}
+
+# Sharpness of the softmax over cosine similarities to the agent centroids. Similarities of
+# the hashing embedder differ by a few hundredths, so a sharper softmax reads noise as confidence
+_TEMPERATURE = 10.0
+
+# Probability at which the classifier's choice of another agent overrides a single matching
+# rule, sending the command to the LLM. Correct rule decisions on the calibration commands
+# are contradicted with at most about 0.7, mostly by "what is ..." questions
+_VETO_CONFIDENCE = 0.8
+
+# Share of the classifier's decisions on the calibration commands that must be right
+_TARGET_PRECISION = 0.95
+
+# Labelled commands the classifier starts from
+_SEED_EXAMPLES = {
+    "file_agent": [
+        "create a new note called groceries",
+        "write hello world to notes.txt",
+        "show me the contents of todo.md",
+        "list all my files",
+        "delete the file draft.txt",
+        "save this text to a file",
+        "open my meeting notes",
+        "make a folder for projects",
+        "search my notes for budget",
+        "append buy milk to the shopping list file",
+        "rename report.txt to final_report.txt",
+        "what files do I have"
+    ],
+    "memory_agent": [
+        "remember that my favorite color is blue",
+        "what is my favorite color",
+        "do you remember what I told you yesterday",
+        "forget my address",
+        "what did I ask you earlier",
+        "remind me what my goals are",
+        "store the fact that the meeting is on friday",
+        "what do you know about me",
+        "recall my last command",
+        "note that my sister's name is anna",
+        "what was the name of my cat",
+        "show my stored memories"
+    ],
+    "plugin_agent": [
+        "calculate 15 percent of 240",
+        "what is 12 times 37",
+        "search the web for the latest python release",
+        "look up the weather in paris",
+        "run this python code print(1 + 1)",
+        "execute the script",
+        "browse to example.com",
+        "what is the square root of 144",
+        "convert 10 miles to kilometers",
+        "find news about spacex online",
+        "evaluate 2 ** 10",
+        "use the calculator"
+    ],
+    "terminal_agent": [
+        "help",
+        "show system status",
+        "what can you do",
+        "who are you",
+        "hello",
+        "tell me a joke",
+        "how are you today",
+        "turn on voice mode",
+        "what version of dreamos is this",
+        "explain what an operating system is",
+        "thanks",
+        "clear the screen"
+    ]
+}
+
+# Labelled commands, kept apart from the seed examples, that the confidence threshold is calibrated on
+_CALIBRATION_EXAMPLES = {
+    "file_agent": [
+        "read the file ideas.md",
+        "show me notes.txt",
+        "delete my old notes",
+        "list the files in the projects folder",
+        "copy the recipe into a new document",
+        "save the results to results.csv",
+        "write my notes about the meeting to meeting.md",
+        "rename the folder drafts to archive",
+        "help me find a file about taxes",
+        "put what you remember about me into a file"
+    ],
+    "memory_agent": [
+        "remember that i parked on level 3",
+        "what is my name",
+        "forget everything about my trip",
+        "what did i tell you about my job",
+        "do you remember my birthday",
+        "remind me what we talked about",
+        "what do you know about me",
+        "recall the last thing i searched for",
+        "remember the name of the notes file",
+        "remember to convert the units later"
+    ],
+    "plugin_agent": [
+        "what is 5 * 7",
+        "calculate the tip on 48 dollars",
+        "search the web for cheap flights",
+        "look up the population of japan",
+        "run my python script",
+        "what is 3 plus 4",
+        "convert 100 fahrenheit to celsius",
+        "browse to https://example.org",
+        "compute 17 percent of 300",
+        "google the meaning of life",
+        "help me with the calculator"
+    ],
+    "terminal_agent": [
+        "help",
+        "what can you do",
+        "who are you",
+        "show the system status",
+        "turn on voice mode",
+        "open the settings",
+        "what is dreamos",
+        "how long is the system uptime",
+        "what can you do with files"
+    ]
+}
+
+
+class FastRouter:
+    """
+    Router that answers confidently routable commands locally.
+    A command matching the keyword rule of exactly one agent goes to that
+    agent, unless a nearest-centroid classifier over command embeddings is
+    confident about another one. When several rules match, the classifier
+    picks between them, and its choice is used if its probability reaches
+    the confidence threshold. Commands no rule matches, and those the
+    classifier isn't sure about, are left to the LLM, whose decisions are
+    learned as further examples.
+    """
+    
+    def __init__(self, embedder: Embedder, threshold: Optional[float] = None):
+        """
+        Initialize the router and train it on the seed examples.
+        
+        Args:
+            embedder: Embedder for commands, normally the Memory Agent's
+            threshold: Minimum confidence to route locally (defaults to ROUTER_CONFIDENCE_THRESHOLD,
+                0 calibrates it on held-out labelled commands)
+        """
+        self.embedder = embedder
+        self.threshold = threshold if threshold is not None else ROUTER_CONFIDENCE_THRESHOLD
+        
+        self._lock = threading.Lock()
+        
+        # Running sums of the example embeddings per agent, the centroids are their normalized rows
+        self._sums = np.zeros((len(AGENT_NAMES), embedder.dim), dtype=np.float64)
+        self._counts = np.zeros(len(AGENT_NAMES), dtype=np.int64)
+        for agent_name, examples in _SEED_EXAMPLES.items():
+            vectors = embedder.embed(examples)
+            self._sums[AGENT_NAMES.index(agent_name)] += vectors.sum(axis=0)
+            self._counts[AGENT_NAMES.index(agent_name)] += len(examples)
+        self._centroids = self._normalized_centroids()
+        
+        if not self.threshold:
+            self.threshold = self.calibrate(_CALIBRATION_EXAMPLES)
+            logger.debug(f"Calibrated fast-path threshold: {self.threshold:.3f}")
+    
+    def _normalized_centroids(self) -> np.ndarray:
+        """Compute unit-length centroids from the running sums."""
+        norms = np.linalg.norm(self._sums, axis=1, keepdims=True)
+        return (self._sums / np.where(norms > 0, norms, 1)).astype(np.float32)
+    
+    def score(self, command: str) -> Dict[str, float]:
+        """
+        Get the classifier's probability of each agent handling a command.
+        
+        Args:
+            command: The user command
+        
+        Returns:
+            Dictionary of probabilities by agent name, summing to 1
+        """
+        vector = self.embedder.embed_one(command.strip().lower())
+        with self._lock:
+            similarities = self._centroids @ vector
+        
+        weights = np.exp(_TEMPERATURE * (similarities - similarities.max()))
+        probabilities = weights / weights.sum()
+        
+        return {agent_name: float(p) for agent_name, p in zip(AGENT_NAMES, probabilities)}
+    
+    def match_rules(self, command: str) -> List[str]:
+        """
+        Get the agents whose keyword rules match a command.
+        
+        Args:
+            command: The user command
+        
+        Returns:
+            Names of the matching agents
+        """
+        return [agent_name for agent_name in AGENT_NAMES if _RULES[agent_name].search(command)]
+    
+    def route(self, command: str) -> Optional[Tuple[str, float]]:
+        """
+        Route a command locally if the rules decide it or the router is confident.
+        
+        Args:
+            command: The user command
+        
+        Returns:
+            Tuple of (agent name, confidence), or None if the LLM should decide
+        """
+        decision = self._decide(command)
+        if decision is None or decision[1] < self.threshold:
+            return None
+        return decision
+    
+    def _decide(self, command: str) -> Optional[Tuple[str, float]]:
+        """
+        Pick an agent for a command regardless of the threshold.
+        
+        Args:
+            command: The user command
+        
+        Returns:
+            Tuple of (agent name, confidence), with confidence 1 for rule decisions,
+            or None if the rules and the classifier don't agree on an agent
+        """
+        if command.strip().lower() in _TERMINAL_COMMANDS:
+            return "terminal_agent", 1.0
+        
+        matched = self.match_rules(command)
+        if not matched:
+            return None
+        
+        scores = self.score(command)
+        agent_name = max(scores, key=scores.get)
+        logger.debug(f"Fast-path scores for '{command}' (rules: {matched}): {scores}")
+        
+        if len(matched) == 1:
+            # A single rule decides unless the classifier is confident about another agent
+            if agent_name != matched[0] and scores[agent_name] >= _VETO_CONFIDENCE:
+                return None
+            return matched[0], 1.0
+        
+        # Several rules match, the classifier has to agree with one of them
+        if agent_name not in matched:
+            return None
+        return agent_name, scores[agent_name]
+    
+    def calibrate(self, examples: Dict[str, List[str]], target_precision: float = _TARGET_PRECISION) -> float:
+        """
+        Find the lowest threshold at which the classifier's decisions on labelled commands are precise enough.
+        
+        Args:
+            examples: Commands by the agent that should handle them
+            target_precision: Share of the classifier's decisions that must be right
+        
+        Returns:
+            Confidence threshold
+        """
+        # Rule decisions don't depend on the threshold, only the classifier's are counted
+        decisions = []
+        for expected, commands in examples.items():
+            for command in commands:
+                decision = self._decide(command)
+                if decision is not None and len(self.match_rules(command)) > 1:
+                    decisions.append((decision[1], decision[0] == expected))
+        
+        # Try each observed confidence as the threshold, lowest first
+        for threshold in sorted({confidence for confidence, _ in decisions}):
+            kept = [correct for confidence, correct in decisions if confidence >= threshold]
+            if sum(kept) >= target_precision * len(kept):
+                return threshold
+        
+        # The classifier is never precise enough, so commands matching several rules go to the LLM
+        return 1.0
+    
+    def learn(self, command: str, agent_name: str) -> None:
+        """
+        Add a routed command as an example of its agent, e.g. after the LLM decided.
+        Decisions that contradict the keyword rules aren't learned, so one bad
+        routing answer doesn't pull the centroids towards the wrong agent.
+        
+        Args:
+            command: The user command
+            agent_name: Agent that handles it
+        """
+        if agent_name not in AGENT_NAMES:
+            return
+        
+        matched = self.match_rules(command)
+        if matched and agent_name not in matched:
+            logger.debug(f"Not learning '{command}' as {agent_name}, the rules match {matched}")
+            return
+        
+        vector = self.embedder.embed_one(command.strip().lower())
+        with self._lock:
+            self._sums[AGENT_NAMES.index(agent_name)] += vector
+            self._counts[AGENT_NAMES.index(agent_name)] += 1
+            self._centroids = self._normalized_centroids()
+    
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get the number of examples per agent.
+        
+        Returns:
+            Dictionary of example counts by agent name
+        """
+        with self._lock:
+            return {agent_name: int(count) for agent_name, count in zip(AGENT_NAMES, self._counts)}
+
+
+
+def normalize_command(command: str) -> str:
+    """
+    Reduce a command to the form routing decisions are cached under.
+    Case, spacing, surrounding punctuation and a leading or trailing "please" are ignored.
+    
+    Args:
+        command: The user command
+        
+    Returns:
+        Normalized command
+    """
+    normalized = " ".join(command.lower().split()).strip(" .!?,;:")
+    normalized = re.sub(r"^please\s+|\s+please$", "", normalized)
+    return normalized.strip(" .!?,;:")
+
+
+def routing_fingerprint(*parts: str) -> str:
+    """
+    Fingerprint the inputs of routing decisions, e.g. the agent names and prompts.
+    
+    Args:
+        *parts: Strings the decisions depend on
+        
+    Returns:
+        Hex digest that changes when any part changes
+    """
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class RoutingCache:
+    """
+    Bounded LRU cache of routing decisions keyed by normalized command.
+    Entries expire after a TTL and are only valid for the fingerprint they were
+    stored under, so changing the agent set or the prompts invalidates them.
+    Optionally backed by an SQLite file so decisions survive restarts.
+    """
+    
+    def __init__(self,
+                 fingerprint: str,
+                 max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 db_path: Optional[str] = None):
+        """
+        Initialize the routing cache.
+        
+        Args:
+            fingerprint: Fingerprint of the routing inputs, see routing_fingerprint
+            max_entries: Maximum number of cached decisions (defaults to ROUTING_CACHE_SIZE)
+            ttl_seconds: Lifetime of a decision (defaults to ROUTING_CACHE_TTL_SECONDS, 0 = no expiry)
+            db_path: SQLite file backing the cache (defaults to ROUTING_CACHE_PATH, empty = memory only)
+        """
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries if max_entries is not None else ROUTING_CACHE_SIZE
+        self.ttl = ttl_seconds if ttl_seconds is not None else ROUTING_CACHE_TTL_SECONDS
+        self.db_path = db_path if db_path is not None else ROUTING_CACHE_PATH
+        
+        self._lock = threading.Lock()
+        
+        # (agent name, expiry time) by normalized command, least recently used first
+        self._entries = OrderedDict()
+        
+        self._conn = None
+        if self.db_path:
+            self._open_disk()
+    
+    def _open_disk(self) -> None:
+        """Open the SQLite file, drop stale decisions and load the valid ones."""
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS routing_decisions (
+                    command TEXT PRIMARY KEY,
+                    agent TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            # Decisions made with other agents or prompts are invalid
+            self._conn.execute(
+                "DELETE FROM routing_decisions WHERE fingerprint != ? OR expires_at < ?",
+                (self.fingerprint, time.time())
+            )
+        
+        rows = self._conn.execute(
+            "SELECT command, agent, expires_at FROM routing_decisions ORDER BY expires_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        for command, agent_name, expires_at in reversed(rows):
+            self._entries[command] = (agent_name, expires_at)
+        
+        logger.debug(f"Loaded {len(rows)} cached routing decisions")
+    
+    def get(self, command: str) -> Optional[str]:
+        """
+        Look up the routing decision for a command.
+        
+        Args:
+            command: The user command
+            
+        Returns:
+            Name of the agent, or None if no valid decision is cached
+        """
+        key = normalize_command(command)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            agent_name, expires_at = entry
+            if time.time() > expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return agent_name
+    
+    def put(self, command: str, agent_name: str) -> None:
+        """
+        Cache the routing decision for a command.
+        
+        Args:
+            command: The user command
+            agent_name: Agent the command was routed to
+        """
+        key = normalize_command(command)
+        expires_at = time.time() + self.ttl if self.ttl > 0 else float("inf")
+        with self._lock:
+            self._entries[key] = (agent_name, expires_at)
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO routing_decisions (command, agent, fingerprint, expires_at) VALUES (?, ?, ?, ?)",
+                        (key, agent_name, self.fingerprint, expires_at)
+                    )
+                    self._conn.executemany("DELETE FROM routing_decisions WHERE command = ?", [(k,) for k in evicted])
+    
+    def invalidate(self, command: Optional[str] = None) -> None:
+        """
+        Drop the cached decision for a command, or all decisions.
+        
+        Args:
+            command: The user command (None drops everything)
+        """
+        with self._lock:
+            if command is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(normalize_command(command), None)
+            
+            if self._conn is not None:
+                with self._conn:
+                    if command is None:
+                        self._conn.execute("DELETE FROM routing_decisions")
+                    else:
+                        self._conn.execute("DELETE FROM routing_decisions WHERE command = ?", (normalize_command(command),))
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Routers and routing caches shared by all Terminal Agents in the process
+_shared_routers = {}
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+def get_fast_router(embedder: Embedder) -> FastRouter:
+    """
+    Get the process-wide fast router for an embedder backend.
+    Every web session has its own Terminal Agent; sharing the router means the
+    seed examples are embedded and the threshold calibrated only once, and
+    LLM decisions learned in one session help the others.
+    
+    Args:
+        embedder: Embedder for commands, the first one seen for its backend and dimension is kept
+        
+    Returns:
+        Shared FastRouter instance
+    """
+    key = (embedder.name, embedder.dim)
+    with _shared_lock:
+        if key not in _shared_routers:
+            _shared_routers[key] = FastRouter(embedder)
+        return _shared_routers[key]
+
+
+def get_routing_cache(fingerprint: str) -> RoutingCache:
+    """
+    Get the process-wide routing cache for a fingerprint.
+    
+    Args:
+        fingerprint: Fingerprint of the routing inputs, see routing_fingerprint
+        
+    Returns:
+        Shared RoutingCache instance
+    """
+    with _shared_lock:
+        if fingerprint not in _shared_caches:
+            _shared_caches[fingerprint] = RoutingCache(fingerprint)
+        return _shared_caches[fingerprint]
@@ -1,20 +1,28 @@
 """
 Terminal Agent for DreamOS - Main interface for user commands
 """
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable
 import re
 import json
+import asyncio
 import datetime
+import functools
 import threading
 import os
 
-from ..config import SYSTEM_PROMPTS, DEBUG_MODE
-from ..utils.llm_utils import generate_agent_response
+from ..config import (
+    SYSTEM_PROMPTS, DEBUG_MODE, LLM_MODEL, MEMORY_ASYNC_WRITES, ROUTER_FAST_PATH, ROUTING_CACHE_SIZE,
+    ROUTER_SINGLE_CALL, CONTEXT_TOKEN_BUDGETS
+)
+from ..utils.llm_utils import generate_agent_response, generate_agent_response_async
 from ..utils.logging_utils import get_logger
 from ..utils.metrics import track_execution_time, MetricsTracker
+from ..utils.context_builder import truncate_tokens
 from .file_agent import FileAgent
 from .memory_agent import MemoryAgent
 from .plugin_agent import PluginAgent
+from .router import get_fast_router, get_routing_cache, AGENT_NAMES, routing_fingerprint
+from .envelope import ENVELOPE_PROMPT, render_envelope_prompt, parse_envelope
 from ..tools.voice_interface import VoiceInterfaceTool
 from ..tools.data_viz import DataVizTool
 from ..tools.database_query import DatabaseQueryTool
@@ -22,19 +30,35 @@ from ..tools.database_query import DatabaseQueryTool
 # Initialize logger
 logger = get_logger("terminal_agent")
 
+# Prompt asking the LLM which agent should handle a command
+ROUTING_PROMPT = """
+        You are the Terminal Agent in DreamOS. Decide which agent should handle this command:
+        
+        Command: {command}
+        
+        Choose one:
+        1. file_agent - For anything related to files, notes, reading, writing, or searching file content
+        2. memory_agent - For remembering facts, storing information, or retrieving past context
+        3. plugin_agent - For using specific tools like calculator, web search, or code execution
+        4. terminal_agent (yourself) - For system-level commands, help, or commands that don't fit the other categories
+        
+        Respond with just the agent name (e.g., "file_agent") and nothing else.
+        """
+
 class TerminalAgent:
     """
     Terminal Agent - Main interface for processing user commands.
     Routes commands to appropriate specialized agents.
     """
     
-    def __init__(self, enable_voice: bool = False, web_mode: bool = False):
+    def __init__(self, enable_voice: bool = False, web_mode: bool = False, memory_namespace: Optional[str] = None):
         """
         Initialize the Terminal Agent and its sub-agents.
         
         Args:
             enable_voice: Whether to enable voice interface
             web_mode: Whether this agent is running in web mode (prevents server-side speech)
+            memory_namespace: Memory namespace for the Memory Agent (defaults to the shared namespace)
         """
         logger.info("Initializing Terminal Agent and sub-agents")
         
@@ -43,11 +67,22 @@ class TerminalAgent:
         self.file_agent = FileAgent()
         
         logger.debug("Initializing Memory Agent")
-        self.memory_agent = MemoryAgent()
+        self.memory_agent = MemoryAgent(namespace=memory_namespace)
         
         logger.debug("Initializing Plugin Agent")
         self.plugin_agent = PluginAgent()
         
+        # Local router answering confidently routable commands without an LLM call, shared by all sessions
+        self.router = get_fast_router(self.memory_agent.embedder) if ROUTER_FAST_PATH else None
+        
+        # Cached LLM routing decisions, invalidated when the agents, prompts or model change and shared by all sessions
+        self.routing_cache = None
+        if ROUTING_CACHE_SIZE > 0:
+            fingerprint = routing_fingerprint(
+                ",".join(AGENT_NAMES), ROUTING_PROMPT, ENVELOPE_PROMPT, json.dumps(SYSTEM_PROMPTS, sort_keys=True), LLM_MODEL
+            )
+            self.routing_cache = get_routing_cache(fingerprint)
+        
         # Initialize voice interface if enabled
         self.voice_interface = None
         self.voice_enabled = enable_voice
@@ -105,25 +140,20 @@ class TerminalAgent:
         """
         logger.info(f"Processing command: '{command}'")
         
-        # Handle voice commands
-        if command.startswith("voice ") and self.voice_enabled:
-            return self._handle_voice_command(command[6:])
-        
-        # Handle data visualization commands
-        if command.startswith("viz ") and self.data_viz_enabled:
-            return self._handle_data_viz_command(command[4:])
+        # Handle voice, data visualization and database commands
+        tool_command = self._match_tool_command(command)
+        if tool_command:
+            return tool_command()
         
-        # Handle database query commands
-        if command.startswith("db ") and self.db_query_enabled:
-            return self._handle_db_query_command(command[3:])
+        # The command's contexts are built from one snapshot, taken before it writes any memories
+        snapshot = self.memory_agent.context_builder.snapshot()
         
         # Store the command in memory
         logger.debug("Storing command in memory")
-        memory_id = self.memory_agent.add_memory(
-            text=f"User command: {command}",
-            metadata={"type": "command", "timestamp": datetime.datetime.now().isoformat()}
+        self._store_memory(
+            f"User command: {command}",
+            {"type": "command", "timestamp": datetime.datetime.now().isoformat()}
         )
-        logger.debug(f"Command stored in memory with ID: {memory_id}")
         
         # Check for special commands
         if command.lower() in ["help", "?", "commands"]:
@@ -132,11 +162,92 @@ class TerminalAgent:
         
         # Route the command to the appropriate agent
         logger.debug("Routing command to appropriate agent")
-        agent_type, agent_response = self._route_command(command)
+        agent_type, agent_response = self._route_command(command, snapshot)
+        logger.info(f"Command handled by {agent_type}")
+        
+        self._speak_response(agent_response)
+        
+        # Store the response in memory
+        logger.debug("Storing response in memory")
+        self._store_memory(
+            f"Response to '{command}':\n{agent_response}",
+            {"type": "response", "command": command, "timestamp": datetime.datetime.now().isoformat()}
+        )
+        
+        return agent_response
+    
+    @track_execution_time("terminal_agent")
+    async def process_command_async(self, command: str) -> str:
+        """
+        Process a user command on an asyncio event loop.
+        LLM calls are awaited instead of holding a thread, and memory and tool
+        work runs in worker threads, so one loop serves many commands at once.
+        The command memory is written while the command is routed.
+        
+        Args:
+            command: The user's command
+            
+        Returns:
+            Response to the user
+        """
+        logger.info(f"Processing command asynchronously: '{command}'")
+        
+        # Voice, data visualization and database commands block on their tools
+        tool_command = self._match_tool_command(command)
+        if tool_command:
+            return await asyncio.to_thread(tool_command)
+        
+        snapshot = await asyncio.to_thread(self.memory_agent.context_builder.snapshot)
+        store_command = self._store_memory_async(
+            f"User command: {command}",
+            {"type": "command", "timestamp": datetime.datetime.now().isoformat()}
+        )
+        
+        if command.lower() in ["help", "?", "commands"]:
+            logger.debug("Help command detected, generating help message")
+            await store_command
+            return self._generate_help()
+        
+        logger.debug("Storing command in memory while routing it")
+        _, (agent_type, agent_response) = await asyncio.gather(store_command, self._route_command_async(command, snapshot))
         logger.info(f"Command handled by {agent_type}")
         
-        # Speak the response if voice is enabled and not in web mode
-        # (In web mode, the browser handles speech synthesis)
+        self._speak_response(agent_response)
+        
+        logger.debug("Storing response in memory")
+        await self._store_memory_async(
+            f"Response to '{command}':\n{agent_response}",
+            {"type": "response", "command": command, "timestamp": datetime.datetime.now().isoformat()}
+        )
+        
+        return agent_response
+    
+    def _match_tool_command(self, command: str) -> Optional[Callable[[], str]]:
+        """
+        Find the handler of a voice, data visualization or database command.
+        
+        Args:
+            command: The user's command
+            
+        Returns:
+            Handler bound to the command's arguments, or None for other commands
+        """
+        if command.startswith("voice ") and self.voice_enabled:
+            return functools.partial(self._handle_voice_command, command[6:])
+        if command.startswith("viz ") and self.data_viz_enabled:
+            return functools.partial(self._handle_data_viz_command, command[4:])
+        if command.startswith("db ") and self.db_query_enabled:
+            return functools.partial(self._handle_db_query_command, command[3:])
+        return None
+    
+    def _speak_response(self, agent_response: str) -> None:
+        """
+        Speak a response if voice is enabled and not in web mode.
+        (In web mode, the browser handles speech synthesis)
+        
+        Args:
+            agent_response: Response to speak
+        """
         if self.voice_enabled and self.voice_interface and not self.web_mode:
             try:
                 # Speak a shortened version if too long
@@ -153,16 +264,46 @@ class TerminalAgent:
                 ).start()
             except Exception as e:
                 logger.error(f"Error speaking response: {str(e)}", exc_info=True)
+    
+    def _store_memory(self, text: str, metadata: Dict[str, Any]) -> None:
+        """
+        Store a memory of the session, off the command's critical path if MEMORY_ASYNC_WRITES is set.
         
-        # Store the response in memory
-        logger.debug("Storing response in memory")
-        memory_id = self.memory_agent.add_memory(
-            text=f"Response to '{command}':\n{agent_response}",
-            metadata={"type": "response", "command": command, "timestamp": datetime.datetime.now().isoformat()}
-        )
-        logger.debug(f"Response stored in memory with ID: {memory_id}")
+        Args:
+            text: Text content of the memory
+            metadata: Metadata of the memory
+        """
+        if MEMORY_ASYNC_WRITES:
+            self.memory_agent.add_memory_async(text, metadata)
+        else:
+            memory_id = self.memory_agent.add_memory(text=text, metadata=metadata)
+            logger.debug(f"Memory stored with ID: {memory_id}")
+    
+    async def _store_memory_async(self, text: str, metadata: Dict[str, Any]) -> None:
+        """
+        Store a memory of the session without blocking the event loop.
         
-        return agent_response
+        Args:
+            text: Text content of the memory
+            metadata: Metadata of the memory
+        """
+        if MEMORY_ASYNC_WRITES:
+            # Queuing for the background writer doesn't block
+            self.memory_agent.add_memory_async(text, metadata)
+        else:
+            await asyncio.to_thread(self._store_memory, text, metadata)
+    
+    def flush_memories(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the memories of past commands are stored, e.g. before shutdown.
+        
+        Args:
+            timeout: Maximum number of seconds to wait (None waits indefinitely)
+            
+        Returns:
+            True if all memories were stored, False on timeout
+        """
+        return self.memory_agent.flush(timeout)
     
     @track_execution_time("terminal_agent")
     def _handle_voice_command(self, voice_cmd: str) -> str:
@@ -278,42 +419,293 @@ class TerminalAgent:
         logger.debug("Continuous listening thread ended")
     
     @track_execution_time("terminal_agent")
-    def _route_command(self, command: str) -> Tuple[str, str]:
+    def _route_command(self, command: str, snapshot: Optional[int] = None) -> Tuple[str, str]:
         """
         Route a command to the appropriate agent based on its content.
         
         Args:
             command: The user command
+            snapshot: Memory snapshot taken when the command started, see ContextBuilder.snapshot
             
         Returns:
             A tuple of (agent_type, response)
         """
-        logger.debug("Getting memory context for routing")
-        # Get recent context from memory
-        memory_context = self._get_memory_context()
+        agent_type = self._route_locally(command)
+        if agent_type is None:
+            # One call for routing and answering, if enabled and the LLM returns a valid envelope
+            single_call = self._handle_single_call(command, snapshot) if ROUTER_SINGLE_CALL else None
+            if single_call:
+                return single_call
+            
+            agent_type = self._route_with_llm(command, snapshot)
+            MetricsTracker().record_routing_decision("llm", agent_type)
         
-        # First, we'll ask the LLM which agent should handle this
-        logger.debug("Asking LLM to decide which agent should handle command")
-        routing_prompt = f"""
-        You are the Terminal Agent in DreamOS. Decide which agent should handle this command:
+        logger.info(f"Selected agent for handling: {agent_type}")
+        memory_context = self._get_memory_context(command, agent_type, snapshot)
         
-        Command: {command}
+        # Route to the appropriate agent
+        if agent_type == "file_agent":
+            logger.debug("Delegating to File Agent")
+            agent_response = self.file_agent.process_command(command, context=memory_context)
+        elif agent_type == "memory_agent":
+            logger.debug("Delegating to Memory Agent")
+            agent_response = self.memory_agent.process_command(command, context=memory_context)
+        elif agent_type == "plugin_agent":
+            logger.debug("Delegating to Plugin Agent")
+            result = self.plugin_agent.process_command(command, context=memory_context)
+            agent_response = result["response"]
+            self._record_tool_usage(result)
+        else:
+            # Handle with the terminal agent itself
+            logger.debug("Handling with Terminal Agent")
+            agent_response = self._handle_terminal_command(command, context=memory_context)
         
-        Choose one:
-        1. file_agent - For anything related to files, notes, reading, writing, or searching file content
-        2. memory_agent - For remembering facts, storing information, or retrieving past context
-        3. plugin_agent - For using specific tools like calculator, web search, or code execution
-        4. terminal_agent (yourself) - For system-level commands, help, or commands that don't fit the other categories
+        logger.debug(f"Agent response length: {len(agent_response)} chars")
+        return agent_type, agent_response
+    
+    @track_execution_time("terminal_agent")
+    async def _route_command_async(self, command: str, snapshot: Optional[int] = None) -> Tuple[str, str]:
+        """
+        Route a command to the appropriate agent and await its response.
         
-        Respond with just the agent name (e.g., "file_agent") and nothing else.
+        Args:
+            command: The user command
+            snapshot: Memory snapshot taken when the command started, see ContextBuilder.snapshot
+            
+        Returns:
+            A tuple of (agent_type, response)
         """
+        agent_type = await asyncio.to_thread(self._route_locally, command)
+        if agent_type is None:
+            single_call = await self._handle_single_call_async(command, snapshot) if ROUTER_SINGLE_CALL else None
+            if single_call:
+                return single_call
+            
+            agent_type = await self._route_with_llm_async(command, snapshot)
+            MetricsTracker().record_routing_decision("llm", agent_type)
+        
+        logger.info(f"Selected agent for handling: {agent_type}")
+        memory_context = await asyncio.to_thread(self._get_memory_context, command, agent_type, snapshot)
         
+        if agent_type == "file_agent":
+            logger.debug("Delegating to File Agent")
+            agent_response = await self.file_agent.process_command_async(command, context=memory_context)
+        elif agent_type == "memory_agent":
+            logger.debug("Delegating to Memory Agent")
+            agent_response = await self.memory_agent.process_command_async(command, context=memory_context)
+        elif agent_type == "plugin_agent":
+            logger.debug("Delegating to Plugin Agent")
+            result = await self.plugin_agent.process_command_async(command, context=memory_context)
+            agent_response = result["response"]
+            self._record_tool_usage(result)
+        else:
+            logger.debug("Handling with Terminal Agent")
+            agent_response = await self._handle_terminal_command_async(command, context=memory_context)
+        
+        logger.debug(f"Agent response length: {len(agent_response)} chars")
+        return agent_type, agent_response
+    
+    def _route_locally(self, command: str) -> Optional[str]:
+        """
+        Route a command from the routing cache or the fast path, without an LLM call.
+        
+        Args:
+            command: The user command
+            
+        Returns:
+            Name of the agent, or None if the LLM has to decide
+        """
+        # Repeated and confidently routable commands don't need the routing LLM call
+        cached = self.routing_cache.get(command) if self.routing_cache is not None else None
+        fast_path = self.router.route(command) if self.router and not cached else None
+        if self.routing_cache is not None:
+            MetricsTracker().record_cache_access("routing", hits=int(cached is not None), misses=int(cached is None))
+        
+        if cached:
+            logger.debug("Routing decision taken from the cache")
+            MetricsTracker().record_routing_decision("cache", cached)
+            return cached
+        if fast_path:
+            agent_type, confidence = fast_path
+            logger.debug(f"Fast path routed command with confidence {confidence:.2f}")
+            MetricsTracker().record_routing_decision("fast_path", agent_type)
+            return agent_type
+        return None
+    
+    def _record_tool_usage(self, result: Dict[str, Any]) -> None:
+        """
+        Record the tool used by the Plugin Agent, if any.
+        
+        Args:
+            result: Command processing result of the Plugin Agent
+        """
+        if "tool_used" in result:
+            tool_name = result["tool_used"]
+            self.session_tools_used.append(tool_name)
+            logger.info(f"Tool used: {tool_name}")
+    
+    def _handle_single_call(self, command: str, snapshot: Optional[int] = None) -> Optional[Tuple[str, str]]:
+        """
+        Route and answer a command with one LLM call returning a JSON envelope.
+        A chosen plugin tool is executed locally, without further LLM calls.
+        
+        Args:
+            command: The user command
+            snapshot: Memory snapshot taken when the command started, see ContextBuilder.snapshot
+            
+        Returns:
+            A tuple of (agent_type, response), or None if the envelope was invalid
+        """
+        logger.debug("Handling command with a single structured LLM call")
+        system_prompt, context, available_tools = self._single_call_request(command, snapshot)
+        
+        response = generate_agent_response(
+            system_prompt=system_prompt,
+            user_input=command,
+            context=context,
+            response_format={"type": "json_object"}
+        )
+        
+        return self._apply_envelope(command, response, available_tools)
+    
+    async def _handle_single_call_async(self, command: str, snapshot: Optional[int] = None) -> Optional[Tuple[str, str]]:
+        """
+        Route and answer a command with one awaited LLM call returning a JSON envelope.
+        
+        Args:
+            command: The user command
+            snapshot: Memory snapshot taken when the command started, see ContextBuilder.snapshot
+            
+        Returns:
+            A tuple of (agent_type, response), or None if the envelope was invalid
+        """
+        logger.debug("Handling command with a single structured LLM call")
+        system_prompt, context, available_tools = await asyncio.to_thread(self._single_call_request, command, snapshot)
+        
+        response = await generate_agent_response_async(
+            system_prompt=system_prompt,
+            user_input=command,
+            context=context,
+            response_format={"type": "json_object"}
+        )
+        
+        return await asyncio.to_thread(self._apply_envelope, command, response, available_tools)
+    
+    def _single_call_request(self, command: str, snapshot: Optional[int] = None) -> Tuple[str, str, List[str]]:
+        """
+        Prepare the single-call LLM request of a command.
+        
+        Args:
+            command: The user command
+            snapshot: Memory snapshot taken when the command started, see ContextBuilder.snapshot
+            
+        Returns:
+            A tuple of (system_prompt, context, available_tools)
+        """
+        available_tools = self.plugin_agent.get_available_tools()
+        system_prompt = render_envelope_prompt({
+            tool: self.plugin_agent.get_tool_info(tool).get("description", "No description")
+            for tool in available_tools
+        })
+        
+        # The envelope may answer for any agent, so it also gets the file listing
+        file_list = truncate_tokens("\n".join(self.file_agent.list_files()), CONTEXT_TOKEN_BUDGETS["file_list"])
+        context = f"{self._get_memory_context(command, snapshot=snapshot)}\n\nCurrent files in system:\n{file_list}"
+        return system_prompt, context, available_tools
+    
+    def _apply_envelope(self, command: str, response: str, available_tools: List[str]) -> Optional[Tuple[str, str]]:
+        """
+        Validate a single-call response and run the tool it chose.
+        
+        Args:
+            command: The user command
+            response: Raw LLM response
+            available_tools: Names of the tools the plugin agent can run
+            
+        Returns:
+            A tuple of (agent_type, response), or None if the envelope was invalid
+        """
+        envelope = parse_envelope(response, available_tools)
+        if envelope is None:
+            logger.warning("Invalid single-call response, falling back to separate routing and agent calls")
+            logger.debug(f"Rejected envelope: {response[:200]}")
+            return None
+        
+        agent_type = envelope["agent"]
+        logger.info(f"Single call handled command as {agent_type}")
+        MetricsTracker().record_routing_decision("single_call", agent_type)
+        
+        # The routing decision is as good as one from the routing call
+        if self.routing_cache is not None:
+            self.routing_cache.put(command, agent_type)
+        if self.router:
+            self.router.learn(command, agent_type)
+        
+        if envelope["tool"]:
+            result = self.plugin_agent.run_tool(envelope["tool"], envelope["tool_input"])
+            self._record_tool_usage(result)
+            return agent_type, result["response"]
+        
+        return agent_type, envelope["answer"]
+    
+    def _route_with_llm(self, command: str, snapshot: Optional[int] = None) -> str:
+        """
+        Ask the LLM which agent should handle a command.
+        
+        Args:
+            command: The user command
+            snapshot: Memory snapshot taken when the command started, see ContextBuilder.snapshot
+            
+        Returns:
+            Name of the agent
+        """
+        logger.debug("Getting memory context for routing")
+        # Routing only needs a small context, the chosen agent gets its own budget
+        memory_context = self._get_memory_context(command, "router", snapshot)
+        
+        logger.debug("Asking LLM to decide which agent should handle command")
         agent_decision = generate_agent_response(
-            system_prompt=routing_prompt,
+            system_prompt=ROUTING_PROMPT.format(command=command),
             user_input=command,
             context=memory_context
-        ).strip().lower()
+        )
+        
+        return self._select_agent(command, agent_decision)
+    
+    async def _route_with_llm_async(self, command: str, snapshot: Optional[int] = None) -> str:
+        """
+        Ask the LLM which agent should handle a command, without blocking the event loop.
         
+        Args:
+            command: The user command
+            snapshot: Memory snapshot taken when the command started, see ContextBuilder.snapshot
+            
+        Returns:
+            Name of the agent
+        """
+        memory_context = await asyncio.to_thread(self._get_memory_context, command, "router", snapshot)
+        
+        logger.debug("Asking LLM to decide which agent should handle command")
+        agent_decision = await generate_agent_response_async(
+            system_prompt=ROUTING_PROMPT.format(command=command),
+            user_input=command,
+            context=memory_context
+        )
+        
+        return await asyncio.to_thread(self._select_agent, command, agent_decision)
+    
+    def _select_agent(self, command: str, agent_decision: str) -> str:
+        """
+        Extract the agent from the routing LLM's response.
+        
+        Args:
+            command: The user command
+            agent_decision: Response of the routing LLM call
+            
+        Returns:
+            Name of the agent
+        """
+        agent_decision = agent_decision.strip().lower()
         logger.debug(f"LLM agent decision: '{agent_decision}'")
         
         # Extract just the agent name if there's extra text
@@ -326,62 +718,43 @@ class TerminalAgent:
         else:
             agent_type = "terminal_agent"
         
-        logger.info(f"Selected agent for handling: {agent_type}")
-        
-        # Route to the appropriate agent
-        if agent_type == "file_agent":
-            logger.debug("Delegating to File Agent")
-            agent_response = self.file_agent.process_command(command, context=memory_context)
-        elif agent_type == "memory_agent":
-            logger.debug("Delegating to Memory Agent")
-            agent_response = self.memory_agent.process_command(command, context=memory_context)
-        elif agent_type == "plugin_agent":
-            logger.debug("Delegating to Plugin Agent")
-            result = self.plugin_agent.process_command(command, context=memory_context)
-            agent_response = result["response"]
-            
-            # Record tool usage
-            if "tool_used" in result:
-                tool_name = result["tool_used"]
-                self.session_tools_used.append(tool_name)
-                logger.info(f"Tool used: {tool_name}")
-        else:
-            # Handle with the terminal agent itself
-            logger.debug("Handling with Terminal Agent")
-            agent_response = self._handle_terminal_command(command, context=memory_context)
+        # Clear decisions are cached and teach the local router
+        if agent_type in agent_decision:
+            if self.routing_cache is not None:
+                self.routing_cache.put(command, agent_type)
+            if self.router:
+                self.router.learn(command, agent_type)
         
-        logger.debug(f"Agent response length: {len(agent_response)} chars")
-        return agent_type, agent_response
+        return agent_type
     
-    def _get_memory_context(self) -> str:
+    def _get_memory_context(self,
+                            command: Optional[str] = None,
+                            agent_name: str = "terminal_agent",
+                            snapshot: Optional[int] = None) -> str:
         """
-        Get recent context from memory.
+        Get context from memory, within the token budget of the agent it is for.
+        
+        Args:
+            command: Optional user command used to rank memories by relevance
+            agent_name: Agent (or "router") the context is for
+            snapshot: Memory snapshot taken when the command started, see ContextBuilder.snapshot
         
         Returns:
-            String with recent memory context
+            String with relevant and recent memories and the session state
         """
-        logger.debug("Retrieving recent memories for context")
-        # Get recent memories
-        recent_memories = self.memory_agent.get_recent_memories(5)
-        recent_memory_text = "\n".join([
-            f"[{m.get('id')}] {m.get('text', '')[:100]}..." 
-            for m in recent_memories
-        ])
+        logger.debug(f"Building memory context for {agent_name}")
         
         # Get tools used in this session
-        tools_used = set(self.session_tools_used)
+        tools_used = sorted(set(self.session_tools_used))
         tools_used_text = ", ".join(tools_used) if tools_used else "None"
         logger.debug(f"Tools used in current session: {tools_used_text}")
+        notes = [f"Tools used in this session: {tools_used_text}"]
         
         # Voice interface status
-        voice_status = ""
         if self.voice_enabled:
-            voice_status = f"Voice interface is {'listening' if self.voice_listening else 'not listening'}."
+            notes.append(f"Voice interface is {'listening' if self.voice_listening else 'not listening'}.")
         
-        # Combine context
-        context = f"Recent memories:\n{recent_memory_text}\n\nTools used in this session: {tools_used_text}"
-        if voice_status:
-            context += f"\n\n{voice_status}"
+        context = self.memory_agent.context_builder.build(agent_name, command, notes, snapshot=snapshot)
         
         logger.debug(f"Memory context created, length: {len(context)} chars")
         return context
@@ -401,18 +774,9 @@ class TerminalAgent:
         logger.debug(f"Handling terminal command: '{command}'")
         
         # Check for system commands
-        if command.lower() in ["exit", "quit"]:
-            logger.info("Exit command received")
-            return "Goodbye! DreamOS session ended."
-        elif command.lower() in ["clear", "cls"]:
-            logger.info("Clear screen command received")
-            return "[Screen cleared]"
-        elif command.lower() in ["status", "system status"]:
-            logger.info("Status command received")
-            return self._generate_status()
-        elif command.lower().startswith("help"):
-            logger.info("Help command received")
-            return self._generate_help()
+        system_response = self._handle_system_command(command)
+        if system_response is not None:
+            return system_response
         
         # Use the LLM for other terminal commands
         logger.debug("Using LLM to process terminal command")
@@ -427,6 +791,57 @@ class TerminalAgent:
         logger.debug(f"LLM response length: {len(response)} chars")
         return response
     
+    @track_execution_time("terminal_agent")
+    async def _handle_terminal_command_async(self, command: str, context: Optional[str] = None) -> str:
+        """
+        Handle general terminal commands using the LLM, without blocking the event loop.
+        
+        Args:
+            command: The user command
+            context: Optional context from memory
+            
+        Returns:
+            Response to the user
+        """
+        logger.debug(f"Handling terminal command asynchronously: '{command}'")
+        
+        system_response = self._handle_system_command(command)
+        if system_response is not None:
+            return system_response
+        
+        response = await generate_agent_response_async(
+            system_prompt=self.system_prompt,
+            user_input=command,
+            context=context or ""
+        )
+        
+        logger.debug(f"LLM response length: {len(response)} chars")
+        return response
+    
+    def _handle_system_command(self, command: str) -> Optional[str]:
+        """
+        Answer the built-in system commands.
+        
+        Args:
+            command: The user command
+            
+        Returns:
+            Response to the user, or None if the command isn't a system command
+        """
+        if command.lower() in ["exit", "quit"]:
+            logger.info("Exit command received")
+            return "Goodbye! DreamOS session ended."
+        elif command.lower() in ["clear", "cls"]:
+            logger.info("Clear screen command received")
+            return "[Screen cleared]"
+        elif command.lower() in ["status", "system status"]:
+            logger.info("Status command received")
+            return self._generate_status()
+        elif command.lower().startswith("help"):
+            logger.info("Help command received")
+            return self._generate_help()
+        return None
+    
     def _generate_help(self) -> str:
         """
         Generate help text for the user.
@@ -503,7 +918,7 @@ and route your request to the appropriate agent.
         logger.info("Generating status message")
         
         # Count memories
-        memory_count = len(self.memory_agent.get_all_memories())
+        memory_count = self.memory_agent.count_memories()
         
         # Count files
         files = self.file_agent.list_files()
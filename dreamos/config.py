@@ -28,6 +28,109 @@ LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-70b-versatile")
 # Runtime Settings
 DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
 DEFAULT_MEMORY_K = int(os.getenv("DEFAULT_MEMORY_K", "5"))
+# Worker threads for the blocking steps (memory, tools) of commands served by the web interface's event loop
+ASYNC_WORKER_THREADS = int(os.getenv("ASYNC_WORKER_THREADS", "16"))
+# Embedding backend for memories: hashing (offline, deterministic n-gram features) or a registered backend
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashing").lower()
+# Embedding cache: vectors kept in memory (entries) and on disk (MB, shared by all processes); 0 disables a tier
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_DISK_MB = float(os.getenv("EMBEDDING_CACHE_DISK_MB", "256"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(VECTOR_DB_PATH, "embedding_cache.db"))
+
+# Vector Store Settings
+# Memory-map the index read-only on load so processes share the page cache; copied on the first write
+VECTOR_MMAP = os.getenv("VECTOR_MMAP", "true").lower() == "true"
+# Number of write-ahead log records after which the log is folded into the index files
+VECTOR_CHECKPOINT_INTERVAL = int(os.getenv("VECTOR_CHECKPOINT_INTERVAL", "1000"))
+VECTOR_WAL_FSYNC = os.getenv("VECTOR_WAL_FSYNC", "true").lower() == "true"
+# Lock the store files so several worker processes can share a store (needs fcntl, i.e. not Windows)
+VECTOR_PROCESS_LOCK = os.getenv("VECTOR_PROCESS_LOCK", "true").lower() == "true"
+# Fraction of deleted (tombstoned) entries that triggers a background index compaction
+VECTOR_COMPACTION_RATIO = float(os.getenv("VECTOR_COMPACTION_RATIO", "0.2"))
+# Index type for new stores: flat, ivf_flat, ivf_pq or hnsw
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat").lower()
+# Approximate index a flat store is migrated to once it holds VECTOR_ANN_THRESHOLD memories (0 disables)
+VECTOR_ANN_INDEX_TYPE = os.getenv("VECTOR_ANN_INDEX_TYPE", "hnsw").lower()
+VECTOR_ANN_THRESHOLD = int(os.getenv("VECTOR_ANN_THRESHOLD", "100000"))
+# Automatic migrations are discarded if the new index's recall@10 against exact search is below this
+VECTOR_MIN_RECALL = float(os.getenv("VECTOR_MIN_RECALL", "0.9"))
+# Vector storage codec: none (float32), fp16, sq8 (8-bit scalar), pq (product quantization) or pca
+VECTOR_CODEC = os.getenv("VECTOR_CODEC", "none").lower()
+# Trained codecs (sq8, pq, pca) are applied once the store holds this many memories
+VECTOR_CODEC_MIN_TRAIN = int(os.getenv("VECTOR_CODEC_MIN_TRAIN", "10000"))
+VECTOR_PCA_DIM = int(os.getenv("VECTOR_PCA_DIM", "256"))
+# ANN tuning (VECTOR_IVF_NLIST=0 sizes the partitions from the corpus size)
+VECTOR_IVF_NLIST = int(os.getenv("VECTOR_IVF_NLIST", "0"))
+VECTOR_PQ_M = int(os.getenv("VECTOR_PQ_M", "64"))
+VECTOR_NPROBE = int(os.getenv("VECTOR_NPROBE", "16"))
+VECTOR_HNSW_M = int(os.getenv("VECTOR_HNSW_M", "32"))
+VECTOR_HNSW_EF_SEARCH = int(os.getenv("VECTOR_HNSW_EF_SEARCH", "64"))
+# Filtered searches matching at most this many memories scan them exactly on approximate indexes
+VECTOR_FILTER_EXACT_LIMIT = int(os.getenv("VECTOR_FILTER_EXACT_LIMIT", "4096"))
+# Concurrent searches arriving within this window are run as one batch (0 disables coalescing)
+VECTOR_SEARCH_BATCH_WINDOW_MS = float(os.getenv("VECTOR_SEARCH_BATCH_WINDOW_MS", "2"))
+VECTOR_SEARCH_MAX_BATCH = int(os.getenv("VECTOR_SEARCH_MAX_BATCH", "64"))
+# Number of newest memories kept in memory for recent-memory lookups
+VECTOR_RECENT_CACHE_SIZE = int(os.getenv("VECTOR_RECENT_CACHE_SIZE", "100"))
+
+# Memory Namespaces
+# Which memories a web session sees: shared (one store for everyone), session or user
+MEMORY_NAMESPACE_MODE = os.getenv("MEMORY_NAMESPACE_MODE", "shared").lower()
+# Non-shared namespaces are closed after this many idle seconds, or when more than the maximum are open
+MEMORY_NAMESPACE_IDLE_SECONDS = float(os.getenv("MEMORY_NAMESPACE_IDLE_SECONDS", "900"))
+MEMORY_MAX_OPEN_NAMESPACES = int(os.getenv("MEMORY_MAX_OPEN_NAMESPACES", "32"))
+# Web sessions idle for this many seconds are closed, and their session namespaces deleted (0 keeps them)
+MEMORY_SESSION_TTL_SECONDS = float(os.getenv("MEMORY_SESSION_TTL_SECONDS", "86400"))
+# Merge repeated memories into the existing one (bumping seen_count and last_seen) instead of adding them.
+# Off by default: with it on, repeated commands no longer get a memory and timestamp of their own
+MEMORY_DEDUP = os.getenv("MEMORY_DEDUP", "false").lower() == "true"
+# Near-duplicate cutoff: squared distance to the nearest memory relative to the squared norm (0 = exact only)
+MEMORY_DEDUP_THRESHOLD = float(os.getenv("MEMORY_DEDUP_THRESHOLD", "0.01"))
+# Write command memories from a background thread, committing batches after a short linger window
+MEMORY_ASYNC_WRITES = os.getenv("MEMORY_ASYNC_WRITES", "true").lower() == "true"
+MEMORY_WRITE_LINGER_MS = float(os.getenv("MEMORY_WRITE_LINGER_MS", "20"))
+MEMORY_WRITE_MAX_BATCH = int(os.getenv("MEMORY_WRITE_MAX_BATCH", "64"))
+# Memory search mode: vector, lexical (BM25 keyword search) or hybrid (both, fused by reciprocal rank)
+MEMORY_SEARCH_MODE = os.getenv("MEMORY_SEARCH_MODE", "hybrid").lower()
+# Candidates taken from each ranking in hybrid mode, and the rank offset of the fusion
+MEMORY_HYBRID_CANDIDATES = int(os.getenv("MEMORY_HYBRID_CANDIDATES", "50"))
+MEMORY_RRF_K = int(os.getenv("MEMORY_RRF_K", "60"))
+
+# Command Routing
+# Route confidently classified commands locally instead of asking the LLM which agent should handle them
+ROUTER_FAST_PATH = os.getenv("ROUTER_FAST_PATH", "true").lower() == "true"
+# Minimum classifier probability for a local decision between agents whose keyword rules all match
+# (0 calibrates it at startup on held-out labelled commands)
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0"))
+# Cache of LLM routing decisions by normalized command (size 0 disables), optionally persisted to an SQLite file
+ROUTING_CACHE_SIZE = int(os.getenv("ROUTING_CACHE_SIZE", "512"))
+ROUTING_CACHE_TTL_SECONDS = float(os.getenv("ROUTING_CACHE_TTL_SECONDS", "86400"))
+ROUTING_CACHE_PATH = os.getenv("ROUTING_CACHE_PATH", "")
+# Let one LLM call pick the agent and answer (as a JSON envelope) when the cache and fast path can't route;
+# invalid envelopes fall back to the separate routing and agent calls
+ROUTER_SINGLE_CALL = os.getenv("ROUTER_SINGLE_CALL", "false").lower() == "true"
+
+# Prompt Context
+# Tokenizer used to measure prompt context (an estimate of 4 characters per token is used if it can't be loaded)
+CONTEXT_TOKEN_ENCODING = os.getenv("CONTEXT_TOKEN_ENCODING", "cl100k_base")
+# Token budget of the context sent with each kind of LLM call
+CONTEXT_TOKEN_BUDGETS = {
+    name: int(os.getenv(f"CONTEXT_BUDGET_{name.upper()}", default))
+    for name, default in (
+        ("router", "192"),
+        ("terminal_agent", "768"),
+        ("file_agent", "768"),
+        ("file_list", "512"),
+        ("memory_agent", "1024"),
+        ("plugin_agent", "512")
+    )
+}
+# Longest a single memory may be in the context, in tokens
+CONTEXT_ITEM_MAX_TOKENS = int(os.getenv("CONTEXT_ITEM_MAX_TOKENS", "128"))
+# Memories considered for the context from each ranking (related to the command, facts, most recent)
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "10"))
+# Rendered contexts cached until the memories change
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "128"))
 
 # Logging Configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
@@ -188,6 +188,8 @@ def main():
     else:
         run_cli(terminal_agent)
     
+    # Memories of the last commands may still be queued
+    terminal_agent.flush_memories()
     logger.info("DreamOS shutdown complete")
 
 if __name__ == "__main__":
@@ -3,5 +3,6 @@ Memory modules for DreamOS
 """
 
 from .vector_store import VectorStore
+from .store_manager import VectorStoreManager, get_store_manager
 
-__all__ = ["VectorStore"] 
\ No newline at end of file
+__all__ = ["VectorStore", "VectorStoreManager", "get_store_manager"] 
\ No newline at end of file
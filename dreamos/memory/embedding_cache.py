@@ -0,0 +1,350 @@
+"""
+Embedding cache for DreamOS.
+Repeated texts such as commands and re-run searches are embedded once: vectors
+are kept in an in-process LRU and in an SQLite file shared by all processes,
+keyed by the embedder name and a hash of the text.
+"""
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config import (
+    DEBUG_MODE, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_DISK_MB, EMBEDDING_CACHE_PATH
+)
+from ..utils.metrics import MetricsTracker
+from .embeddings import Embedder
+
+# Rough per-row overhead of the SQLite table, used for the disk size budget
+_ROW_OVERHEAD = 96
+
+# Hits refresh a row's last use at most this often, so reads rarely write
+_TOUCH_INTERVAL = 3600
+
+# Eviction trims the disk tier to this fraction of its budget
+_EVICT_TO = 0.9
+
+
+def text_key(text: str) -> bytes:
+    """
+    Hash a text for the cache key.
+
+    Args:
+        text: Text that is embedded
+
+    Returns:
+        SHA-256 digest of the UTF-8 text
+    """
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of embedding vectors.
+    The LRU holds up to max_entries vectors in memory; the disk tier keeps up
+    to max_disk_mb of vectors and drops the least recently used ones beyond that.
+    """
+
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 max_entries: Optional[int] = None,
+                 max_disk_mb: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: Path of the SQLite cache file
+            max_entries: Maximum number of vectors in memory (0 disables the LRU)
+            max_disk_mb: Size budget of the disk tier in MB (0 disables it)
+        """
+        self.db_path = db_path or EMBEDDING_CACHE_PATH
+        self.max_entries = max_entries if max_entries is not None else EMBEDDING_CACHE_SIZE
+        max_disk_mb = max_disk_mb if max_disk_mb is not None else EMBEDDING_CACHE_DISK_MB
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+
+        self._lock = threading.Lock()
+
+        # Vectors by (embedder name, text key), least recently used first
+        self._lru = OrderedDict()
+
+        self._conn = None
+        self._disk_bytes = 0
+        if self.max_disk_bytes > 0:
+            self._open_disk()
+
+    def _open_disk(self) -> None:
+        """Open the SQLite file of the disk tier and create its table."""
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    embedder TEXT NOT NULL,
+                    key BLOB NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used INTEGER NOT NULL,
+                    PRIMARY KEY (embedder, key)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._disk_bytes = self._measure_disk()
+
+    def _measure_disk(self) -> int:
+        """
+        Measure the size of the disk tier. Must be called with the lock held or before sharing the cache.
+
+        Returns:
+            Approximate size in bytes
+        """
+        rows, vector_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+        return vector_bytes + rows * _ROW_OVERHEAD
+
+    def get_many(self, embedder_name: str, keys: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Look up vectors, first in memory and then on disk.
+        Disk hits are promoted into the LRU.
+
+        Args:
+            embedder_name: Name of the embedder that produced the vectors
+            keys: Text keys to look up
+
+        Returns:
+            Dictionary of the cached vectors by key
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                vector = self._lru.get((embedder_name, key))
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._lru.move_to_end((embedder_name, key))
+                    found[key] = vector
+
+        memory_hits = len(found)
+        disk_hits = 0
+        if missing and self._conn is not None:
+            disk_found = self._read_disk(embedder_name, missing)
+            disk_hits = len(disk_found)
+            if disk_found:
+                found.update(disk_found)
+                self._put_memory(embedder_name, disk_found)
+
+        metrics = MetricsTracker()
+        metrics.record_cache_access("embedding_memory", memory_hits, len(missing))
+        if self._conn is not None and missing:
+            metrics.record_cache_access("embedding_disk", disk_hits, len(missing) - disk_hits)
+
+        return found
+
+    def _read_disk(self, embedder_name: str, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Read vectors from the disk tier and refresh the last use of stale hits.
+
+        Args:
+            embedder_name: Name of the embedder
+            keys: Text keys missing from memory
+
+        Returns:
+            Dictionary of the vectors found by key
+        """
+        found = {}
+        now = int(time.time())
+        stale = []
+        with self._lock:
+            # Stay below SQLite's limit on query parameters
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, last_used FROM embeddings WHERE embedder = ? AND key IN ({placeholders})",
+                    [embedder_name, *chunk]
+                ).fetchall()
+                for key, blob, last_used in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+                    if now - last_used > _TOUCH_INTERVAL:
+                        stale.append((now, embedder_name, key))
+
+            if stale:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE embedder = ? AND key = ?", stale
+                    )
+        return found
+
+    def _put_memory(self, embedder_name: str, vectors: Dict[bytes, np.ndarray]) -> None:
+        """
+        Add vectors to the LRU, evicting the least recently used ones above the limit.
+
+        Args:
+            embedder_name: Name of the embedder
+            vectors: Vectors by text key
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for key, vector in vectors.items():
+                self._lru[(embedder_name, key)] = vector
+                self._lru.move_to_end((embedder_name, key))
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def put_many(self, embedder_name: str, vectors: Dict[bytes, np.ndarray]) -> None:
+        """
+        Store freshly computed vectors in both tiers.
+
+        Args:
+            embedder_name: Name of the embedder that produced the vectors
+            vectors: Vectors by text key
+        """
+        if not vectors:
+            return
+
+        # Cached vectors are shared between callers, so they must not change
+        vectors = {key: np.array(vector, dtype=np.float32) for key, vector in vectors.items()}
+        for vector in vectors.values():
+            vector.flags.writeable = False
+        self._put_memory(embedder_name, vectors)
+
+        if self._conn is None:
+            return
+
+        now = int(time.time())
+        rows = [(embedder_name, key, vector.tobytes(), now) for key, vector in vectors.items()]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (embedder, key, vector, last_used) VALUES (?, ?, ?, ?)", rows
+                )
+            self._disk_bytes += sum(len(row[2]) + _ROW_OVERHEAD for row in rows)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Drop the least recently used rows of the disk tier until it fits its budget. Must be called with the lock held."""
+        # Other processes write to the same file, so measure instead of trusting the running total
+        self._disk_bytes = self._measure_disk()
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+
+        rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        row_bytes = self._disk_bytes / max(rows, 1)
+        excess = int((self._disk_bytes - self.max_disk_bytes * _EVICT_TO) / row_bytes) + 1
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+        self._disk_bytes = self._measure_disk()
+
+        if DEBUG_MODE:
+            print(f"Evicted {excess} embeddings from the disk cache")
+
+    def clear(self) -> None:
+        """Empty both tiers."""
+        with self._lock:
+            self._lru.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM embeddings")
+                self._disk_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the cache.
+
+        Returns:
+            Dictionary with the entries in memory and the size of the disk tier
+        """
+        with self._lock:
+            return {
+                "memory_entries": len(self._lru),
+                "max_memory_entries": self.max_entries,
+                "disk_bytes": self._disk_bytes if self._conn is not None else 0,
+                "max_disk_bytes": self.max_disk_bytes
+            }
+
+    def close(self) -> None:
+        """Close the SQLite file of the disk tier."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CachedEmbedder(Embedder):
+    """
+    Embedder that answers repeated texts from an EmbeddingCache.
+    It has the name and dimension of the wrapped embedder, so stores can't
+    tell the two apart.
+    """
+
+    def __init__(self, embedder: Embedder, cache: Optional[EmbeddingCache] = None):
+        """
+        Initialize the cached embedder.
+
+        Args:
+            embedder: Embedder computing the vectors on cache misses
+            cache: Cache to use (defaults to the process-wide cache)
+        """
+        self.embedder = embedder
+        self.cache = cache or get_embedding_cache()
+        self.dim = embedder.dim
+        self.name = embedder.name
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a batch of texts, computing only the ones not in the cache.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 matrix with one row per text
+        """
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        keys = [text_key(text) for text in texts]
+        found = self.cache.get_many(self.name, keys)
+
+        # Embed each missing text once, even if the batch repeats it
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.embedder.embed(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            self.cache.put_many(self.name, computed)
+            found.update(computed)
+
+        return np.stack([found[key] for key in keys]).astype(np.float32, copy=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Get the process-wide embedding cache.
+
+    Returns:
+        Shared EmbeddingCache instance
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
@@ -0,0 +1,234 @@
+"""
+Text embedding backends for DreamOS memories.
+Embedders turn a list of texts into one matrix of vectors. The built-in
+hashing backend runs offline and gives the same vectors in every process.
+"""
+import re
+import zlib
+from typing import List, Dict, Callable, Optional, Sequence
+
+import numpy as np
+
+from ..config import EMBEDDING_BACKEND
+
+_WORD = re.compile(r"\w+")
+
+# Constants of the splitmix64 finalizer, used to mix 64-bit hashes
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """Scramble an array of uint64 hashes so that all output bits depend on all input bits."""
+    x = (x ^ (x >> np.uint64(30))) * _MIX_1
+    x = (x ^ (x >> np.uint64(27))) * _MIX_2
+    return x ^ (x >> np.uint64(31))
+
+
+class Embedder:
+    """
+    Interface of an embedding backend.
+    Subclasses set dim and name and implement embed.
+    """
+
+    dim = 0
+    name = "base"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 matrix with one row per text
+        """
+        raise NotImplementedError
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """
+        Embed a single text.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            float32 vector
+        """
+        return self.embed([text])[0]
+
+
+class HashingEmbedder(Embedder):
+    """
+    Offline, deterministic embedder based on hashed n-gram features.
+    Character n-grams and words of the lowercased text are hashed with fixed
+    hash functions (never Python's randomized hash()) and projected into
+    dim dimensions by a sparse random projection that is derived from the
+    hashes, so no projection matrix has to be stored. Rows are L2-normalized,
+    so L2 distance ranks like cosine similarity. Texts sharing words or word
+    fragments get similar vectors; there is no semantic knowledge.
+    """
+
+    def __init__(self,
+                 dim: int = 768,
+                 ngram_sizes: Sequence[int] = (3, 4, 5),
+                 projections: int = 2,
+                 word_weight: float = 2.0,
+                 seed: int = 0):
+        """
+        Initialize the embedder.
+
+        Args:
+            dim: Dimension of the vectors
+            ngram_sizes: Lengths of the character n-grams, in UTF-8 bytes
+            projections: Number of dimensions each feature is added to
+            word_weight: Weight of whole-word features relative to n-grams
+            seed: Seed of the projection, vectors only compare within one seed
+        """
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.projections = projections
+        self.word_weight = word_weight
+        self.seed = seed
+        self.name = f"hashing-{dim}-{'-'.join(map(str, self.ngram_sizes))}-{projections}-{seed}"
+
+        # One salt per projection, so the same feature lands in independent dimensions
+        self._salts = _mix(np.arange(1, projections + 1, dtype=np.uint64) + np.uint64(seed) * np.uint64(1 << 32))
+
+    def _ngram_features(self, codes: np.ndarray, owners: np.ndarray):
+        """
+        Hash the character n-grams of a batch of concatenated texts.
+
+        Args:
+            codes: Bytes of all texts, concatenated, as uint64
+            owners: Index of the text each byte belongs to
+
+        Returns:
+            Tuple of (hashes, text indexes) of the n-grams that don't cross texts
+        """
+        hashes = []
+        rows = []
+        for n in self.ngram_sizes:
+            count = len(codes) - n + 1
+            if count <= 0:
+                continue
+
+            # FNV-style polynomial hash of each window, vectorized over all positions
+            h = np.full(count, n, dtype=np.uint64)
+            for offset in range(n):
+                h = (h * _FNV_PRIME) ^ codes[offset:offset + count]
+
+            valid = owners[:count] == owners[n - 1:n - 1 + count]
+            hashes.append(h[valid])
+            rows.append(owners[:count][valid])
+
+        if not hashes:
+            return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+        return np.concatenate(hashes), np.concatenate(rows)
+
+    def _word_features(self, texts: Sequence[str]):
+        """
+        Hash the words of each text.
+
+        Args:
+            texts: Lowercased texts
+
+        Returns:
+            Tuple of (hashes, text indexes)
+        """
+        hashes = []
+        rows = []
+        for row, text in enumerate(texts):
+            for word in _WORD.findall(text):
+                hashes.append(zlib.crc32(word.encode("utf-8")))
+                rows.append(row)
+        return np.array(hashes, dtype=np.uint64), np.array(rows, dtype=np.int64)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a batch of texts with a few vectorized passes over all of them.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 matrix with one L2-normalized row per text (zero rows for empty texts)
+        """
+        texts = [text.lower() for text in texts]
+        num_texts = len(texts)
+        if num_texts == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        # Pad each text with spaces so n-grams mark the start and end of words
+        encoded = [f" {text} ".encode("utf-8") for text in texts]
+        lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=num_texts)
+        codes = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        owners = np.repeat(np.arange(num_texts, dtype=np.int64), lengths)
+
+        ngram_hashes, ngram_rows = self._ngram_features(codes, owners)
+        word_hashes, word_rows = self._word_features(texts)
+
+        hashes = np.concatenate([ngram_hashes, word_hashes])
+        rows = np.concatenate([ngram_rows, word_rows])
+        weights = np.concatenate([
+            np.ones(len(ngram_hashes), dtype=np.float64),
+            np.full(len(word_hashes), self.word_weight, dtype=np.float64)
+        ])
+
+        # Sparse random projection: each feature adds +-weight to a few hashed dimensions
+        matrix = np.zeros(num_texts * self.dim, dtype=np.float64)
+        for salt in self._salts:
+            mixed = _mix(hashes ^ salt)
+            columns = (mixed % np.uint64(self.dim)).astype(np.int64)
+            signs = np.where(mixed >> np.uint64(63), -1.0, 1.0)
+            matrix += np.bincount(rows * self.dim + columns, weights=signs * weights, minlength=num_texts * self.dim)
+
+        matrix = matrix.reshape(num_texts, self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix.astype(np.float32)
+
+
+_BACKENDS: Dict[str, Callable[..., Embedder]] = {
+    "hashing": HashingEmbedder
+}
+
+
+def register_embedder(name: str, factory: Callable[..., Embedder]) -> None:
+    """
+    Register an embedding backend, e.g. one wrapping a neural embedding model.
+
+    Args:
+        name: Backend name used in EMBEDDING_BACKEND
+        factory: Callable taking keyword options (at least dim) and returning an Embedder
+    """
+    _BACKENDS[name] = factory
+
+
+def get_embedder(name: Optional[str] = None, **options) -> Embedder:
+    """
+    Create an embedder.
+
+    Args:
+        name: Backend name (defaults to EMBEDDING_BACKEND)
+        **options: Options passed to the backend, e.g. dim
+
+    Returns:
+        Embedder instance
+    """
+    name = name or EMBEDDING_BACKEND
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name} (available: {', '.join(sorted(_BACKENDS))})")
+    return _BACKENDS[name](**options)
+
+
+def available_embedders() -> List[str]:
+    """
+    Get the names of the registered backends.
+
+    Returns:
+        Sorted list of backend names
+    """
+    return sorted(_BACKENDS)
@@ -0,0 +1,468 @@
+"""
+FAISS index factory for the DreamOS vector store.
+Builds exact and approximate indexes that store vectors under memory IDs.
+"""
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import faiss
+
+from ..config import (
+    VECTOR_IVF_NLIST, VECTOR_PQ_M, VECTOR_HNSW_M, VECTOR_NPROBE, VECTOR_HNSW_EF_SEARCH, VECTOR_PCA_DIM
+)
+
+# Supported index types
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Supported storage codecs: raw float32, float16, 8-bit scalar quantization,
+# product quantization and PCA dimensionality reduction
+CODECS = ("none", "fp16", "sq8", "pq", "pca")
+
+# Codecs each index type can store its vectors with. Selector-filtered
+# search isn't available on flat PQ, and IVF can't sit behind a transform.
+_INDEX_CODECS = {
+    "flat": ("none", "fp16", "sq8", "pca"),
+    "hnsw": ("none", "fp16", "sq8", "pq", "pca"),
+    "ivf_flat": ("none", "fp16", "sq8", "pq"),
+    "ivf_pq": ("pq",)
+}
+
+# Scalar quantizer types of the scalar codecs
+_SQ_TYPES = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit
+}
+
+
+def codec_supported(index_type: str, codec: str) -> bool:
+    """
+    Check whether an index type can store its vectors with a codec.
+
+    Args:
+        index_type: One of INDEX_TYPES
+        codec: One of CODECS
+
+    Returns:
+        True if the combination is supported
+    """
+    return codec in _INDEX_CODECS.get(index_type, ())
+
+
+def resolve_codec(index_type: str, codec: Optional[str] = None) -> str:
+    """
+    Pick the codec an index type uses for a requested codec.
+    Unsupported codecs fall back to the type's default.
+
+    Args:
+        index_type: One of INDEX_TYPES
+        codec: Requested codec, or None for the default
+
+    Returns:
+        One of CODECS
+    """
+    if codec is not None and codec_supported(index_type, codec):
+        return codec
+    return _INDEX_CODECS[index_type][0]
+
+
+def codec_needs_training(codec: str) -> bool:
+    """
+    Check whether a codec must be trained on sample vectors before use.
+
+    Args:
+        codec: One of CODECS
+
+    Returns:
+        True if the codec needs training
+    """
+    return codec in ("sq8", "pq", "pca")
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """Get the number of PQ sub-quantizers, which must divide the dimension."""
+    m = min(VECTOR_PQ_M, dim)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def create_index(index_type: str, dim: int, num_vectors: int = 0, codec: Optional[str] = None) -> faiss.Index:
+    """
+    Create an empty index of the given type.
+    IVF indexes and trained codecs must be trained before vectors can be added.
+
+    Args:
+        index_type: One of INDEX_TYPES
+        dim: Vector dimension
+        num_vectors: Expected number of vectors, used to size IVF partitions
+        codec: Storage codec, one of CODECS (defaults to the type's default)
+
+    Returns:
+        Empty FAISS index supporting add_with_ids
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}. Available types: {', '.join(INDEX_TYPES)}")
+
+    codec = codec or resolve_codec(index_type)
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}. Available codecs: {', '.join(CODECS)}")
+    if not codec_supported(index_type, codec):
+        raise ValueError(f"Codec {codec} is not supported for {index_type} indexes")
+
+    # PCA projects the vectors to fewer dimensions before they are stored
+    stored_dim = min(VECTOR_PCA_DIM, dim) if codec == "pca" else dim
+
+    if index_type == "flat":
+        if codec in _SQ_TYPES:
+            inner = faiss.IndexScalarQuantizer(dim, _SQ_TYPES[codec], faiss.METRIC_L2)
+        else:
+            inner = faiss.IndexFlatL2(stored_dim)
+    elif index_type == "hnsw":
+        if codec in _SQ_TYPES:
+            inner = faiss.IndexHNSWSQ(dim, _SQ_TYPES[codec], VECTOR_HNSW_M)
+        elif codec == "pq":
+            inner = faiss.IndexHNSWPQ(dim, _pq_subquantizers(dim), VECTOR_HNSW_M)
+        else:
+            inner = faiss.IndexHNSWFlat(stored_dim, VECTOR_HNSW_M)
+        inner.hnsw.efSearch = VECTOR_HNSW_EF_SEARCH
+    else:
+        nlist = VECTOR_IVF_NLIST or max(1, int(4 * np.sqrt(max(num_vectors, 1))))
+        quantizer = faiss.IndexFlatL2(dim)
+        if codec == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), 8)
+        elif codec in _SQ_TYPES:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, _SQ_TYPES[codec])
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        index.nprobe = VECTOR_NPROBE
+
+        # IVF stores IDs natively; a hash table direct map allows lookups by ID
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+
+    if codec == "pca":
+        inner = faiss.IndexPreTransform(faiss.PCAMatrix(dim, stored_dim), inner)
+    return faiss.IndexIDMap2(inner)
+
+
+def _base_index(index: faiss.Index) -> faiss.Index:
+    """Get the index that searches the vectors, below the ID map and any transform."""
+    if isinstance(index, faiss.IndexIDMap2):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexPreTransform):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def _vector_storage(index: faiss.Index) -> faiss.Index:
+    """Get the index that holds the encoded vectors."""
+    base = _base_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.downcast_index(base.storage)
+    return base
+
+
+def get_index_type(index: faiss.Index) -> str:
+    """
+    Determine the index type of an index built by create_index.
+    An ivf_flat index with the pq codec has the same structure as an ivf_pq
+    index and is reported as ivf_pq; see stored_index_type.
+
+    Args:
+        index: FAISS index
+
+    Returns:
+        One of INDEX_TYPES
+    """
+    inner = _base_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def stored_index_type(index: faiss.Index, index_type: Optional[str]) -> str:
+    """
+    Check the index type an index was built as against its structure.
+
+    Args:
+        index: FAISS index built by create_index
+        index_type: Type the index was recorded as, or None if unknown
+
+    Returns:
+        The recorded type if the index has its structure, otherwise get_index_type
+    """
+    actual = get_index_type(index)
+    if index_type == "ivf_flat" and actual == "ivf_pq":
+        return index_type
+    return actual
+
+
+def get_index_codec(index: faiss.Index) -> str:
+    """
+    Determine the storage codec of an index built by create_index.
+
+    Args:
+        index: FAISS index
+
+    Returns:
+        One of CODECS
+    """
+    if isinstance(index, faiss.IndexIDMap2) and isinstance(faiss.downcast_index(index.index), faiss.IndexPreTransform):
+        return "pca"
+
+    storage = _vector_storage(index)
+    if isinstance(storage, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "fp16" if storage.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    if isinstance(storage, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+    return "none"
+
+
+def vector_bytes(index: faiss.Index) -> int:
+    """
+    Get the memory taken by the encoded vectors of an index.
+    Graph links, ID maps and coarse quantizers are not included.
+
+    Args:
+        index: FAISS index built by create_index
+
+    Returns:
+        Size in bytes
+    """
+    return _vector_storage(index).code_size * index.ntotal
+
+
+def train_index(index: faiss.Index, vectors: np.ndarray, max_training_points: int = 100000) -> None:
+    """
+    Train an index on a sample of the vectors if it requires training.
+
+    Args:
+        index: FAISS index
+        vectors: Vectors to sample from
+        max_training_points: Upper bound on the training sample size
+    """
+    if index.is_trained:
+        return
+
+    if len(vectors) > max_training_points:
+        rng = np.random.default_rng(0)
+        vectors = vectors[rng.choice(len(vectors), max_training_points, replace=False)]
+    index.train(vectors)
+
+
+def prepare_loaded_index(index: faiss.Index) -> faiss.Index:
+    """
+    Re-apply search-time settings to an index read from disk.
+
+    Args:
+        index: FAISS index
+
+    Returns:
+        The same index
+    """
+    index_type = get_index_type(index)
+    if index_type == "hnsw":
+        _base_index(index).hnsw.efSearch = VECTOR_HNSW_EF_SEARCH
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        index.nprobe = VECTOR_NPROBE
+    return index
+
+
+def copy_index(index: faiss.Index, mapped: bool = False) -> faiss.Index:
+    """
+    Copy an index into process memory.
+
+    Args:
+        index: FAISS index
+        mapped: Whether the index is a memory-mapped view of its file
+
+    Returns:
+        Writable copy of the index
+    """
+    if mapped:
+        # Clones of a memory-mapped index keep viewing the file, so round-trip through serialization
+        new_index = faiss.deserialize_index(faiss.serialize_index(index))
+    else:
+        new_index = faiss.clone_index(index)
+    return prepare_loaded_index(new_index)
+
+
+def search_parameters(index: faiss.Index, selector: Optional[faiss.IDSelector]) -> Optional[faiss.SearchParameters]:
+    """
+    Build search parameters carrying an ID selector for the index type.
+
+    Args:
+        index: FAISS index
+        selector: ID selector restricting the search, or None
+
+    Returns:
+        Search parameters, or None if no selector is given
+    """
+    if selector is None:
+        return None
+
+    index_type = get_index_type(index)
+    if index_type == "hnsw":
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=VECTOR_HNSW_EF_SEARCH)
+    if index_type in ("ivf_flat", "ivf_pq"):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """
+    Check whether vectors can be removed from the index in place.
+
+    Args:
+        index: FAISS index
+
+    Returns:
+        True if remove_ids is supported
+    """
+    return get_index_type(index) != "hnsw"
+
+
+def remove_ids(index: faiss.Index, ids: np.ndarray) -> int:
+    """
+    Remove vectors from the index by ID.
+
+    Args:
+        index: FAISS index supporting removal
+        ids: IDs to remove
+
+    Returns:
+        Number of vectors removed
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if get_index_type(index) in ("ivf_flat", "ivf_pq"):
+        # The hash table direct map only accepts array selectors
+        return index.remove_ids(faiss.IDSelectorArray(ids))
+    return index.remove_ids(faiss.IDSelectorBatch(ids))
+
+
+def get_ids(index: faiss.Index) -> np.ndarray:
+    """
+    Get the IDs of all vectors in an index.
+
+    Args:
+        index: FAISS index built by create_index
+
+    Returns:
+        Array of memory IDs
+    """
+    if index.ntotal == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if isinstance(index, faiss.IndexIDMap2):
+        return faiss.vector_to_array(index.id_map).astype(np.int64)
+
+    # IVF: collect IDs from the inverted lists
+    invlists = index.invlists
+    return np.concatenate([
+        faiss.rev_swig_ptr(invlists.get_ids(list_no), invlists.list_size(list_no)).copy()
+        for list_no in range(index.nlist)
+        if invlists.list_size(list_no)
+    ]).astype(np.int64)
+
+
+def extract_vectors(index: faiss.Index) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Copy all vectors and their IDs out of an index.
+    Vectors from compressed indexes are approximate reconstructions.
+
+    Args:
+        index: FAISS index built by create_index
+
+    Returns:
+        Tuple of (vectors, ids)
+    """
+    if index.ntotal == 0:
+        return np.empty((0, index.d), dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    ids = get_ids(index)
+    if isinstance(index, faiss.IndexIDMap2):
+        return index.index.reconstruct_n(0, index.ntotal), ids
+
+    # IVF: look the vectors up by ID
+    return index.reconstruct_batch(ids), ids
+
+
+def build_index(index_type: str, vectors: np.ndarray, ids: np.ndarray, codec: Optional[str] = None) -> faiss.Index:
+    """
+    Create, train and fill an index.
+
+    Args:
+        index_type: One of INDEX_TYPES
+        vectors: Vectors to add
+        ids: Memory IDs of the vectors
+        codec: Storage codec, one of CODECS (defaults to the type's default)
+
+    Returns:
+        Populated FAISS index
+    """
+    index = create_index(index_type, vectors.shape[1], len(vectors), codec)
+    train_index(index, vectors)
+    if len(vectors):
+        index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), np.asarray(ids, dtype=np.int64))
+    return index
+
+
+def evaluate_index(index: faiss.Index,
+                   vectors: np.ndarray,
+                   ids: np.ndarray,
+                   k: int = 10,
+                   num_queries: int = 100,
+                   index_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Measure recall@k and query latency of an index against exact search.
+    Queries are sampled from the indexed vectors.
+
+    Args:
+        index: Index to evaluate
+        vectors: Vectors held by the index
+        ids: Memory IDs of the vectors
+        k: Number of neighbours to compare
+        num_queries: Number of sample queries
+        index_type: Type the index was built as (defaults to get_index_type)
+
+    Returns:
+        Dictionary with recall and latency figures
+    """
+    index_type = stored_index_type(index, index_type)
+    if len(vectors) == 0:
+        return {"index_type": index_type, "codec": get_index_codec(index), "k": k, "num_queries": 0}
+
+    k = min(k, len(vectors))
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)]
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+
+    start_time = time.time()
+    _, exact_rows = exact.search(queries, k)
+    exact_latency = (time.time() - start_time) / len(queries)
+
+    start_time = time.time()
+    _, approx_ids = index.search(queries, k)
+    approx_latency = (time.time() - start_time) / len(queries)
+
+    exact_ids = np.asarray(ids)[exact_rows]
+    hits = sum(len(set(exact_ids[i]) & set(approx_ids[i])) for i in range(len(queries)))
+
+    return {
+        "index_type": index_type,
+        "codec": get_index_codec(index),
+        "vector_bytes": vector_bytes(index),
+        "k": k,
+        "num_queries": len(queries),
+        "recall_at_k": hits / (len(queries) * k),
+        "latency_ms": approx_latency * 1000,
+        "exact_latency_ms": exact_latency * 1000,
+        "speedup": exact_latency / approx_latency if approx_latency > 0 else None
+    }
@@ -0,0 +1,143 @@
+"""
+Locks for the DreamOS vector store.
+A reader-writer lock lets searches run in parallel within a process, and
+an advisory file lock serializes writers across processes.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock, stores are then single-process
+    fcntl = None
+
+
+class ReadWriteLock:
+    """
+    Lock that admits many readers or one writer.
+    Waiting writers block new readers so writes aren't starved. The writer
+    may re-acquire the write lock and take read locks; readers may nest
+    read locks, but can't upgrade them to a write lock.
+    """
+
+    def __init__(self):
+        """Initialize the lock."""
+        self._cond = threading.Condition(threading.Lock())
+
+        # Read lock depth per thread
+        self._readers = {}
+        self._writer = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+
+    def acquire_read(self) -> None:
+        """Acquire the lock for reading."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me or me in self._readers:
+                # Nested reads must not wait for queued writers, or they would deadlock
+                self._readers[me] = self._readers.get(me, 0) + 1
+                return
+
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers[me] = 1
+
+    def release_read(self) -> None:
+        """Release a read lock held by the current thread."""
+        me = threading.get_ident()
+        with self._cond:
+            depth = self._readers[me] - 1
+            if depth:
+                self._readers[me] = depth
+            else:
+                del self._readers[me]
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        """Acquire the lock for writing."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        """Release the write lock held by the current thread."""
+        with self._cond:
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read_lock(self):
+        """Context manager holding the lock for reading."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_lock(self):
+        """Context manager holding the lock for writing."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on a file, shared by every process using the store.
+    Reentrant, but not thread-safe: callers serialize their threads first,
+    e.g. with the write side of a ReadWriteLock.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the file lock.
+
+        Args:
+            path: Path of the lock file, created if it doesn't exist
+        """
+        self.path = path
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth == 0 and fcntl is not None:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a")
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        return False
+
+    def close(self) -> None:
+        """Close the lock file. The lock must not be held."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,223 @@
+"""
+Group-commit memory writer for DreamOS.
+Memories are queued by the caller and written by a background thread, which
+embeds and stores everything that arrived within a short window together.
+"""
+import time
+import queue
+import atexit
+import weakref
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Dict, Any, Optional, ContextManager
+
+import numpy as np
+
+from ..config import DEBUG_MODE
+
+
+class MemoryWriter:
+    """
+    Background writer that batches memory inserts.
+    The first queued memory opens a batch that is committed once it holds
+    max_batch memories or linger_ms have passed, with one embedding call and
+    one store write for the whole batch. The thread is started on demand and
+    exits once the writer has been idle for idle_seconds or is closed.
+    """
+
+    def __init__(self,
+                 embed: Callable[[List[str]], np.ndarray],
+                 lease_store: Callable[[], ContextManager[Any]],
+                 linger_ms: float,
+                 max_batch: int,
+                 idle_seconds: float = 30.0):
+        """
+        Initialize the writer.
+
+        Args:
+            embed: Function embedding a list of texts into a matrix
+            lease_store: Function returning a context manager that holds the vector store to write to
+            linger_ms: How long to wait for more memories once a batch is started
+            max_batch: Maximum number of memories per batch
+            idle_seconds: How long the thread waits for new memories before exiting
+        """
+        self._embed = embed
+        self._lease_store = lease_store
+        self.linger = linger_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.idle_seconds = idle_seconds
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+        # Memories queued but not yet committed
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+
+        _writers.add(self)
+
+    def submit(self,
+               text: str,
+               metadata: Optional[Dict[str, Any]] = None,
+               dedup: bool = False) -> Future:
+        """
+        Queue a memory for writing.
+
+        Args:
+            text: Text content of the memory
+            metadata: Additional metadata for the memory
+            dedup: Whether to merge the memory into an existing duplicate
+
+        Returns:
+            Future resolving to the ID of the memory
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The memory writer is closed")
+            self._pending += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((text, metadata, dedup, future))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued memory is committed.
+
+        Args:
+            timeout: Maximum number of seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the queue was drained, False on timeout
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Commit the queued memories and stop the writer thread.
+        Memories submitted afterwards are rejected with a RuntimeError.
+
+        Args:
+            timeout: Maximum number of seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if every queued memory was committed, False on timeout
+        """
+        with self._lock:
+            self._closed = True
+
+        drained = self.flush(timeout)
+
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            # Wakes the thread if it is waiting for memories
+            self._queue.put(None)
+            thread.join(timeout)
+
+        _writers.discard(self)
+        return drained
+
+    @property
+    def pending(self) -> int:
+        """Number of memories queued but not yet committed."""
+        return self._pending
+
+    @property
+    def running(self) -> bool:
+        """Whether the writer thread is running."""
+        return self._thread is not None
+
+    def _run(self) -> None:
+        """Collect queued memories into batches and commit them, until idle or closed."""
+        while True:
+            try:
+                request = self._queue.get(timeout=self.idle_seconds)
+            except queue.Empty:
+                request = None
+            if request is None:
+                # Memories submitted in the meantime keep the thread going
+                with self._lock:
+                    if self._pending == 0:
+                        self._thread = None
+                        return
+                continue
+
+            batch = [request]
+            deadline = time.monotonic() + self.linger
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        request = self._queue.get(timeout=remaining)
+                    else:
+                        request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    break
+                batch.append(request)
+
+            self._commit(batch)
+
+            with self._idle:
+                self._pending -= len(batch)
+                if self._pending == 0:
+                    self._idle.notify_all()
+                    if self._closed:
+                        self._thread = None
+                        return
+
+    def _commit(self, batch: List[tuple]) -> None:
+        """
+        Embed and store a batch of memories, resolving their futures.
+
+        Args:
+            batch: Queued (text, metadata, dedup, future) tuples
+        """
+        try:
+            embeddings = self._embed([text for text, _, _, _ in batch])
+
+            # Consecutive memories with the same dedup setting go into one write
+            with self._lease_store() as store:
+                start = 0
+                while start < len(batch):
+                    end = start + 1
+                    while end < len(batch) and batch[end][2] == batch[start][2]:
+                        end += 1
+                    requests = batch[start:end]
+                    memory_ids = store.add_memories(
+                        [text for text, _, _, _ in requests],
+                        embeddings[start:end],
+                        [metadata for _, metadata, _, _ in requests],
+                        dedup=batch[start][2]
+                    )
+                    for (_, _, _, future), memory_id in zip(requests, memory_ids):
+                        future.set_result(memory_id)
+                    start = end
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"Error writing {len(batch)} memories: {str(e)}")
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if DEBUG_MODE:
+            print(f"Committed {len(batch)} memories")
+
+
+_writers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_writers() -> None:
+    """Drain the queues of the writers still alive at interpreter exit."""
+    for writer in list(_writers):
+        writer.flush(timeout=10)
@@ -0,0 +1,564 @@
+"""
+SQLite-backed metadata store for the DreamOS vector store.
+Keeps one row per memory so startup and writes don't scale with the corpus.
+"""
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import datetime
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Union, Set
+
+# Metadata keys stored in their own columns; everything else goes into the JSON data column
+_COLUMN_KEYS = ("id", "text", "type", "timestamp", "deleted")
+
+
+def match_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 query matching any of its terms.
+    Each whitespace-separated term is quoted as a phrase, so file names such
+    as notes.txt or tool names such as web_browser match as a whole.
+
+    Args:
+        query: Free-text query
+
+    Returns:
+        FTS5 MATCH expression, empty if the query has no searchable terms
+    """
+    terms = [term for term in query.split() if re.search(r"\w", term)]
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def content_hash(text: str, memory_type: Optional[str] = None) -> str:
+    """
+    Hash the content of a memory for exact duplicate detection.
+    Whitespace differences are ignored, memories of different types never match.
+
+    Args:
+        text: Text content of the memory
+        memory_type: Type of the memory
+
+    Returns:
+        Hex digest
+    """
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{memory_type or ''}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class MetadataStore:
+    """
+    Memory metadata in an embedded SQLite table keyed by memory ID.
+    Rows are loaded on demand, e.g. for the hits returned by a search.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the metadata store.
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        # The connection is shared with background maintenance threads
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Rows replaced by INSERT OR REPLACE must fire the delete trigger of the text index
+        self._conn.execute("PRAGMA recursive_triggers=ON")
+        self._create_schema()
+        self.fts_enabled = self._create_text_index()
+
+    def _create_schema(self) -> None:
+        """Create the tables and indexes if they don't exist."""
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS memories (
+                    id INTEGER PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    type TEXT,
+                    timestamp TEXT NOT NULL,
+                    deleted INTEGER NOT NULL DEFAULT 0,
+                    data TEXT NOT NULL DEFAULT '{}',
+                    content_hash TEXT
+                )
+            """)
+
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(memories)")]
+            if "content_hash" not in columns:
+                # Tables created before duplicate detection get the column and their hashes now
+                self._conn.execute("ALTER TABLE memories ADD COLUMN content_hash TEXT")
+                rows = self._conn.execute("SELECT id, text, type FROM memories").fetchall()
+                self._conn.executemany(
+                    "UPDATE memories SET content_hash = ? WHERE id = ?",
+                    [(content_hash(text, memory_type), memory_id) for memory_id, text, memory_type in rows]
+                )
+
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_type ON memories(type)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_timestamp ON memories(timestamp)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_content_hash ON memories(content_hash)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS store_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+
+    def _create_text_index(self) -> bool:
+        """
+        Create the full-text index over memory text, kept in sync by triggers.
+
+        Returns:
+            True if the index is available, False if SQLite was built without FTS5
+        """
+        try:
+            with self._lock, self._conn:
+                exists = self._conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'memories_fts'"
+                ).fetchone()
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts "
+                    "USING fts5(text, content='memories', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+                )
+                self._conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS memories_fts_insert AFTER INSERT ON memories BEGIN
+                        INSERT INTO memories_fts (rowid, text) VALUES (new.id, new.text);
+                    END
+                """)
+                self._conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS memories_fts_delete AFTER DELETE ON memories BEGIN
+                        INSERT INTO memories_fts (memories_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                    END
+                """)
+                self._conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS memories_fts_update AFTER UPDATE OF text ON memories BEGIN
+                        INSERT INTO memories_fts (memories_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                        INSERT INTO memories_fts (rowid, text) VALUES (new.id, new.text);
+                    END
+                """)
+                if not exists:
+                    # Index the rows written before the text index existed
+                    self._conn.execute("INSERT INTO memories_fts (memories_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable, lexical memory search is disabled: {e}")
+            return False
+
+    @staticmethod
+    def _to_row(metadata: Dict[str, Any]) -> tuple:
+        """Convert a metadata dictionary into a table row."""
+        data = {key: value for key, value in metadata.items() if key not in _COLUMN_KEYS}
+        return (
+            metadata["id"],
+            metadata.get("text", ""),
+            metadata.get("type"),
+            metadata.get("timestamp", ""),
+            1 if metadata.get("deleted") else 0,
+            json.dumps(data),
+            content_hash(metadata.get("text", ""), metadata.get("type"))
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> Dict[str, Any]:
+        """Convert a table row (id, text, type, timestamp, data) into a metadata dictionary."""
+        memory_id, text, memory_type, timestamp, data = row
+        metadata = {"id": memory_id, "text": text, "timestamp": timestamp}
+        if memory_type is not None:
+            metadata["type"] = memory_type
+        metadata.update(json.loads(data))
+        return metadata
+
+    @staticmethod
+    def _filter_clause(memory_type: Optional[Union[str, List[str]]] = None,
+                       since: Optional[Union[str, datetime.datetime]] = None,
+                       until: Optional[Union[str, datetime.datetime]] = None,
+                       tools_used: Optional[List[str]] = None) -> Tuple[str, list]:
+        """
+        Build the WHERE clause selecting live memories that match the filters.
+
+        Args:
+            memory_type: Memory type, or list of types, to match
+            since: Earliest timestamp (inclusive)
+            until: Latest timestamp (exclusive)
+            tools_used: Tool names, of which at least one must have been used
+
+        Returns:
+            Tuple of (sql, params)
+        """
+        conditions = ["deleted = 0"]
+        params = []
+
+        if memory_type is not None:
+            types = [memory_type] if isinstance(memory_type, str) else list(memory_type)
+            conditions.append(f"type IN ({','.join('?' * len(types))})")
+            params.extend(types)
+
+        # Timestamps are ISO 8601 strings, so they compare correctly as text
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since.isoformat() if isinstance(since, datetime.datetime) else since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until.isoformat() if isinstance(until, datetime.datetime) else until)
+
+        if tools_used:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM json_each(memories.data, '$.tools_used') "
+                f"WHERE json_each.value IN ({','.join('?' * len(tools_used))}))"
+            )
+            params.extend(tools_used)
+
+        return " AND ".join(conditions), params
+
+    def insert_many(self, metadatas: Iterable[Dict[str, Any]]) -> None:
+        """
+        Insert or replace metadata rows in a single transaction.
+
+        Args:
+            metadatas: Metadata dictionaries, each with an "id" key
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO memories (id, text, type, timestamp, deleted, data, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._to_row(metadata) for metadata in metadatas]
+            )
+
+    def get(self, memory_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the metadata of a live memory.
+
+        Args:
+            memory_id: ID of the memory
+
+        Returns:
+            Metadata dictionary, or None if not found or deleted
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, text, type, timestamp, data FROM memories WHERE id = ? AND deleted = 0",
+                (memory_id,)
+            ).fetchone()
+        return self._from_row(row) if row else None
+
+    def get_many(self, memory_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Get the metadata of several live memories.
+
+        Args:
+            memory_ids: IDs of the memories
+
+        Returns:
+            Dictionary mapping memory IDs to metadata, missing and deleted IDs are omitted
+        """
+        if not memory_ids:
+            return {}
+
+        placeholders = ",".join("?" * len(memory_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, text, type, timestamp, data FROM memories WHERE deleted = 0 AND id IN ({placeholders})",
+                [int(memory_id) for memory_id in memory_ids]
+            ).fetchall()
+        return {row[0]: self._from_row(row) for row in rows}
+
+    def known_ids(self, memory_ids: List[int]) -> Set[int]:
+        """
+        Get which of several memories have a row, live or deleted.
+
+        Args:
+            memory_ids: IDs of the memories
+
+        Returns:
+            Set of the IDs with a row
+        """
+        if not memory_ids:
+            return set()
+
+        placeholders = ",".join("?" * len(memory_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM memories WHERE id IN ({placeholders})",
+                [int(memory_id) for memory_id in memory_ids]
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def exists(self, memory_id: int) -> bool:
+        """
+        Check whether a live memory exists.
+
+        Args:
+            memory_id: ID of the memory
+
+        Returns:
+            True if the memory exists and isn't deleted
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM memories WHERE id = ? AND deleted = 0", (memory_id,)
+            ).fetchone()
+        return row is not None
+
+    def find_by_hash(self, digest: str) -> Optional[int]:
+        """
+        Find a live memory by its content hash.
+
+        Args:
+            digest: Hash computed by content_hash
+
+        Returns:
+            ID of the oldest matching memory, or None if there is none
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(id) FROM memories WHERE content_hash = ? AND deleted = 0", (digest,)
+            ).fetchone()
+        return row[0]
+
+    def record_duplicate(self, memory_id: int, last_seen: str) -> Optional[Dict[str, Any]]:
+        """
+        Count another occurrence of a memory instead of storing a copy.
+
+        Args:
+            memory_id: ID of the memory that was seen again
+            last_seen: Timestamp of the new occurrence
+
+        Returns:
+            Updated metadata dictionary, or None if the memory doesn't exist
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE memories SET data = json_set(data, "
+                "'$.seen_count', COALESCE(json_extract(data, '$.seen_count'), 1) + 1, '$.last_seen', ?) "
+                "WHERE id = ? AND deleted = 0",
+                (last_seen, memory_id)
+            )
+            return self.get(memory_id)
+
+    def page(self,
+             cursor: Optional[int] = None,
+             limit: int = 100,
+             descending: bool = False,
+             **filters) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Get one page of live memories in ID order, using the ID as a keyset cursor.
+
+        Args:
+            cursor: Cursor returned with the previous page, None for the first page
+            limit: Maximum number of memories on the page
+            descending: Newest IDs first instead of oldest first
+            **filters: memory_type, since, until and tools_used, see _filter_clause
+
+        Returns:
+            Tuple of (metadata dictionaries, cursor of the next page or None on the last page)
+        """
+        where, params = self._filter_clause(**filters)
+        if cursor is not None:
+            where += " AND id < ?" if descending else " AND id > ?"
+            params.append(cursor)
+
+        # Fetch one extra row to know whether another page follows
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, text, type, timestamp, data FROM memories WHERE {where} "
+                f"ORDER BY id {'DESC' if descending else 'ASC'} LIMIT ?",
+                [*params, limit + 1]
+            ).fetchall()
+
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [self._from_row(row) for row in rows[:limit]], next_cursor
+
+    def iter_all(self, batch_size: int = 1000, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over live memories in ID order, one page in memory at a time.
+
+        Args:
+            batch_size: Number of rows fetched per query
+            **filters: memory_type, since, until and tools_used, see _filter_clause
+
+        Returns:
+            Iterator of metadata dictionaries
+        """
+        cursor = None
+        while True:
+            rows, cursor = self.page(cursor, batch_size, **filters)
+            yield from rows
+            if cursor is None:
+                return
+
+    def search_text(self, query: str, k: int, **filters) -> List[Dict[str, Any]]:
+        """
+        Rank live memories by BM25 relevance of their text to a query.
+
+        Args:
+            query: Free-text query, see match_query
+            k: Maximum number of results
+            **filters: memory_type, since, until and tools_used, see _filter_clause
+
+        Returns:
+            List of metadata dictionaries, best first, each with a "bm25" score (lower is better)
+        """
+        expression = match_query(query)
+        if not self.fts_enabled or not expression or k <= 0:
+            return []
+
+        where, params = self._filter_clause(**filters)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT memories.id, memories.text, type, timestamp, data, bm25(memories_fts) AS score "
+                "FROM memories_fts JOIN memories ON memories.id = memories_fts.rowid "
+                f"WHERE memories_fts MATCH ? AND {where} ORDER BY score LIMIT ?",
+                [expression, *params, k]
+            ).fetchall()
+        return [dict(self._from_row(row[:5]), bm25=row[5]) for row in rows]
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Get the newest live memories using the timestamp index.
+
+        Args:
+            limit: Maximum number of memories to return
+
+        Returns:
+            List of metadata dictionaries, newest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, text, type, timestamp, data FROM memories WHERE deleted = 0 "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def ids_from(self, first_id: int) -> List[int]:
+        """
+        Get the IDs of all rows with an ID of at least first_id.
+
+        Args:
+            first_id: Smallest ID to return
+
+        Returns:
+            Sorted list of IDs
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM memories WHERE id >= ? ORDER BY id", (first_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def filter_ids(self, **filters) -> List[int]:
+        """
+        Get the IDs of live memories matching metadata filters.
+
+        Args:
+            **filters: memory_type, since, until and tools_used, see _filter_clause
+
+        Returns:
+            Sorted list of IDs
+        """
+        where, params = self._filter_clause(**filters)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id FROM memories WHERE {where} ORDER BY id", params).fetchall()
+        return [row[0] for row in rows]
+
+    def deleted_ids(self) -> List[int]:
+        """
+        Get the IDs of memories marked as deleted.
+
+        Returns:
+            List of IDs
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM memories WHERE deleted = 1").fetchall()
+        return [row[0] for row in rows]
+
+    def mark_deleted(self, memory_ids: List[int]) -> None:
+        """
+        Mark memories as deleted without removing their rows.
+
+        Args:
+            memory_ids: IDs of the memories
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE memories SET deleted = 1 WHERE id = ?", [(int(memory_id),) for memory_id in memory_ids]
+            )
+
+    def remove(self, memory_ids: Iterable[int]) -> None:
+        """
+        Remove rows permanently.
+
+        Args:
+            memory_ids: IDs of the memories
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM memories WHERE id = ?", [(int(memory_id),) for memory_id in memory_ids]
+            )
+
+    def max_id(self) -> int:
+        """
+        Get the largest memory ID in the table.
+
+        Returns:
+            Largest ID, or -1 if the table is empty
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(id) FROM memories").fetchone()
+        return row[0] if row[0] is not None else -1
+
+    def count(self, **filters) -> int:
+        """
+        Count live memories, optionally matching metadata filters.
+
+        Args:
+            **filters: memory_type, since, until and tools_used, see _filter_clause
+
+        Returns:
+            Number of matching memories that aren't deleted
+        """
+        where, params = self._filter_clause(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM memories WHERE {where}", params).fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove all memories."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM memories")
+
+    def get_state(self, key: str, default: Any = None) -> Any:
+        """
+        Read a value from the store state table.
+
+        Args:
+            key: State key
+            default: Value returned if the key is missing
+
+        Returns:
+            Decoded JSON value
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM store_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key: str, value: Any) -> None:
+        """
+        Write a value to the store state table.
+
+        Args:
+            key: State key
+            value: JSON-serializable value
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO store_state (key, value) VALUES (?, ?)", (key, json.dumps(value))
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
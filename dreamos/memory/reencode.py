@@ -0,0 +1,136 @@
+"""
+Offline re-encoding of a DreamOS vector store.
+Rebuilds the index with another storage codec or index type and reports
+the memory saved and the recall lost.
+
+Usage:
+    python -m dreamos.memory.reencode --codec sq8
+    python -m dreamos.memory.reencode --codec pca --index-type hnsw --dry-run
+"""
+import sys
+import json
+import argparse
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from ..config import VECTOR_DB_PATH
+from .vector_store import VectorStore
+from .index_factory import (
+    INDEX_TYPES, CODECS, get_index_codec, codec_supported,
+    extract_vectors, build_index, evaluate_index, vector_bytes
+)
+
+
+def reencode_store(vector_db_path: str,
+                   codec: str,
+                   index_type: Optional[str] = None,
+                   k: int = 10,
+                   num_queries: int = 100,
+                   dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Re-encode a vector store with another codec.
+
+    Args:
+        vector_db_path: Path of the vector database
+        codec: Target codec, one of CODECS
+        index_type: Target index type (defaults to the current type)
+        k: Number of neighbours used to measure recall
+        num_queries: Number of sample queries used to measure recall
+        dry_run: Measure the new encoding without replacing the index
+
+    Returns:
+        Report with sizes before and after, and recall of both encodings
+    """
+    # Keep the store from starting its own migrations while we work on it
+    store = VectorStore(vector_db_path, ann_threshold=0, mmap=False, codec="none")
+    try:
+        store.wait_for_maintenance()
+        return _reencode(store, vector_db_path, codec, index_type, k, num_queries, dry_run)
+    finally:
+        store.close()
+
+
+def _reencode(store: VectorStore,
+              vector_db_path: str,
+              codec: str,
+              index_type: Optional[str],
+              k: int,
+              num_queries: int,
+              dry_run: bool) -> Dict[str, Any]:
+    """Re-encode an open store, see reencode_store."""
+    index_type = index_type or store.index_type
+    if not codec_supported(index_type, codec):
+        raise ValueError(f"Codec {codec} is not supported for {index_type} indexes")
+
+    vectors, ids = extract_vectors(store.index)
+    keep = ~np.isin(ids, np.fromiter(store.tombstones, dtype=np.int64))
+    vectors, ids = vectors[keep], ids[keep]
+
+    # Codecs and IVF indexes can't be trained without vectors
+    if len(ids) == 0:
+        raise ValueError(f"The store at {vector_db_path} has no memories to re-encode")
+
+    before = evaluate_index(store.index, vectors, ids, k=k, num_queries=num_queries, index_type=store.index_type)
+    before["vector_bytes"] = vector_bytes(store.index)
+
+    if dry_run:
+        after = evaluate_index(
+            build_index(index_type, vectors, ids, codec), vectors, ids, k=k, num_queries=num_queries, index_type=index_type
+        )
+    else:
+        after = store.promote_index(index_type, codec)
+        if after is None:
+            raise RuntimeError("The store changed while it was re-encoded, try again")
+
+    saved = before["vector_bytes"] - after["vector_bytes"]
+    return {
+        "path": vector_db_path,
+        "num_vectors": len(ids),
+        "dry_run": dry_run,
+        "before": before,
+        "after": after,
+        "bytes_saved": saved,
+        "compression_ratio": before["vector_bytes"] / after["vector_bytes"] if after["vector_bytes"] else None,
+        "recall_lost": before.get("recall_at_k", 1.0) - after.get("recall_at_k", 1.0)
+    }
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Re-encode a DreamOS vector store with another storage codec")
+    parser.add_argument("--path", default=VECTOR_DB_PATH, help="Path of the vector database")
+    parser.add_argument("--codec", required=True, choices=CODECS, help="Target storage codec")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, help="Target index type (default: keep the current type)")
+    parser.add_argument("--k", type=int, default=10, help="Number of neighbours used to measure recall")
+    parser.add_argument("--queries", type=int, default=100, help="Number of sample queries used to measure recall")
+    parser.add_argument("--dry-run", action="store_true", help="Report the effect without changing the store")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    try:
+        report = reencode_store(
+            args.path, args.codec, args.index_type, k=args.k, num_queries=args.queries, dry_run=args.dry_run
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    before, after = report["before"], report["after"]
+    print(f"Vectors:      {report['num_vectors']}")
+    print(f"Encoding:     {before['index_type']}/{before['codec']} -> {after['index_type']}/{after['codec']}")
+    print(f"Vector bytes: {before['vector_bytes']:,} -> {after['vector_bytes']:,} "
+          f"(saved {report['bytes_saved']:,})")
+    if "recall_at_k" in after:
+        print(f"Recall@{after['k']}:    {before['recall_at_k']:.3f} -> {after['recall_at_k']:.3f} "
+              f"(lost {report['recall_lost']:.3f})")
+    if report["dry_run"]:
+        print("Dry run, the store was not changed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Search request coalescing for the DreamOS vector store.
+Concurrent single-query searches are collected for a short window and run
+as one FAISS matrix search.
+"""
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Dict, Any, Optional
+
+import numpy as np
+
+
+class SearchCoalescer:
+    """
+    Micro-batching front end for a batch search function.
+    A caller that is alone searches directly; callers that overlap are
+    queued and served together by a background thread.
+    """
+
+    def __init__(self,
+                 search_batch: Callable[..., List[List[Dict[str, Any]]]],
+                 window_ms: float,
+                 max_batch: int):
+        """
+        Initialize the coalescer.
+
+        Args:
+            search_batch: Function taking (queries, k, **filters) and returning one result list per query
+            window_ms: How long to wait for more requests once a batch is started
+            max_batch: Maximum number of queries per batch
+        """
+        self._search_batch = search_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Number of callers currently inside search()
+        self._active = 0
+
+        # Callers that chose to queue but whose request the worker hasn't taken yet
+        self._pending = 0
+
+        # Set by close(); later callers search directly
+        self._closed = False
+
+    def search(self, query_embedding: np.ndarray, k: int, **filters) -> List[Dict[str, Any]]:
+        """
+        Search for a single query, batched with concurrent searches.
+
+        Args:
+            query_embedding: Vector embedding of the query
+            k: Number of results to return
+            **filters: Metadata filters passed on to the batch search
+
+        Returns:
+            List of memory metadata dictionaries
+        """
+        with self._lock:
+            self._active += 1
+            alone = self._active == 1 or self._closed
+            if not alone:
+                self._pending += 1
+                self._start_worker()
+
+        try:
+            if alone:
+                # Nothing to coalesce with, so don't pay for the hand-off
+                return self._search_batch(np.asarray(query_embedding, dtype=np.float32)[None], k, **filters)[0]
+
+            future = Future()
+            self._queue.put((query_embedding, k, filters, future))
+            return future.result()
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _start_worker(self) -> None:
+        """Start the batching thread if it isn't running. Must be called with the lock held."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the batching thread once the queued requests are served.
+
+        Args:
+            timeout: Seconds to wait for the thread to exit (None waits indefinitely)
+        """
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+
+        if thread is not None:
+            # Wake the worker up so it notices the store is closing
+            self._queue.put(None)
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def _run(self) -> None:
+        """Collect queued requests into batches and execute them until closed."""
+        while True:
+            with self._lock:
+                if self._closed and self._pending == 0:
+                    # Drop the thread's reference to the search function
+                    self._thread = None
+                    return
+
+            request = self._take()
+            if request is None:
+                continue
+            batch = [request]
+            deadline = time.monotonic() + self.window
+
+            # Wait for callers that are about to queue, up to the window. A caller
+            # searching directly never queues, so it isn't waited for.
+            while len(batch) < self.max_batch and self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._take(remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    break
+                batch.append(request)
+
+            # Take whatever else arrived meanwhile without waiting
+            while len(batch) < self.max_batch:
+                try:
+                    request = self._take(0)
+                except queue.Empty:
+                    break
+                if request is None:
+                    break
+                batch.append(request)
+
+            self._execute(batch)
+
+    def _take(self, timeout: Optional[float] = None) -> tuple:
+        """
+        Take a request off the queue.
+
+        Args:
+            timeout: Seconds to wait for a request (None waits indefinitely, 0 doesn't wait)
+
+        Returns:
+            Queued (query_embedding, k, filters, future) tuple, or None when woken up by close()
+
+        Raises:
+            queue.Empty: If no request arrived in time
+        """
+        if timeout == 0:
+            request = self._queue.get_nowait()
+        else:
+            request = self._queue.get(timeout=timeout)
+        if request is not None:
+            with self._lock:
+                self._pending -= 1
+        return request
+
+    def _execute(self, batch: List[tuple]) -> None:
+        """
+        Run a batch of requests, one matrix search per distinct k and filter set.
+
+        Args:
+            batch: Queued (query_embedding, k, filters, future) tuples
+        """
+        groups = {}
+        for request in batch:
+            # Approximate indexes size their candidate lists by k, so the results
+            # for a smaller k aren't always a prefix of those for a larger one
+            key = (request[1], json.dumps(request[2], sort_keys=True, default=str))
+            groups.setdefault(key, []).append(request)
+
+        for requests in groups.values():
+            try:
+                k = requests[0][1]
+                queries = np.vstack([np.asarray(request[0], dtype=np.float32) for request in requests])
+                results = self._search_batch(queries, k, **requests[0][2])
+
+                for request, result in zip(requests, results):
+                    request[3].set_result(result)
+            except Exception as e:
+                for request in requests:
+                    if not request[3].done():
+                        request[3].set_exception(e)
@@ -0,0 +1,357 @@
+"""
+Namespaced vector stores for DreamOS.
+One manager owns every open store, so agents that use the same namespace
+share a single in-memory index and background writer instead of each
+loading their own copy.
+"""
+import os
+import re
+import time
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Iterator, Callable
+
+import numpy as np
+
+from ..config import (
+    VECTOR_DB_PATH, DEBUG_MODE, MEMORY_NAMESPACE_IDLE_SECONDS, MEMORY_MAX_OPEN_NAMESPACES,
+    MEMORY_WRITE_LINGER_MS, MEMORY_WRITE_MAX_BATCH
+)
+from .vector_store import VectorStore
+from .memory_writer import MemoryWriter
+
+# Namespace shared by all agents unless they ask for their own
+DEFAULT_NAMESPACE = "default"
+
+_SAFE_NAMESPACE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def namespace_dir(namespace: str) -> str:
+    """
+    Get the directory name a namespace is stored under.
+
+    Args:
+        namespace: Namespace name
+
+    Returns:
+        Name safe to use as a single path component
+    """
+    if _SAFE_NAMESPACE.match(namespace) and namespace not in (".", ".."):
+        return namespace
+    digest = hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:16]
+    return f"{re.sub(r'[^A-Za-z0-9_-]', '_', namespace)[:32]}-{digest}"
+
+
+class VectorStoreManager:
+    """
+    Owner of the vector stores of all namespaces.
+    The default namespace lives in the root of the vector database and stays
+    open; other namespaces get their own directory and are closed once idle.
+    Callers use a store through lease, which keeps it from being closed until
+    they are done with it.
+    """
+
+    def __init__(self,
+                 vector_db_path: Optional[str] = None,
+                 idle_seconds: Optional[float] = None,
+                 max_open: Optional[int] = None):
+        """
+        Initialize the store manager.
+
+        Args:
+            vector_db_path: Root path of the vector database
+            idle_seconds: Seconds after which an unused namespace is closed (0 disables)
+            max_open: Maximum number of namespaces kept open besides the default one
+        """
+        self.vector_db_path = vector_db_path or VECTOR_DB_PATH
+        self.idle_seconds = idle_seconds if idle_seconds is not None else MEMORY_NAMESPACE_IDLE_SECONDS
+        self.max_open = max_open if max_open is not None else MEMORY_MAX_OPEN_NAMESPACES
+
+        self._lock = threading.RLock()
+
+        # Open stores by namespace, least recently used first
+        self._stores = OrderedDict()
+        self._last_used = {}
+        
+        # Number of callers using each store, which is only closed once they are done
+        self._leases = {}
+        self._released = threading.Condition(self._lock)
+        
+        # Background writers by namespace, closed with their namespace
+        self._writers = {}
+
+    def store_path(self, namespace: str) -> str:
+        """
+        Get the directory of a namespace's store.
+
+        Args:
+            namespace: Namespace name
+
+        Returns:
+            Path of the store directory
+        """
+        if namespace == DEFAULT_NAMESPACE:
+            return self.vector_db_path
+        return os.path.join(self.vector_db_path, "namespaces", namespace_dir(namespace))
+
+    def get_store(self, namespace: Optional[str] = None) -> VectorStore:
+        """
+        Get the store of a namespace, opening it if needed.
+        The store may be closed as soon as it is idle, so only use the result
+        for a single call; use lease to hold on to it.
+
+        Args:
+            namespace: Namespace name (defaults to the shared namespace)
+
+        Returns:
+            Vector store of the namespace
+        """
+        namespace = namespace or DEFAULT_NAMESPACE
+
+        with self._lock:
+            store = self._stores.get(namespace)
+            if store is None:
+                store = VectorStore(self.store_path(namespace))
+                self._stores[namespace] = store
+                if DEBUG_MODE:
+                    print(f"Opened vector store for namespace {namespace}")
+
+            self._stores.move_to_end(namespace)
+            self._last_used[namespace] = time.monotonic()
+            self._evict()
+
+        return store
+
+    @contextmanager
+    def lease(self, namespace: Optional[str] = None) -> Iterator[VectorStore]:
+        """
+        Use the store of a namespace, keeping it open until the block exits.
+
+        Args:
+            namespace: Namespace name (defaults to the shared namespace)
+
+        Yields:
+            Vector store of the namespace
+        """
+        namespace = namespace or DEFAULT_NAMESPACE
+
+        with self._lock:
+            store = self.get_store(namespace)
+            self._leases[namespace] = self._leases.get(namespace, 0) + 1
+
+        try:
+            yield store
+        finally:
+            with self._lock:
+                self._leases[namespace] -= 1
+                if not self._leases[namespace]:
+                    del self._leases[namespace]
+                    self._released.notify_all()
+
+    def write(self,
+              namespace: Optional[str],
+              embed: Callable[[List[str]], np.ndarray],
+              text: str,
+              metadata: Optional[Dict[str, Any]] = None,
+              dedup: bool = False) -> Future:
+        """
+        Queue a memory with the background writer of a namespace.
+
+        Args:
+            namespace: Namespace name (defaults to the shared namespace)
+            embed: Function embedding a list of texts, used if the writer has to be created
+            text: Text content of the memory
+            metadata: Additional metadata for the memory
+            dedup: Whether to merge the memory into an existing duplicate
+
+        Returns:
+            Future resolving to the ID of the memory
+        """
+        namespace = namespace or DEFAULT_NAMESPACE
+
+        # Submitted under the lock, so the writer isn't closed in between
+        with self._lock:
+            writer = self._writers.get(namespace)
+            if writer is None:
+                writer = MemoryWriter(
+                    embed, lambda: self.lease(namespace), MEMORY_WRITE_LINGER_MS, MEMORY_WRITE_MAX_BATCH
+                )
+                self._writers[namespace] = writer
+            return writer.submit(text, metadata, dedup)
+
+    def flush(self, namespace: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every memory queued for a namespace is stored.
+
+        Args:
+            namespace: Namespace name (defaults to the shared namespace)
+            timeout: Maximum number of seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the queue was drained, False on timeout
+        """
+        with self._lock:
+            writer = self._writers.get(namespace or DEFAULT_NAMESPACE)
+        return writer is None or writer.flush(timeout)
+
+    def _evict(self) -> None:
+        """Close idle namespaces and the least recently used ones above the limit. Must be called with the lock held."""
+        now = time.monotonic()
+        isolated = [namespace for namespace in self._stores if namespace != DEFAULT_NAMESPACE]
+
+        # The most recently used namespace is the one being handed out, keep it,
+        # and leave namespaces open while their store is leased or writes are queued
+        for i, namespace in enumerate(isolated[:-1]):
+            writer = self._writers.get(namespace)
+            if namespace in self._leases or (writer is not None and writer.pending):
+                continue
+            over_limit = self.max_open and len(isolated) - i > self.max_open
+            idle = self.idle_seconds and now - self._last_used[namespace] > self.idle_seconds
+            if over_limit or idle:
+                self._close(namespace)
+
+    def close_namespace(self, namespace: str) -> None:
+        """
+        Commit the queued writes of a namespace, then checkpoint and close its
+        store and writer. The namespace is reopened on the next access.
+        Waits until no caller holds a lease on the store, so it must not be
+        called from inside a lease of the same namespace.
+
+        Args:
+            namespace: Namespace name
+        """
+        # The writer needs leases to commit, so it is drained without holding the lock
+        self.flush(namespace)
+
+        with self._lock:
+            self._close(namespace)
+
+    def _close(self, namespace: str) -> None:
+        """Close the writer and store of a namespace once it is no longer leased. Must be called with the lock held."""
+        self._released.wait_for(lambda: namespace not in self._leases)
+
+        # Writes queued since the flush are committed by the writer thread, which reopens the store
+        writer = self._writers.pop(namespace, None)
+        if writer is not None:
+            writer.close(timeout=0)
+
+        store = self._stores.pop(namespace, None)
+        self._last_used.pop(namespace, None)
+
+        # Closed under the lock, so the namespace isn't reopened while its files are still held
+        if store is not None:
+            store.close()
+            if DEBUG_MODE:
+                print(f"Closed vector store for namespace {namespace}")
+
+    def delete_namespace(self, namespace: str) -> None:
+        """
+        Close a namespace and delete its store from disk.
+
+        Args:
+            namespace: Namespace name (the default namespace can't be deleted)
+        """
+        if namespace == DEFAULT_NAMESPACE:
+            raise ValueError("The default namespace can't be deleted")
+
+        self.flush(namespace)
+
+        with self._lock:
+            self._close(namespace)
+            shutil.rmtree(self.store_path(namespace), ignore_errors=True)
+
+        if DEBUG_MODE:
+            print(f"Deleted vector store for namespace {namespace}")
+
+    def expire_namespaces(self,
+                          prefix: str,
+                          max_age_seconds: float,
+                          keep: Optional[List[str]] = None) -> List[str]:
+        """
+        Delete the closed namespaces with a name starting with prefix whose
+        files haven't changed for max_age_seconds, e.g. those of old sessions.
+
+        Args:
+            prefix: Name prefix of the namespaces to expire
+            max_age_seconds: Age after which a namespace is deleted
+            keep: Namespaces that are still in use and must not be deleted
+
+        Returns:
+            Directory names of the deleted namespaces
+        """
+        root = os.path.join(self.vector_db_path, "namespaces")
+        cutoff = time.time() - max_age_seconds
+        expired = []
+
+        with self._lock:
+            open_dirs = {namespace_dir(namespace) for namespace in list(self._stores) + list(keep or [])}
+            for name in self.list_namespaces():
+                path = os.path.join(root, name)
+                if not name.startswith(prefix) or name in open_dirs or not os.path.isdir(path):
+                    continue
+                modified = max(
+                    [os.path.getmtime(os.path.join(path, entry)) for entry in os.listdir(path)],
+                    default=os.path.getmtime(path)
+                )
+                if modified < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    expired.append(name)
+
+        if DEBUG_MODE and expired:
+            print(f"Expired {len(expired)} namespaces")
+        return expired
+
+    def list_namespaces(self) -> List[str]:
+        """
+        Get the namespaces that have a store on disk.
+
+        Returns:
+            Sorted list of namespace directory names, including the default namespace
+        """
+        root = os.path.join(self.vector_db_path, "namespaces")
+        namespaces = {DEFAULT_NAMESPACE}
+        if os.path.isdir(root):
+            namespaces.update(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+        return sorted(namespaces)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the open namespaces.
+
+        Returns:
+            Dictionary with the open namespaces and their memory counts
+        """
+        with self._lock:
+            return {
+                "open_namespaces": len(self._stores),
+                "memories": {namespace: store.count_memories() for namespace, store in self._stores.items()}
+            }
+
+    def close_all(self) -> None:
+        """Commit queued writes, then checkpoint and close every open store."""
+        with self._lock:
+            namespaces = list(dict.fromkeys(list(self._stores) + list(self._writers)))
+        for namespace in namespaces:
+            self.close_namespace(namespace)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_store_manager() -> VectorStoreManager:
+    """
+    Get the process-wide store manager.
+
+    Returns:
+        Shared VectorStoreManager instance
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = VectorStoreManager()
+        return _manager
@@ -5,119 +5,537 @@ Uses FAISS for efficient similarity search.
 import os
 import json
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterator, Callable
 from pathlib import Path
 import datetime
+import threading
+import time
+import heapq
+from collections import deque
+from contextlib import contextmanager, nullcontext
 import faiss
 from tqdm import tqdm
 
-from ..config import VECTOR_DB_PATH, DEBUG_MODE
+from ..config import (
+    VECTOR_DB_PATH, DEBUG_MODE, VECTOR_CHECKPOINT_INTERVAL, VECTOR_WAL_FSYNC,
+    VECTOR_COMPACTION_RATIO, VECTOR_INDEX_TYPE, VECTOR_ANN_INDEX_TYPE, VECTOR_ANN_THRESHOLD,
+    VECTOR_FILTER_EXACT_LIMIT, VECTOR_MMAP, VECTOR_SEARCH_BATCH_WINDOW_MS, VECTOR_SEARCH_MAX_BATCH,
+    VECTOR_RECENT_CACHE_SIZE, VECTOR_CODEC, VECTOR_CODEC_MIN_TRAIN, VECTOR_PROCESS_LOCK, VECTOR_MIN_RECALL,
+    MEMORY_DEDUP_THRESHOLD, MEMORY_HYBRID_CANDIDATES, MEMORY_RRF_K
+)
+from .wal import WriteAheadLog, encode_vector, decode_vector
+from .metadata_store import MetadataStore, content_hash
+from .search_coalescer import SearchCoalescer
+from .locks import ReadWriteLock, FileLock
+from .index_factory import (
+    create_index, get_index_type, stored_index_type, get_index_codec, resolve_codec, codec_supported,
+    codec_needs_training, prepare_loaded_index, copy_index, search_parameters, supports_remove, remove_ids,
+    extract_vectors, get_ids, build_index, evaluate_index, vector_bytes
+)
+
+# A rejected automatic migration is retried once the store has grown by this factor
+_PROMOTION_RETRY_GROWTH = 1.5
+
+def _recency_key(metadata: Dict[str, Any]) -> Tuple[str, int]:
+    """Sort key ordering memories by timestamp, then ID."""
+    return (metadata.get("timestamp", ""), metadata["id"])
 
 class VectorStore:
     """
     Vector database for storing and retrieving memory embeddings.
     Uses FAISS for efficient vector similarity search.
+    
+    Metadata lives in an SQLite table keyed by memory ID and is loaded lazily.
+    Vector writes are appended to a write-ahead log and periodically
+    checkpointed into the index file, so the cost of a write does not grow
+    with the size of the store.
+    
+    Deletes only mark a tombstone that searches skip. The index is compacted
+    in the background once tombstones exceed the configured ratio.
+    
+    Memory IDs are stable 64-bit IDs stored in an IndexIDMap2, so they stay
+    valid across deletes and compactions and are never reused.
+    
+    Stores start with an exact flat index and are migrated in the background
+    to an approximate index (IVF-Flat, IVF-PQ or HNSW) once they grow past
+    the configured threshold. A migration whose index doesn't reach the
+    minimum recall against exact search is discarded.
+    
+    Vectors can be stored compressed (float16, 8-bit scalar quantization,
+    product quantization or PCA). Codecs that need training are applied in
+    the background once enough vectors are stored.
+    
+    The index file can be memory-mapped read-only so several processes share
+    one copy in the page cache. A private copy is made on the first write.
+    
+    Searches run in parallel under a reader-writer lock while writes are
+    serialized. Writers also hold a file lock shared with other processes
+    using the store, and first apply what those processes logged or
+    checkpointed since, so every worker sees the same memories.
     """
     
-    def __init__(self, vector_db_path: Optional[str] = None):
+    def __init__(self, 
+                 vector_db_path: Optional[str] = None, 
+                 checkpoint_interval: Optional[int] = None,
+                 compaction_ratio: Optional[float] = None,
+                 index_type: Optional[str] = None,
+                 ann_index_type: Optional[str] = None,
+                 ann_threshold: Optional[int] = None,
+                 mmap: Optional[bool] = None,
+                 codec: Optional[str] = None,
+                 min_recall: Optional[float] = None):
         """
         Initialize the vector store.
         
         Args:
             vector_db_path: Path to store the vector database
+            checkpoint_interval: Number of logged operations between checkpoints
+            compaction_ratio: Fraction of deleted entries that triggers compaction
+            index_type: Index type for a new store (flat, ivf_flat, ivf_pq or hnsw)
+            ann_index_type: Index type a flat store is migrated to
+            ann_threshold: Number of memories at which a flat index is migrated (0 disables)
+            mmap: Whether to memory-map the index file read-only on load
+            codec: Vector storage codec (none, fp16, sq8, pq or pca)
+            min_recall: Minimum recall@k an automatically migrated index must reach to replace the current one
         """
         self.vector_db_path = vector_db_path or VECTOR_DB_PATH
         self.index_path = os.path.join(self.vector_db_path, "memory_index.faiss")
-        self.metadata_path = os.path.join(self.vector_db_path, "memory_metadata.json")
+        self.metadata_db_path = os.path.join(self.vector_db_path, "memory_metadata.db")
+        self.wal_path = os.path.join(self.vector_db_path, "memory_wal.log")
+        
+        self.checkpoint_interval = checkpoint_interval or VECTOR_CHECKPOINT_INTERVAL
+        self.wal = WriteAheadLog(self.wal_path, fsync=VECTOR_WAL_FSYNC)
+        
+        self.compaction_ratio = compaction_ratio if compaction_ratio is not None else VECTOR_COMPACTION_RATIO
+        self._lock = ReadWriteLock()
+        self._process_lock = FileLock(os.path.join(self.vector_db_path, "store.lock")) if VECTOR_PROCESS_LOCK else None
+        self._maintenance_thread = None
+        
+        # Concurrent single searches are run as one matrix search
+        self._search_coalescer = None
+        if VECTOR_SEARCH_BATCH_WINDOW_MS > 0:
+            self._search_coalescer = SearchCoalescer(
+                self.search_batch, VECTOR_SEARCH_BATCH_WINDOW_MS, VECTOR_SEARCH_MAX_BATCH
+            )
+        
+        # IVF indexes need training data, so they start flat and are promoted later
+        index_type = index_type or VECTOR_INDEX_TYPE
+        if index_type in ("ivf_flat", "ivf_pq"):
+            self.initial_index_type = "flat"
+            self.ann_index_type = index_type
+        else:
+            self.initial_index_type = index_type
+            self.ann_index_type = ann_index_type or VECTOR_ANN_INDEX_TYPE
+        self.ann_threshold = ann_threshold if ann_threshold is not None else VECTOR_ANN_THRESHOLD
+        self.codec = codec or VECTOR_CODEC
+        self.min_recall = min_recall if min_recall is not None else VECTOR_MIN_RECALL
+        
+        # Recall and latency of the last index migration, and of the last one rejected for low recall
+        self.index_report = None
+        self.rejected_report = None
         
         # Embedding dimension - this should match your embedding model
         self.embedding_dim = 768  # for Groq embeddings
         
         # Initialize metadata and index to default values before loading
-        self.metadata = []
+        self.metadata_store = MetadataStore(self.metadata_db_path)
         self.index = None
         
-        # Initialize or load the vector index and metadata
-        self.index, self.metadata = self._load_or_create_store()
+        # Type the index was built as, which its structure doesn't always tell (see stored_index_type)
+        self.index_type = None
+        
+        # Whether self.index is a read-only memory map of the index file
+        self.mmap = VECTOR_MMAP if mmap is None else mmap
+        self._index_mapped = False
+        
+        # Identity of the index file self.index was loaded from or saved to
+        self._index_stamp = None
+        
+        # Next memory ID to assign
+        self.next_id = 0
+        
+        # IDs of deleted memories that are still present in the index
+        self.tombstones = set()
+        self._tombstone_selector = None
+        
+        # Newest memories, oldest first. Every live memory that isn't in the
+        # ring is older than its first entry. Complete if it holds them all.
+        self._recent = deque(maxlen=VECTOR_RECENT_CACHE_SIZE)
+        self._recent_complete = False
+        
+        # Readers may refill the ring under the shared read lock, so they take this
+        # lock as well; writers change the ring under the write lock, which excludes them
+        self._recent_lock = threading.Lock()
+        
+        # Changes with every write, see get_version. Starts at the open time so a reopened store doesn't repeat versions
+        self.version = time.time_ns()
+        
+        with self._writing():
+            # Initialize or load the vector index and metadata
+            self._migrate_json_metadata()
+            self._load_state()
+            self.index = self._load_or_create_store()
+            
+            # Bring the store up to date with operations logged since the last checkpoint
+            self._replay_wal()
+            self._seed_recent()
+        
+        self._maybe_compact()
+        self._maybe_promote()
     
-    def _load_or_create_store(self) -> Tuple[faiss.Index, List[Dict[str, Any]]]:
+    def _new_index(self) -> faiss.Index:
+        """
+        Create an empty index that stores vectors under their memory IDs.
+        
+        Returns:
+            Empty FAISS index
+        """
+        # Codecs that need training are applied once there are vectors to train on
+        codec = None if codec_needs_training(self.codec) else resolve_codec(self.initial_index_type, self.codec)
+        return create_index(self.initial_index_type, self.embedding_dim, codec=codec)
+    
+    def _load_or_create_store(self) -> faiss.Index:
         """
         Load existing vector store or create a new one.
         
         Returns:
-            Tuple of (faiss_index, metadata_list)
+            FAISS index
         """
-        if os.path.exists(self.index_path) and os.path.exists(self.metadata_path):
+        if os.path.exists(self.index_path):
             try:
                 # Load the FAISS index
-                index = faiss.read_index(self.index_path)
+                index = self._read_index()
+                
+                self._index_stamp = self._index_file_stamp()
                 
-                # Load the metadata
-                with open(self.metadata_path, 'r') as f:
-                    metadata = json.load(f)
+                if not isinstance(index, (faiss.IndexIDMap2, faiss.IndexIVF)):
+                    # Stores written before stable IDs used index positions as IDs
+                    index = self._migrate_positional_index(index)
+                    self._index_mapped = False
+                prepare_loaded_index(index)
+                self.index_type = stored_index_type(index, self.metadata_store.get_state("index_type"))
                 
                 if DEBUG_MODE:
                     print(f"Loaded vector store with {index.ntotal} memories")
                 
-                return index, metadata
+                return index
             except Exception as e:
                 print(f"Error loading vector store: {e}")
                 return self._create_store()
         else:
             return self._create_store()
     
-    def _create_store(self) -> Tuple[faiss.Index, List[Dict[str, Any]]]:
+    def _read_index(self) -> faiss.Index:
+        """
+        Read the index file, memory-mapped read-only if enabled.
+        
+        Returns:
+            FAISS index
+        """
+        # Zero-copy mapping of the vector data needs a FAISS build with IO_FLAG_MMAP_IFC
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+        if self.mmap and mmap_flag is not None:
+            try:
+                index = faiss.read_index(self.index_path, mmap_flag)
+                self._index_mapped = True
+                return index
+            except RuntimeError as e:
+                if DEBUG_MODE:
+                    print(f"Memory-mapped load failed, reading index into memory: {e}")
+        
+        return faiss.read_index(self.index_path)
+    
+    def _ensure_writable(self) -> None:
+        """
+        Replace a memory-mapped index with a private in-memory copy.
+        Must be called with the lock held before modifying the index.
+        """
+        if self._index_mapped:
+            self.index = copy_index(self.index, mapped=True)
+            self._index_mapped = False
+            
+            if DEBUG_MODE:
+                print(f"Copied memory-mapped index with {self.index.ntotal} memories for writing")
+    
+    def _load_state(self) -> None:
+        """
+        Load the ID counter, migration report and tombstones from the metadata store.
+        """
+        self.next_id = max(self.metadata_store.max_id() + 1, self.metadata_store.get_state("next_id", 0))
+        self.index_report = self.metadata_store.get_state("index_report")
+        self.rejected_report = self.metadata_store.get_state("rejected_report")
+        self.tombstones = set(self.metadata_store.deleted_ids())
+        self._tombstone_selector = None
+    
+    def _index_file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Identify the current index file. Checkpoints replace the file, so the stamp changes.
+        
+        Returns:
+            Tuple of (inode, modification time, size), or None if there is no index file
+        """
+        try:
+            stat = os.stat(self.index_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    @contextmanager
+    def _writing(self):
+        """
+        Context manager for modifying the store.
+        Holds the write lock and the cross-process file lock, and applies the
+        changes of other processes before the caller's own.
+        """
+        with self._lock.write_lock(), (self._process_lock or nullcontext()):
+            if self.index is not None:
+                self._catch_up()
+            try:
+                yield
+            finally:
+                self.version += 1
+    
+    def _files_changed(self) -> bool:
+        """
+        Check whether another process has written to the store since this one last saw it.
+        
+        Returns:
+            True if the index file was replaced or the log holds records not applied here
+        """
+        return self._index_file_stamp() != self._index_stamp or self.wal.file_size() != self.wal.size
+    
+    def _catch_up(self) -> None:
+        """
+        Apply the changes other processes made to the store files.
+        Must be called with the write lock and the file lock held.
+        """
+        if self._process_lock is None or not self._files_changed():
+            return
+        
+        reload = self._index_file_stamp() != self._index_stamp or self.wal.file_size() < self.wal.size
+        if reload:
+            # Another process checkpointed, compacted or cleared the store
+            self._load_state()
+            self._index_mapped = False
+            self.index = self._load_or_create_store()
+        
+        replayed = self._replay_wal(0 if reload else self.wal.size)
+        if reload or replayed:
+            self._seed_recent()
+        
+        if DEBUG_MODE:
+            print(f"Caught up with other processes: {'reloaded index, ' if reload else ''}{replayed} log records")
+    
+    def _sync(self) -> None:
+        """
+        Catch up with other processes before reading, if they changed the store.
+        """
+        if self._process_lock is not None and self._files_changed():
+            with self._writing():
+                pass
+    
+    def _migrate_json_metadata(self) -> None:
+        """
+        Import metadata from the JSON files used before the SQLite store.
+        The JSON files are kept with a .migrated suffix.
+        """
+        metadata_path = os.path.join(self.vector_db_path, "memory_metadata.json")
+        state_path = os.path.join(self.vector_db_path, "memory_state.json")
+        
+        if not os.path.exists(metadata_path) or self.metadata_store.max_id() >= 0:
+            return
+        
+        try:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+            self.metadata_store.insert_many(metadata)
+            
+            if os.path.exists(state_path):
+                with open(state_path, 'r') as f:
+                    state = json.load(f)
+                for key, value in state.items():
+                    self.metadata_store.set_state(key, value)
+                os.replace(state_path, state_path + ".migrated")
+            
+            os.replace(metadata_path, metadata_path + ".migrated")
+            
+            if DEBUG_MODE:
+                print(f"Migrated {len(metadata)} memories from JSON metadata to SQLite")
+        except Exception as e:
+            print(f"Error migrating JSON metadata: {e}")
+    
+    def _migrate_positional_index(self, index: faiss.Index) -> faiss.Index:
+        """
+        Convert a plain index whose positions are memory IDs into an ID-mapped index.
+        
+        Args:
+            index: Legacy FAISS index
+            
+        Returns:
+            Equivalent ID-mapped index
+        """
+        new_index = create_index("flat", self.embedding_dim)
+        if index.ntotal:
+            new_index.add_with_ids(
+                index.reconstruct_n(0, index.ntotal),
+                np.arange(index.ntotal, dtype=np.int64)
+            )
+        
+        if DEBUG_MODE:
+            print(f"Migrated {index.ntotal} memories to stable IDs")
+        
+        return new_index
+    
+    def _create_store(self) -> faiss.Index:
         """
         Create a new vector store.
         
         Returns:
-            Tuple of (faiss_index, metadata_list)
+            FAISS index
         """
         # Create directory if it doesn't exist
         os.makedirs(self.vector_db_path, exist_ok=True)
         
         # Create a new FAISS index
-        index = faiss.IndexFlatL2(self.embedding_dim)
+        index = self._new_index()
+        self.index_type = self.initial_index_type
         
-        # Create empty metadata list
-        metadata = []
+        # Save the empty store - passing an explicit index to avoid using self attributes
+        self._save_store(index=index)
         
-        # Save the empty store - passing explicit values to avoid using self attributes
-        self._save_store(index=index, metadata=metadata)
-        
-        return index, metadata
+        return index
     
-    def _save_store(self, index: Optional[faiss.Index] = None, metadata: Optional[List[Dict[str, Any]]] = None) -> None:
+    def _save_store(self, index: Optional[faiss.Index] = None) -> None:
         """
-        Save the vector store to disk.
+        Save the vector index to disk.
+        Metadata rows are written to SQLite as they change, so only the
+        index and the store state are saved here.
         
         Args:
             index: FAISS index to save (or use self.index)
-            metadata: Metadata list to save (or use self.metadata)
         """
-        # Use provided values if given, otherwise use instance attributes
-        # But don't attempt to use self.index or self.metadata if they're None
+        # Use the provided index if given, otherwise use the instance attribute
         if index is None and hasattr(self, 'index') and self.index is not None:
             index = self.index
-        
-        if metadata is None and hasattr(self, 'metadata') and self.metadata is not None:
-            metadata = self.metadata
             
-        # Ensure we have valid values to save
-        if index is None or metadata is None:
-            raise ValueError("Cannot save store: missing index or metadata")
+        # Ensure we have a valid index to save
+        if index is None:
+            raise ValueError("Cannot save store: missing index")
         
         # Create directory if it doesn't exist
         os.makedirs(self.vector_db_path, exist_ok=True)
         
-        # Save the FAISS index
-        faiss.write_index(index, self.index_path)
+        # Write to a temporary file and swap it in, so a crash never leaves a
+        # partial index and memory maps of the previous file stay valid
+        tmp_path = self.index_path + ".tmp"
+        faiss.write_index(index, tmp_path)
+        if VECTOR_WAL_FSYNC:
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        self._index_stamp = self._index_file_stamp()
         
-        # Save the metadata
-        with open(self.metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        # Save the ID counter so IDs of compacted memories are never reused
+        self.metadata_store.set_state("next_id", self.next_id)
+        self.metadata_store.set_state("index_report", self.index_report)
+        self.metadata_store.set_state("index_type", self.index_type)
     
-    def add_memory(self, text: str, embedding: np.ndarray, metadata: Dict[str, Any] = None) -> int:
+    def _replay_wal(self, offset: int = 0) -> int:
+        """
+        Re-apply operations from the write-ahead log on top of the last checkpoint.
+        
+        Args:
+            offset: Byte offset in the log of the first record to apply
+            
+        Returns:
+            Number of operations applied
+        """
+        replayed = 0
+        pending_vectors = []
+        pending_ids = []
+        
+        # A crash between saving a checkpoint and truncating the log leaves records the
+        # index already holds, so a full replay skips adds of IDs in the index or without
+        # a metadata row (compacted, or never committed) and deletes of IDs not in the index
+        present = set(get_ids(self.index).tolist()) if offset == 0 else None
+        
+        def flush_adds():
+            # Consecutive adds are applied as one matrix
+            if not pending_ids:
+                return
+            vectors = pending_vectors
+            ids = pending_ids
+            if present is not None:
+                known = self.metadata_store.known_ids(ids)
+                keep = [i for i, memory_id in enumerate(ids) if memory_id not in present and memory_id in known]
+                vectors = [vectors[i] for i in keep]
+                ids = [ids[i] for i in keep]
+                present.update(ids)
+            if ids:
+                self._apply_add(np.vstack(vectors), list(ids))
+            pending_vectors.clear()
+            pending_ids.clear()
+        
+        for record in self.wal.replay(offset):
+            op = record.get("op")
+            if op == "add":
+                if "metadata" in record:
+                    record["id"] = record["metadata"]["id"]
+                    if present is None or record["id"] not in present:
+                        # Records written before the SQLite store carried the metadata
+                        self.metadata_store.insert_many([record["metadata"]])
+                pending_vectors.append(decode_vector(record["vector"]))
+                pending_ids.append(record["id"])
+            elif op == "delete":
+                flush_adds()
+                self.metadata_store.mark_deleted([record["id"]])
+                if present is None or record["id"] in present:
+                    self._apply_delete(record["id"])
+            replayed += 1
+        flush_adds()
+        
+        if replayed and DEBUG_MODE:
+            print(f"Replayed {replayed} operations from the write-ahead log")
+        
+        self._maybe_checkpoint()
+        return replayed
+    
+    def _maybe_checkpoint(self) -> None:
+        """
+        Checkpoint the store if enough operations have been logged.
+        """
+        if self.wal.entries >= self.checkpoint_interval:
+            self.checkpoint()
+    
+    def checkpoint(self) -> None:
+        """
+        Fold the write-ahead log into the index file.
+        """
+        with self._writing():
+            self._save_store()
+            self.wal.truncate()
+        
+        if DEBUG_MODE:
+            print(f"Checkpointed vector store with {self.index.ntotal} memories")
+    
+    def _apply_add(self, embeddings: np.ndarray, memory_ids: List[int]) -> None:
+        """
+        Add vectors to the in-memory index.
+        
+        Args:
+            embeddings: Matrix of vector embeddings, one row per memory
+            memory_ids: IDs of the memories
+        """
+        ids = np.array(memory_ids, dtype=np.int64)
+        self._ensure_writable()
+        self.index.add_with_ids(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1), ids)
+        self.next_id = max(self.next_id, int(ids.max()) + 1)
+    
+    def add_memory(self, 
+                   text: str, 
+                   embedding: np.ndarray, 
+                   metadata: Dict[str, Any] = None,
+                   dedup: bool = False) -> int:
         """
         Add a memory to the vector store.
         
@@ -125,71 +543,376 @@ class VectorStore:
             text: Text content of the memory
             embedding: Vector embedding of the text
             metadata: Additional metadata for the memory
+            dedup: Merge the memory into an existing duplicate instead of adding it
             
         Returns:
-            ID of the added memory
+            ID of the added memory, or of the duplicate it was merged into
         """
         if metadata is None:
             metadata = {}
         
         # Ensure embedding is the right shape and type
-        embedding = np.array([embedding]).astype('float32')
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        
+        with self._writing():
+            if dedup:
+                duplicate_id = self._find_duplicate(text, embedding, metadata.get("type"))
+                if duplicate_id is not None:
+                    self._merge_duplicate(duplicate_id)
+                    return duplicate_id
+            
+            # Get the next ID
+            memory_id = self.next_id
+            
+            # Prepare the metadata entry
+            memory_metadata = {
+                "id": memory_id,
+                "text": text,
+                "timestamp": datetime.datetime.now().isoformat(),
+                **metadata
+            }
+            
+            # Log the vector before applying it, the metadata row is committed by SQLite
+            self.wal.append({"op": "add", "id": memory_id, "vector": encode_vector(embedding)})
+            self.metadata_store.insert_many([memory_metadata])
+            self._apply_add(embedding, [memory_id])
+            self._remember_recent([memory_metadata])
+            
+            self._maybe_checkpoint()
+        
+        self._maybe_promote()
+        
+        return memory_id
+    
+    def _find_duplicate(self, text: str, embedding: np.ndarray, memory_type: Optional[str]) -> Optional[int]:
+        """
+        Find a live memory of the same type with the same or nearly the same content.
+        Exact copies are found by content hash; otherwise the nearest neighbour
+        is a duplicate if its squared distance is within MEMORY_DEDUP_THRESHOLD
+        of the squared norm of the embedding. Must be called with the write lock held.
         
-        # Get the next ID
-        memory_id = self.index.ntotal
+        Args:
+            text: Text content of the new memory
+            embedding: Vector embedding of the text
+            memory_type: Type of the new memory
+            
+        Returns:
+            ID of the duplicate, or None if there is none
+        """
+        memory_id = self.metadata_store.find_by_hash(content_hash(text, memory_type))
+        if memory_id is not None:
+            return memory_id
         
-        # Add the embedding to the index
-        self.index.add(embedding)
+        if MEMORY_DEDUP_THRESHOLD <= 0 or self.index.ntotal - len(self.tombstones) <= 0:
+            return None
         
-        # Prepare the metadata entry
-        memory_metadata = {
-            "id": memory_id,
-            "text": text,
-            "timestamp": datetime.datetime.now().isoformat(),
-            **metadata
-        }
+        params = search_parameters(self.index, self._get_tombstone_selector())
+        distances, indices = self.index.search(embedding[None], 1, params=params)
+        if indices[0][0] < 0 or distances[0][0] > MEMORY_DEDUP_THRESHOLD * float(np.dot(embedding, embedding)):
+            return None
         
-        # Add the metadata
-        self.metadata.append(memory_metadata)
+        match = self.metadata_store.get(int(indices[0][0]))
+        if match is None or match.get("type") != memory_type:
+            return None
+        return match["id"]
+    
+    def _merge_duplicate(self, memory_id: int) -> None:
+        """
+        Count another occurrence of a memory and update its last-seen time.
+        Must be called with the write lock held.
         
-        # Save the updated store
-        self._save_store()
+        Args:
+            memory_id: ID of the duplicate memory
+        """
+        metadata = self.metadata_store.record_duplicate(memory_id, datetime.datetime.now().isoformat())
         
-        return memory_id
+        # Keep the copy in the recent-memories ring in step
+        for i, meta in enumerate(self._recent):
+            if meta["id"] == memory_id:
+                self._recent[i] = metadata
+                break
+        
+        if DEBUG_MODE:
+            print(f"Merged duplicate into memory {memory_id}, seen {metadata['seen_count']} times")
+    
+    def add_memories(self, 
+                     texts: List[str], 
+                     embeddings: np.ndarray, 
+                     metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+                     dedup: bool = False) -> List[int]:
+        """
+        Add many memories to the vector store at once.
+        The vectors are added with a single index call and persisted once.
+        
+        Args:
+            texts: Text content of the memories
+            embeddings: Matrix of vector embeddings, one row per text
+            metadatas: Additional metadata for each memory
+            dedup: Merge memories into existing duplicates (and exact copies within the batch) instead of adding them
+            
+        Returns:
+            IDs of the added memories, or of the duplicates they were merged into, in input order
+        """
+        if not texts:
+            return []
+        
+        if metadatas is None:
+            metadatas = [None] * len(texts)
+        metadatas = [metadata or {} for metadata in metadatas]
+        
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+        if len(metadatas) != len(texts):
+            raise ValueError("texts, embeddings and metadatas must have the same length")
+        
+        with self._writing():
+            # Positions of the memories that are really added, and the result of every position
+            new_positions = list(range(len(texts)))
+            memory_ids = [None] * len(texts)
+            copies = {}
+            if dedup:
+                new_positions = []
+                first_copy = {}
+                for i, (text, embedding, metadata) in enumerate(zip(texts, embeddings, metadatas)):
+                    key = content_hash(text, metadata.get("type"))
+                    if key in first_copy:
+                        copies[i] = first_copy[key]
+                        continue
+                    duplicate_id = self._find_duplicate(text, embedding, metadata.get("type"))
+                    if duplicate_id is not None:
+                        self._merge_duplicate(duplicate_id)
+                        memory_ids[i] = duplicate_id
+                    else:
+                        first_copy[key] = i
+                        new_positions.append(i)
+            
+            # Assign consecutive IDs
+            first_id = self.next_id
+            timestamp = datetime.datetime.now().isoformat()
+            memory_metadata = []
+            for offset, i in enumerate(new_positions):
+                memory_ids[i] = first_id + offset
+                memory_metadata.append({
+                    "id": first_id + offset,
+                    "text": texts[i],
+                    "timestamp": timestamp,
+                    **metadatas[i]
+                })
+            new_ids = [meta["id"] for meta in memory_metadata]
+            new_embeddings = embeddings[new_positions]
+            
+            if len(new_positions) >= self.checkpoint_interval:
+                # Large batches go straight into a checkpoint instead of the log
+                self.metadata_store.insert_many(memory_metadata)
+                self._apply_add(new_embeddings, new_ids)
+                self._remember_recent(memory_metadata)
+                self.checkpoint()
+            elif new_positions:
+                self.wal.append_many([
+                    {"op": "add", "id": memory_id, "vector": encode_vector(embedding)}
+                    for embedding, memory_id in zip(new_embeddings, new_ids)
+                ])
+                self.metadata_store.insert_many(memory_metadata)
+                self._apply_add(new_embeddings, new_ids)
+                self._remember_recent(memory_metadata)
+                self._maybe_checkpoint()
+            
+            # Later copies within the batch count as occurrences of the first one
+            for i, first in copies.items():
+                memory_ids[i] = memory_ids[first]
+                self._merge_duplicate(memory_ids[first])
+        
+        self._maybe_promote()
+        
+        return memory_ids
     
-    def search(self, query_embedding: np.ndarray, k: int = 5) -> List[Dict[str, Any]]:
+    def search(self, 
+               query_embedding: np.ndarray, 
+               k: int = 5,
+               memory_type: Optional[Union[str, List[str]]] = None,
+               since: Optional[Union[str, datetime.datetime]] = None,
+               until: Optional[Union[str, datetime.datetime]] = None,
+               tools_used: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Search for similar memories.
+        Concurrent calls are coalesced into one batched search.
         
         Args:
             query_embedding: Vector embedding of the query
             k: Number of results to return
+            memory_type: Only return memories of this type (or list of types)
+            since: Only return memories with a timestamp at or after this
+            until: Only return memories with a timestamp before this
+            tools_used: Only return memories that used at least one of these tools
             
         Returns:
             List of memory metadata dictionaries
         """
-        if self.index.ntotal == 0:
-            return []
+        filters = {"memory_type": memory_type, "since": since, "until": until, "tools_used": tools_used}
+        
+        if self._search_coalescer is not None:
+            return self._search_coalescer.search(query_embedding, k, **filters)
+        return self.search_batch(np.asarray(query_embedding, dtype=np.float32)[None], k, **filters)[0]
+    
+    def search_batch(self, 
+                     query_embeddings: np.ndarray, 
+                     k: int = 5,
+                     memory_type: Optional[Union[str, List[str]]] = None,
+                     since: Optional[Union[str, datetime.datetime]] = None,
+                     until: Optional[Union[str, datetime.datetime]] = None,
+                     tools_used: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for memories similar to each of several queries in one FAISS call.
+        Metadata filters are resolved to an ID selector that FAISS applies
+        before ranking, so filtered searches still return the top k matches.
+        
+        Args:
+            query_embeddings: Matrix of query embeddings, one row per query
+            k: Number of results to return per query
+            memory_type: Only return memories of this type (or list of types)
+            since: Only return memories with a timestamp at or after this
+            until: Only return memories with a timestamp before this
+            tools_used: Only return memories that used at least one of these tools
+            
+        Returns:
+            List of result lists, one per query, each with memory metadata dictionaries
+        """
+        # Ensure query embeddings are the right shape and type
+        query_embeddings = np.ascontiguousarray(np.atleast_2d(query_embeddings), dtype=np.float32)
+        num_queries = len(query_embeddings)
+        candidate_ids = None
         
-        # Ensure query embedding is the right shape and type
-        query_embedding = np.array([query_embedding]).astype('float32')
+        self._sync()
         
-        # Limit k to the number of items in the index
-        k = min(k, self.index.ntotal)
+        # Searches share the read lock, writers wait until they are done
+        with self._lock.read_lock():
+            index = self.index
+            if any(f is not None for f in (memory_type, since, until, tools_used)):
+                # Only live memories match a filter, so tombstones are excluded as well.
+                # Writers hold the lock until a row is in both SQLite and the index.
+                candidate_ids = self.metadata_store.filter_ids(
+                    memory_type=memory_type, since=since, until=until, tools_used=tools_used
+                )
+                live_total = len(candidate_ids)
+            else:
+                live_total = index.ntotal - len(self.tombstones)
+            
+            if live_total <= 0 or num_queries == 0:
+                return [[] for _ in range(num_queries)]
+            
+            # Limit k to the number of matching items in the index
+            k = min(k, live_total)
+            
+            if candidate_ids is None:
+                # Search the index, excluding deleted memories inside FAISS
+                params = search_parameters(index, self._get_tombstone_selector())
+                distances, indices = index.search(query_embeddings, k, params=params)
+            elif len(candidate_ids) <= VECTOR_FILTER_EXACT_LIMIT and get_index_type(index) != "flat":
+                # Approximate indexes can miss matches of a selective filter, so scan them exactly
+                candidates = np.array(candidate_ids, dtype=np.int64)
+                distances, positions = faiss.knn(query_embeddings, index.reconstruct_batch(candidates), k)
+                indices = candidates[positions]
+            else:
+                # Restrict the search to the matching memories inside FAISS
+                selector = faiss.IDSelectorBatch(np.array(candidate_ids, dtype=np.int64))
+                distances, indices = index.search(query_embeddings, k, params=search_parameters(index, selector))
         
-        # Search the index
-        distances, indices = self.index.search(query_embedding, k)
+        # Load the metadata rows of all hits with one query
+        hit_ids = np.unique(indices[indices >= 0]).tolist()
+        rows = self.metadata_store.get_many(hit_ids)
         
-        # Get the metadata for the results
         results = []
-        for i, idx in enumerate(indices[0]):
-            if 0 <= idx < len(self.metadata):
-                result = self.metadata[idx].copy()
-                result["distance"] = float(distances[0][i])
-                results.append(result)
+        for query_distances, query_indices in zip(distances, indices):
+            query_results = []
+            for distance, idx in zip(query_distances, query_indices):
+                row = rows.get(int(idx))
+                if row is not None:
+                    query_results.append(dict(row, distance=float(distance)))
+            results.append(query_results)
         
         return results
     
+    def search_text(self, 
+                    query: str, 
+                    k: int = 5,
+                    memory_type: Optional[Union[str, List[str]]] = None,
+                    since: Optional[Union[str, datetime.datetime]] = None,
+                    until: Optional[Union[str, datetime.datetime]] = None,
+                    tools_used: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Search memories by keywords, ranked with BM25 over an inverted index of their text.
+        The index is maintained by SQLite as memories are added and removed.
+        
+        Args:
+            query: Keywords to look for; file and tool names match as a whole
+            k: Number of results to return
+            memory_type: Only return memories of this type (or list of types)
+            since: Only return memories with a timestamp at or after this
+            until: Only return memories with a timestamp before this
+            tools_used: Only return memories that used at least one of these tools
+            
+        Returns:
+            List of memory metadata dictionaries, each with a "bm25" score (lower is better)
+        """
+        return self.metadata_store.search_text(
+            query, k, memory_type=memory_type, since=since, until=until, tools_used=tools_used
+        )
+    
+    def search_hybrid(self, 
+                      query: str, 
+                      query_embedding: np.ndarray, 
+                      k: int = 5,
+                      memory_type: Optional[Union[str, List[str]]] = None,
+                      since: Optional[Union[str, datetime.datetime]] = None,
+                      until: Optional[Union[str, datetime.datetime]] = None,
+                      tools_used: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Search by keywords and by vector similarity, and fuse the two rankings.
+        Each memory scores 1 / (MEMORY_RRF_K + rank) for every ranking it
+        appears in (reciprocal rank fusion), so neither score scale dominates.
+        
+        Args:
+            query: Search query text
+            query_embedding: Vector embedding of the query
+            k: Number of results to return
+            memory_type: Only return memories of this type (or list of types)
+            since: Only return memories with a timestamp at or after this
+            until: Only return memories with a timestamp before this
+            tools_used: Only return memories that used at least one of these tools
+            
+        Returns:
+            List of memory metadata dictionaries with an "rrf_score", plus
+            "bm25" and "distance" from the rankings they appeared in
+        """
+        filters = {"memory_type": memory_type, "since": since, "until": until, "tools_used": tools_used}
+        depth = max(k, MEMORY_HYBRID_CANDIDATES)
+        rankings = [self.search_text(query, depth, **filters), self.search(query_embedding, depth, **filters)]
+        
+        fused = {}
+        for ranking in rankings:
+            for rank, meta in enumerate(ranking, start=1):
+                entry = fused.setdefault(meta["id"], {"rrf_score": 0.0})
+                entry.update(meta)
+                entry["rrf_score"] += 1.0 / (MEMORY_RRF_K + rank)
+        
+        return sorted(fused.values(), key=lambda meta: meta["rrf_score"], reverse=True)[:k]
+    
+    def _get_tombstone_selector(self) -> Optional[faiss.IDSelector]:
+        """
+        Get a FAISS selector that excludes tombstoned IDs.
+        
+        Returns:
+            ID selector, or None if there are no tombstones
+        """
+        if not self.tombstones:
+            return None
+        
+        if self._tombstone_selector is None:
+            # Keep a reference to the batch selector so it outlives the Not wrapper
+            batch = faiss.IDSelectorBatch(np.fromiter(self.tombstones, dtype=np.int64))
+            self._tombstone_selector = (batch, faiss.IDSelectorNot(batch))
+        
+        return self._tombstone_selector[1]
+    
     def get_memory_by_id(self, memory_id: int) -> Optional[Dict[str, Any]]:
         """
         Get a memory by its ID.
@@ -200,23 +923,184 @@ class VectorStore:
         Returns:
             Memory metadata dictionary, or None if not found
         """
-        if 0 <= memory_id < len(self.metadata):
-            return self.metadata[memory_id].copy()
-        return None
+        return self.metadata_store.get(memory_id)
+    
+    def _seed_recent(self) -> None:
+        """
+        Fill the recent-memories ring from the timestamp index.
+        Must be called with the write lock held, or with the read lock and the ring lock.
+        """
+        maxlen = self._recent.maxlen
+        newest = self.metadata_store.recent(maxlen)
+        self._recent = deque(reversed(newest), maxlen=maxlen)
+        self._recent_complete = len(newest) < maxlen
+    
+    def _remember_recent(self, memory_metadata: List[Dict[str, Any]]) -> None:
+        """
+        Insert newly added memories into the recent-memories ring.
+        Must be called with the lock held.
+        
+        Args:
+            memory_metadata: Metadata of the added memories
+        """
+        maxlen = self._recent.maxlen
+        if maxlen == 0:
+            return
+        
+        # Only the newest entries of a batch can make it into the ring
+        if len(memory_metadata) > maxlen:
+            memory_metadata = heapq.nlargest(maxlen, memory_metadata, key=_recency_key)
+        
+        for meta in sorted(memory_metadata, key=_recency_key):
+            key = _recency_key(meta)
+            older = not self._recent or key < _recency_key(self._recent[0])
+            
+            if older and not self._recent_complete:
+                # It may be older than memories outside the ring
+                continue
+            if older and self._recent and len(self._recent) == maxlen:
+                self._recent_complete = False
+                continue
+            if len(self._recent) == maxlen:
+                self._recent.popleft()
+                self._recent_complete = False
+            
+            # New memories are usually the newest, so search from the right
+            position = len(self._recent)
+            while position > 0 and _recency_key(self._recent[position - 1]) > key:
+                position -= 1
+            self._recent.insert(position, meta)
+    
+    def get_recent_memories(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Get the most recent memories without scanning the store.
+        
+        Args:
+            limit: Maximum number of memories to return
+            
+        Returns:
+            List of memory metadata dictionaries, newest first
+        """
+        self._sync()
+        
+        # Reads don't block concurrent searches, only writes
+        with self._lock.read_lock(), self._recent_lock:
+            if limit > len(self._recent) and not self._recent_complete:
+                # Deletes have drained the ring, refill it from the timestamp index
+                self._seed_recent()
+            
+            if limit > len(self._recent) and not self._recent_complete:
+                return self.metadata_store.recent(limit)
+            
+            return [dict(meta) for meta in list(reversed(self._recent))[:limit]]
     
     def get_all_memories(self) -> List[Dict[str, Any]]:
         """
         Get all memories in the store.
+        Loads every metadata row; use list_memories, iter_memories or
+        count_memories for large stores.
         
         Returns:
             List of all memory metadata dictionaries
         """
-        return [m.copy() for m in self.metadata]
+        return list(self.metadata_store.iter_all())
+    
+    def list_memories(self, 
+                      cursor: Optional[int] = None, 
+                      page_size: int = 100,
+                      newest_first: bool = False,
+                      **filters) -> Dict[str, Any]:
+        """
+        Get one page of memories. Pages are addressed by a cursor rather than
+        an offset, so every page costs the same however deep it is.
+        
+        Args:
+            cursor: next_cursor of the previous page, None for the first page
+            page_size: Maximum number of memories per page
+            newest_first: List the newest memories first
+            **filters: Optional memory_type, since, until and tools_used filters as in search
+            
+        Returns:
+            Dictionary with the "memories" of the page and the "next_cursor" (None on the last page)
+        """
+        memories, next_cursor = self.metadata_store.page(cursor, page_size, newest_first, **filters)
+        return {"memories": memories, "next_cursor": next_cursor}
+    
+    def iter_memories(self, batch_size: int = 1000, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over memories in ID order without loading them all.
+        
+        Args:
+            batch_size: Number of memories loaded at a time
+            **filters: Optional memory_type, since, until and tools_used filters as in search
+            
+        Returns:
+            Iterator of memory metadata dictionaries
+        """
+        return self.metadata_store.iter_all(batch_size, **filters)
+    
+    def export_memories(self, 
+                        batch_size: int = 1000, 
+                        include_vectors: bool = False, 
+                        **filters) -> Iterator[str]:
+        """
+        Export memories as JSON lines, one page in memory at a time.
+        
+        Args:
+            batch_size: Number of memories loaded at a time
+            include_vectors: Add each memory's vector, base64-encoded float32
+            **filters: Optional memory_type, since, until and tools_used filters as in search
+            
+        Returns:
+            Iterator of JSON lines, each ending with a newline
+        """
+        cursor = None
+        while True:
+            if include_vectors:
+                # Hold off compactions until the page's vectors are read
+                with self._lock.read_lock():
+                    memories, next_cursor = self.metadata_store.page(cursor, batch_size, **filters)
+                    if memories:
+                        ids = np.array([meta["id"] for meta in memories], dtype=np.int64)
+                        for meta, vector in zip(memories, self.index.reconstruct_batch(ids)):
+                            meta["vector"] = encode_vector(vector)
+            else:
+                memories, next_cursor = self.metadata_store.page(cursor, batch_size, **filters)
+            cursor = next_cursor
+            
+            for meta in memories:
+                yield json.dumps(meta) + "\n"
+            
+            if cursor is None:
+                return
+    
+    def _apply_delete(self, memory_id: int) -> bool:
+        """
+        Mark a memory as deleted in the in-memory store.
+        
+        Args:
+            memory_id: ID of the memory to delete
+            
+        Returns:
+            True if the memory existed, False otherwise
+        """
+        if memory_id in self.tombstones:
+            return False
+        
+        self.tombstones.add(memory_id)
+        self._tombstone_selector = None
+        
+        for meta in self._recent:
+            if meta["id"] == memory_id:
+                self._recent.remove(meta)
+                break
+        
+        return True
     
     def delete_memory(self, memory_id: int) -> bool:
         """
         Delete a memory from the store.
-        Note: This is implemented by rebuilding the index without the deleted memory.
+        Note: The memory is tombstoned and removed from the index by a later compaction.
         
         Args:
             memory_id: ID of the memory to delete
@@ -224,65 +1108,396 @@ class VectorStore:
         Returns:
             True if successful, False otherwise
         """
-        if not (0 <= memory_id < len(self.metadata)):
+        return self.delete_memories([memory_id]) == 1
+    
+    def delete_memories(self, memory_ids: List[int]) -> int:
+        """
+        Delete several memories from the store with a single log write.
+        
+        Args:
+            memory_ids: IDs of the memories to delete
+            
+        Returns:
+            Number of memories deleted
+        """
+        with self._writing():
+            valid_ids = list(self.metadata_store.get_many(list(dict.fromkeys(memory_ids))))
+            
+            if not valid_ids:
+                return 0
+            
+            self.wal.append_many([{"op": "delete", "id": memory_id} for memory_id in valid_ids])
+            self.metadata_store.mark_deleted(valid_ids)
+            for memory_id in valid_ids:
+                self._apply_delete(memory_id)
+            
+            self._maybe_checkpoint()
+        
+        self._maybe_compact()
+        
+        return len(valid_ids)
+    
+    def _start_maintenance(self, target) -> None:
+        """
+        Run a maintenance job in a background thread unless one is already running.
+        
+        Args:
+            target: Callable to run
+        """
+        with self._lock.write_lock():
+            if self._maintenance_thread is not None and self._maintenance_thread.is_alive():
+                return
+            
+            self._maintenance_thread = threading.Thread(target=target, daemon=True)
+            self._maintenance_thread.start()
+    
+    def wait_for_maintenance(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait for a running background compaction or migration to finish.
+        
+        Args:
+            timeout: Maximum number of seconds to wait
+        """
+        thread = self._maintenance_thread
+        if thread is not None:
+            thread.join(timeout)
+    
+    def _maybe_compact(self) -> None:
+        """
+        Start a background compaction if the tombstone ratio is exceeded.
+        """
+        total = self.index.ntotal
+        if total and len(self.tombstones) / total >= self.compaction_ratio:
+            self._start_maintenance(self.compact)
+    
+    def _maybe_promote(self) -> None:
+        """
+        Start a background migration to an approximate index once the store is
+        large enough, or to the configured codec once there is enough training data.
+        """
+        index_type = self.index_type
+        
+        # Don't rebuild an index that was just rejected until there is more data to train on
+        rejected = self.rejected_report
+        if rejected and self.count_memories() < rejected["num_vectors"] * _PROMOTION_RETRY_GROWTH:
+            return
+        
+        if (self.ann_threshold
+                and self.ann_index_type != "flat"
+                and self.count_memories() >= self.ann_threshold
+                and index_type == "flat"):
+            self._start_maintenance(lambda: self.promote_index(min_recall=self.min_recall))
+        elif (codec_supported(index_type, self.codec)
+                and get_index_codec(self.index) == resolve_codec(index_type) != self.codec
+                and self.count_memories() >= VECTOR_CODEC_MIN_TRAIN):
+            # Only uncompressed stores are encoded automatically, re-encoding is done offline
+            self._start_maintenance(lambda: self.promote_index(index_type, min_recall=self.min_recall))
+    
+    def _swap_index(self, new_index: faiss.Index, index_type: str, snapshot_index: faiss.Index, 
+                    snapshot_next_id: int, snapshot_tombstones: set) -> bool:
+        """
+        Replace the index with one rebuilt from a snapshot.
+        Must be called with the lock held.
+        
+        Args:
+            new_index: Index built from the snapshot without its tombstones
+            index_type: Type the new index was built as
+            snapshot_index: Index the snapshot was taken from
+            snapshot_next_id: Next ID at the time of the snapshot
+            snapshot_tombstones: Tombstones removed by the rebuild
+            
+        Returns:
+            True if the index was swapped
+        """
+        if self.index is not snapshot_index:
+            # The store was cleared or replaced while we were copying
             return False
         
-        # FAISS doesn't support direct deletion, so we need to rebuild the index
-        # Get all embeddings
-        all_embeddings = []
-        for i in range(self.index.ntotal):
-            if i != memory_id:
-                # Get the vector at index i
-                vector = np.zeros((1, self.embedding_dim), dtype=np.float32)
-                faiss.reconstruct(self.index, i, vector.reshape(-1))
-                all_embeddings.append(vector)
-        
-        # Create new metadata list without the deleted memory
-        new_metadata = []
-        for i, meta in enumerate(self.metadata):
-            if i != memory_id:
-                # Update the ID to match the new index
-                new_id = len(new_metadata)
-                meta_copy = meta.copy()
-                meta_copy["id"] = new_id
-                new_metadata.append(meta_copy)
-        
-        # Create a new index
-        new_index = faiss.IndexFlatL2(self.embedding_dim)
-        
-        # Add all embeddings to the new index
-        if all_embeddings:
-            all_embeddings_array = np.vstack(all_embeddings).astype('float32')
-            new_index.add(all_embeddings_array)
-        
-        # Update the store
-        self.index = new_index
-        self.metadata = new_metadata
+        # Carry over memories added since the snapshot; IDs are assigned in increasing order
+        added_ids = self.metadata_store.ids_from(snapshot_next_id)
+        if added_ids:
+            added_ids = np.array(added_ids, dtype=np.int64)
+            new_index.add_with_ids(self.index.reconstruct_batch(added_ids), added_ids)
+        
+        self.metadata_store.remove(snapshot_tombstones)
         
-        # Save the updated store
-        self._save_store()
+        # Deletes made since the snapshot stay tombstoned
+        self.index = new_index
+        self.index_type = index_type
+        self._index_mapped = False
+        self.tombstones = self.tombstones - snapshot_tombstones
+        self._tombstone_selector = None
         
+        self.checkpoint()
         return True
     
+    def compact(self) -> int:
+        """
+        Remove tombstoned memories from the index.
+        The removal runs on a copy of the index so searches and writes are not
+        blocked; only the final swap holds the lock. Memory IDs are unchanged.
+        
+        Returns:
+            Number of memories removed from the index
+        """
+        self._sync()
+        
+        # Searches can go on while the snapshot is copied, writes wait
+        with self._lock.read_lock():
+            if not self.tombstones:
+                return 0
+            snapshot_index = self.index
+            snapshot_type = self.index_type
+            snapshot_next_id = self.next_id
+            snapshot_tombstones = set(self.tombstones)
+            tombstone_ids = np.fromiter(snapshot_tombstones, dtype=np.int64)
+            
+            if supports_remove(snapshot_index):
+                # Copy the index, vectors are copied in bulk by FAISS
+                new_index = copy_index(snapshot_index, mapped=self._index_mapped)
+            else:
+                vectors, ids = extract_vectors(snapshot_index)
+        
+        if supports_remove(snapshot_index):
+            remove_ids(new_index, tombstone_ids)
+        else:
+            # Graph indexes can't remove entries, so rebuild from the surviving vectors
+            keep = ~np.isin(ids, tombstone_ids)
+            new_index = build_index(
+                snapshot_type, vectors[keep], ids[keep], get_index_codec(snapshot_index)
+            )
+        
+        with self._writing():
+            if not self._swap_index(new_index, snapshot_type, snapshot_index, snapshot_next_id, snapshot_tombstones):
+                return 0
+        
+        if DEBUG_MODE:
+            print(f"Compacted vector store, removed {len(snapshot_tombstones)} deleted memories")
+        
+        return len(snapshot_tombstones)
+    
+    def promote_index(self, 
+                      index_type: Optional[str] = None, 
+                      codec: Optional[str] = None,
+                      min_recall: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Migrate the store to another index type or storage codec.
+        The new index is trained and filled from a snapshot in the background,
+        then its recall@k and query latency are measured against exact search.
+        
+        Args:
+            index_type: Target index type (defaults to the configured ANN type)
+            codec: Target codec (defaults to the configured codec if the index type supports it)
+            min_recall: Keep the current index if the new one's recall@k is below this
+            
+        Returns:
+            Recall, latency and size report ("rejected" is set if the recall was
+            too low), or None if the migration was abandoned
+        """
+        index_type = index_type or self.ann_index_type
+        
+        self._sync()
+        
+        with self._lock.read_lock():
+            snapshot_index = self.index
+            snapshot_type = self.index_type
+            snapshot_next_id = self.next_id
+            snapshot_tombstones = set(self.tombstones)
+            vectors, ids = extract_vectors(snapshot_index)
+        
+        if codec is None:
+            # Keep a codec the store was re-encoded with, otherwise use the configured one
+            current_codec = get_index_codec(snapshot_index)
+            if current_codec == resolve_codec(snapshot_type):
+                current_codec = self.codec
+            codec = resolve_codec(index_type, current_codec)
+        
+        keep = ~np.isin(ids, np.fromiter(snapshot_tombstones, dtype=np.int64))
+        vectors, ids = vectors[keep], ids[keep]
+        
+        start_time = time.time()
+        new_index = build_index(index_type, vectors, ids, codec)
+        build_time = time.time() - start_time
+        
+        report = evaluate_index(new_index, vectors, ids, index_type=index_type)
+        report["build_time_s"] = build_time
+        report["num_vectors"] = len(ids)
+        report["previous_index_type"] = snapshot_type
+        report["previous_codec"] = get_index_codec(snapshot_index)
+        report["previous_vector_bytes"] = vector_bytes(snapshot_index)
+        
+        if min_recall is not None and report.get("recall_at_k", 1.0) < min_recall:
+            report["rejected"] = True
+            report["min_recall"] = min_recall
+            with self._writing():
+                self.rejected_report = report
+                self.metadata_store.set_state("rejected_report", report)
+            
+            if DEBUG_MODE:
+                print(f"Kept {report['previous_index_type']} index: {index_type} ({report['codec']}) reached "
+                      f"recall@{report['k']}={report['recall_at_k']:.3f}, below the minimum of {min_recall:.3f}")
+            return report
+        
+        with self._writing():
+            previous_report = self.index_report
+            self.index_report = report
+            if not self._swap_index(new_index, index_type, snapshot_index, snapshot_next_id, snapshot_tombstones):
+                self.index_report = previous_report
+                return None
+            self.rejected_report = None
+            self.metadata_store.set_state("rejected_report", None)
+        
+        if DEBUG_MODE:
+            print(f"Migrated vector store to {index_type} ({report['codec']}): "
+                  f"recall@{report['k']}={report.get('recall_at_k', 0):.3f}, "
+                  f"latency={report.get('latency_ms', 0):.3f}ms "
+                  f"(exact {report.get('exact_latency_ms', 0):.3f}ms)")
+        
+        return report
+    
+    def ensure_embedder(self, 
+                        embedder_name: str, 
+                        embed: Callable[[List[str]], np.ndarray], 
+                        batch_size: int = 1000) -> int:
+        """
+        Make sure the stored vectors come from the given embedder.
+        A store written by another embedder is re-embedded from the memory
+        texts into a fresh index, holding the write lock until it is swapped in.
+        
+        Args:
+            embedder_name: Name identifying the embedder and its settings
+            embed: Function embedding a list of texts into a matrix
+            batch_size: Number of memories embedded at a time
+            
+        Returns:
+            Number of memories re-embedded
+        """
+        with self._writing():
+            if self.metadata_store.get_state("embedder") == embedder_name:
+                return 0
+            
+            count = 0
+            if self.index.ntotal:
+                new_index = self._new_index()
+                cursor = None
+                while True:
+                    memories, cursor = self.metadata_store.page(cursor, batch_size)
+                    if memories:
+                        ids = np.array([meta["id"] for meta in memories], dtype=np.int64)
+                        new_index.add_with_ids(np.asarray(embed([meta["text"] for meta in memories]), dtype=np.float32), ids)
+                        count += len(memories)
+                    if cursor is None:
+                        break
+                
+                # Tombstoned memories aren't carried over
+                self.metadata_store.remove(self.tombstones)
+                self.index = new_index
+                self.index_type = self.initial_index_type
+                self._index_mapped = False
+                self.tombstones = set()
+                self._tombstone_selector = None
+                self.checkpoint()
+            
+            self.metadata_store.set_state("embedder", embedder_name)
+            # New vectors may index differently, so a rejected migration is tried again
+            self.rejected_report = None
+            self.metadata_store.set_state("rejected_report", None)
+        
+        if count and DEBUG_MODE:
+            print(f"Re-embedded {count} memories with {embedder_name}")
+        
+        self._maybe_promote()
+        return count
+    
+    def get_index_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the underlying index.
+        
+        Returns:
+            Dictionary with the index type, sizes and the last migration report
+        """
+        self._sync()
+        
+        with self._lock.read_lock():
+            return {
+                "index_type": self.index_type,
+                "codec": get_index_codec(self.index),
+                "vector_bytes": vector_bytes(self.index),
+                "ntotal": self.index.ntotal,
+                "mmap": self._index_mapped,
+                "memories": self.index.ntotal - len(self.tombstones),
+                "tombstones": len(self.tombstones),
+                "ann_index_type": self.ann_index_type,
+                "ann_threshold": self.ann_threshold,
+                "report": self.index_report,
+                "rejected_report": self.rejected_report
+            }
+    
     def clear_store(self) -> None:
         """
         Clear all memories from the store.
         """
-        # Create a new index
-        new_index = faiss.IndexFlatL2(self.embedding_dim)
-        
-        # Update the store
-        self.index = new_index
-        self.metadata = []
+        with self._writing():
+            # Create a new index
+            new_index = self._new_index()
+            
+            # Update the store, IDs keep counting up so cached IDs are never reused
+            self.index = new_index
+            self.index_type = self.initial_index_type
+            self._index_mapped = False
+            self.metadata_store.clear()
+            self.tombstones = set()
+            self._tombstone_selector = None
+            self._recent.clear()
+            self._recent_complete = True
+            self.rejected_report = None
+            self.metadata_store.set_state("rejected_report", None)
+            
+            # Save the empty store and drop any pending log records
+            self.checkpoint()
+    
+    def get_version(self) -> int:
+        """
+        Get the version of the store's contents, e.g. to invalidate caches of derived data.
         
-        # Save the updated store
-        self._save_store()
+        Returns:
+            Number that changes whenever memories are written, here or by another process
+        """
+        self._sync()
+        return self.version
     
-    def count_memories(self) -> int:
+    def count_memories(self, **filters) -> int:
         """
         Get the number of memories in the store.
         
+        Args:
+            **filters: Optional memory_type, since, until and tools_used filters as in search
+        
         Returns:
             Number of memories
         """
-        return self.index.ntotal 
\ No newline at end of file
+        if any(value is not None for value in filters.values()):
+            return self.metadata_store.count(**filters)
+        
+        self._sync()
+        with self._lock.read_lock():
+            return self.index.ntotal - len(self.tombstones)
+    
+    def close(self) -> None:
+        """
+        Checkpoint pending writes and release the files held by the store.
+        The store must not be used afterwards.
+        """
+        self.wait_for_maintenance()
+        if self._search_coalescer is not None:
+            self._search_coalescer.close()
+        
+        with self._writing():
+            if self.wal.entries:
+                self.checkpoint()
+            self.wal.close()
+            self.metadata_store.close()
+            self.index = None
+        
+        if self._process_lock is not None:
+            self._process_lock.close()
@@ -0,0 +1,166 @@
+"""
+Write-ahead log for the DreamOS vector store.
+Records every mutation as one JSON line so writes never rewrite the whole store.
+"""
+import os
+import json
+import base64
+from typing import Dict, Any, Iterator, List, Optional
+
+import numpy as np
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    """
+    Encode a vector as base64 of its float32 bytes.
+
+    Args:
+        vector: Vector to encode
+
+    Returns:
+        Base64 string
+    """
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(data: str) -> np.ndarray:
+    """
+    Decode a vector produced by encode_vector.
+
+    Args:
+        data: Base64 string
+
+    Returns:
+        float32 vector
+    """
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32).copy()
+
+
+class WriteAheadLog:
+    """
+    Append-only log of vector store operations.
+    Each record is fsynced before the call returns and replayed on load.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        """
+        Initialize the write-ahead log.
+
+        Args:
+            path: Path of the log file
+            fsync: Whether to fsync after every append
+        """
+        self.path = path
+        self.fsync = fsync
+        self._file = None
+
+        # Number of records written since the last checkpoint
+        self.entries = 0
+
+        # Bytes of complete records applied by this process, other processes may have appended more
+        self.size = 0
+
+    def _open(self):
+        """Open the log file for appending if it isn't open yet."""
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Append a single record to the log.
+
+        Args:
+            record: JSON-serializable operation record
+        """
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Append several records with a single flush and fsync.
+
+        Args:
+            records: JSON-serializable operation records
+        """
+        if not records:
+            return
+
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        f = self._open()
+        f.write(data)
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+        self.entries += len(records)
+        self.size += len(data.encode("utf-8"))
+
+    def file_size(self) -> int:
+        """
+        Get the current size of the log file, including records of other processes.
+
+        Returns:
+            Size in bytes, 0 if the file doesn't exist
+        """
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def replay(self, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the records in the log.
+        A torn final line left by a crash is ignored.
+
+        Args:
+            offset: Byte offset to start at, e.g. the size already applied
+
+        Returns:
+            Iterator of operation records
+        """
+        if offset == 0:
+            self.entries = 0
+        self.size = offset
+        if not os.path.exists(self.path):
+            return
+
+        good_offset = offset
+        torn = False
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line)
+                except ValueError:
+                    # Only the last line can be partially written
+                    torn = True
+                    break
+                good_offset += len(line)
+                self.size = good_offset
+                self.entries += 1
+                yield record
+
+        if torn:
+            # Drop the torn tail so later appends start on a clean line
+            self.close()
+            with open(self.path, "r+b") as f:
+                f.truncate(good_offset)
+
+    def truncate(self) -> None:
+        """Discard all records, typically after a checkpoint."""
+        self.close()
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.entries = 0
+        self.size = 0
+
+    def close(self) -> None:
+        """Close the underlying file handle."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,249 @@
+"""
+Token-budgeted prompt context for DreamOS agents.
+Memories related to the command, stored facts and recent memories are ranked
+together and added to the context until the agent's token budget is full.
+"""
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence
+
+from ..config import (
+    CONTEXT_TOKEN_ENCODING, CONTEXT_TOKEN_BUDGETS, CONTEXT_ITEM_MAX_TOKENS,
+    CONTEXT_CANDIDATES, CONTEXT_CACHE_SIZE, MEMORY_RRF_K
+)
+from .logging_utils import get_logger
+from .metrics import MetricsTracker
+
+# Initialize logger
+logger = get_logger("context")
+
+# Characters per token assumed when the tokenizer is unavailable
+_CHARS_PER_TOKEN = 4
+
+# Memory lookups kept for reuse; one command's routing and agent calls share one
+_CANDIDATE_CACHE_SIZE = 16
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; None if it can't be loaded (e.g. offline without a cached file)."""
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(CONTEXT_TOKEN_ENCODING)
+            except Exception as e:
+                logger.warning(f"Tokenizer {CONTEXT_TOKEN_ENCODING} unavailable, estimating token counts: {str(e)}")
+                _encoding = None
+            _encoding_loaded = True
+        return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text.
+    
+    Args:
+        text: Text to measure
+    
+    Returns:
+        Number of tokens
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, suffix: str = "...") -> str:
+    """
+    Shorten a text to at most max_tokens tokens.
+    
+    Args:
+        text: Text to shorten
+        max_tokens: Maximum number of tokens, including the suffix
+        suffix: Appended if the text was shortened
+    
+    Returns:
+        The text, or its first tokens followed by the suffix
+    """
+    if max_tokens <= 0:
+        return ""
+    
+    encoding = _get_encoding()
+    if encoding is None:
+        max_chars = max_tokens * _CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        return text[:max(max_chars - len(suffix), 0)] + suffix
+    
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    keep = max(max_tokens - len(encoding.encode(suffix)), 0)
+    return encoding.decode(tokens[:keep]) + suffix
+
+
+class ContextBuilder:
+    """
+    Builder of the memory context sent along with agent prompts.
+    Rendered contexts are cached per agent, command and snapshot of the memory
+    store's version. A command takes one snapshot before it writes anything,
+    so its routing call and agent call share a single memory lookup even when
+    the background writer commits memories in between.
+    """
+    
+    def __init__(self, memory_agent, cache_size: Optional[int] = None):
+        """
+        Initialize the context builder.
+        
+        Args:
+            memory_agent: MemoryAgent whose memories fill the context
+            cache_size: Number of rendered contexts to cache (defaults to CONTEXT_CACHE_SIZE)
+        """
+        self.memory_agent = memory_agent
+        self.cache_size = cache_size if cache_size is not None else CONTEXT_CACHE_SIZE
+        
+        self._lock = threading.Lock()
+        self._contexts = OrderedDict()
+        self._candidates = OrderedDict()
+    
+    def snapshot(self) -> int:
+        """
+        Take the snapshot a command's contexts are cached under.
+        
+        Returns:
+            Current version of the memory store
+        """
+        with self.memory_agent.lease_store() as store:
+            return store.get_version()
+    
+    def build(self,
+              agent_name: str,
+              command: Optional[str] = None,
+              notes: Sequence[str] = (),
+              budget: Optional[int] = None,
+              snapshot: Optional[int] = None) -> str:
+        """
+        Build the context for an LLM call.
+        
+        Args:
+            agent_name: Name of the calling agent, selects the budget in CONTEXT_TOKEN_BUDGETS
+            command: User command the memories should be relevant to
+            notes: Short lines about the session (e.g. tools used), always included
+            budget: Token budget overriding the agent's
+            snapshot: Snapshot taken when the command started (defaults to a new one)
+        
+        Returns:
+            Context string of at most budget tokens
+        """
+        if budget is None:
+            budget = CONTEXT_TOKEN_BUDGETS.get(agent_name, CONTEXT_TOKEN_BUDGETS["terminal_agent"])
+        
+        version = snapshot if snapshot is not None else self.snapshot()
+        key = (agent_name, command, tuple(notes), budget, version)
+        
+        with self._lock:
+            context = self._contexts.get(key)
+            if context is not None:
+                self._contexts.move_to_end(key)
+        MetricsTracker().record_cache_access("context", hits=int(context is not None), misses=int(context is None))
+        if context is not None:
+            return context
+        
+        context = self._render(self._get_candidates(command, version), notes, budget)
+        logger.debug(f"Built {agent_name} context: {count_tokens(context)} of {budget} tokens")
+        
+        with self._lock:
+            self._contexts[key] = context
+            while len(self._contexts) > self.cache_size:
+                self._contexts.popitem(last=False)
+        return context
+    
+    def _get_candidates(self, command: Optional[str], version: int) -> List[Dict[str, Any]]:
+        """
+        Rank the memories that could go into the context.
+        Related memories, facts and recent memories are fused by reciprocal
+        rank, so a memory found by several lookups ranks first.
+        
+        Args:
+            command: User command
+            version: Snapshot of the memory store
+        
+        Returns:
+            Memory dictionaries, best first
+        """
+        key = (command, version)
+        with self._lock:
+            candidates = self._candidates.get(key)
+        if candidates is not None:
+            return candidates
+        
+        rankings = [self.memory_agent.get_recent_memories(CONTEXT_CANDIDATES)]
+        if command:
+            rankings.append(self.memory_agent.search_memories(command, k=CONTEXT_CANDIDATES))
+            rankings.append(self.memory_agent.search_memories(command, k=CONTEXT_CANDIDATES, memory_type="fact"))
+        
+        scores = {}
+        memories = {}
+        for ranking in rankings:
+            for rank, memory in enumerate(ranking):
+                memory_id = memory.get("id")
+                scores[memory_id] = scores.get(memory_id, 0.0) + 1.0 / (MEMORY_RRF_K + rank + 1)
+                memories.setdefault(memory_id, memory)
+        candidates = [memories[memory_id] for memory_id in sorted(scores, key=scores.get, reverse=True)]
+        
+        with self._lock:
+            self._candidates[key] = candidates
+            while len(self._candidates) > _CANDIDATE_CACHE_SIZE:
+                self._candidates.popitem(last=False)
+        return candidates
+    
+    def _render(self, candidates: List[Dict[str, Any]], notes: Sequence[str], budget: int) -> str:
+        """
+        Fill the budget with the best candidates and render them.
+        
+        Args:
+            candidates: Memory dictionaries, best first
+            notes: Session lines to include
+            budget: Token budget
+        
+        Returns:
+            Context string
+        """
+        # Notes may take up to half of the budget, memories get the rest
+        notes_text = truncate_tokens("\n\n".join(note for note in notes if note), budget // 2)
+        remaining = budget - count_tokens(notes_text) if notes_text else budget
+        
+        facts = []
+        others = []
+        for memory in candidates:
+            # Section headers and separators take a few tokens of their own
+            if remaining <= 16:
+                break
+            line = f"[{memory.get('id')}] {truncate_tokens(memory.get('text', ''), min(CONTEXT_ITEM_MAX_TOKENS, remaining - 8))}"
+            tokens = count_tokens(line) + 1
+            if tokens > remaining:
+                continue
+            remaining -= tokens
+            (facts if memory.get("type") == "fact" else others).append((memory.get("id"), line))
+        
+        # Within a section, memories read best in the order they happened
+        parts = []
+        if facts:
+            parts.append("Relevant facts:\n" + "\n".join(line for _, line in sorted(facts)))
+        if others:
+            parts.append("Memories:\n" + "\n".join(line for _, line in sorted(others)))
+        if notes_text:
+            parts.append(notes_text)
+        return "\n\n".join(parts)
+    
+    def clear(self) -> None:
+        """Drop all cached contexts."""
+        with self._lock:
+            self._contexts.clear()
+            self._candidates.clear()
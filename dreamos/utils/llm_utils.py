@@ -5,7 +5,7 @@ import os
 import json
 import time
 from typing import List, Dict, Any, Optional
-from groq import Groq
+from groq import Groq, AsyncGroq
 
 from ..config import GROQ_API_KEY, LLM_MODEL, DEBUG_MODE, CONSOLE_LOG_LEVEL, FILE_LOG_LEVEL, ENABLE_FILE_LOGGING
 from .logging_utils import get_logger
@@ -21,14 +21,48 @@ if not GROQ_API_KEY:
     raise ValueError(error_msg)
 
 groq_client = Groq(api_key=GROQ_API_KEY)
+async_groq_client = AsyncGroq(api_key=GROQ_API_KEY)
 logger.info(f"Initialized Groq client with model: {LLM_MODEL}")
 
+def _log_request(messages: List[Dict[str, str]], model_name: str, temperature: float, max_tokens: int) -> None:
+    """Log an LLM request before it is sent."""
+    logger.debug(f"Calling LLM with model: {model_name}, temperature: {temperature}, max_tokens: {max_tokens}")
+    
+    # Log messages in a readable format
+    for i, msg in enumerate(messages):
+        role = msg.get('role', 'unknown')
+        content = msg.get('content', '')
+        logger.debug(f"Message {i+1} ({role}): {content[:100]}{'...' if len(content) > 100 else ''}")
+    
+    # Only log full messages at trace level
+    if logger.isEnabledFor(5):  # TRACE level (lower than DEBUG)
+        logger.log(5, f"Full messages: {json.dumps(messages, indent=2)}")
+
+def _read_response(response: Any, elapsed_time: float) -> str:
+    """Log an LLM response and return its text."""
+    response_text = response.choices[0].message.content
+    
+    logger.info(f"Received response from Groq API in {elapsed_time:.2f}s")
+    logger.debug(f"Response: {response_text[:100]}{'...' if len(response_text) > 100 else ''}")
+    
+    # Log full response at trace level
+    if logger.isEnabledFor(5):  # TRACE level
+        logger.log(5, f"Full response: {response_text}")
+    
+    # Log usage information if available
+    if hasattr(response, 'usage'):
+        usage = response.usage
+        logger.debug(f"Token usage - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
+    
+    return response_text
+
 @track_llm_latency("gemma2-9b-it")
 def call_llm(
     messages: List[Dict[str, str]],
     model: Optional[str] = None,
     temperature: float = 0.2,
     max_tokens: int = 2048,
+    response_format: Optional[Dict[str, str]] = None,
 ) -> str:
     """
     Call the Groq LLM API with the given messages.
@@ -38,61 +72,100 @@ def call_llm(
         model: Optional model override
         temperature: Sampling temperature
         max_tokens: Maximum tokens to generate
+        response_format: Optional output format, e.g. {"type": "json_object"} for JSON mode
         
     Returns:
         Generated text response
     """
     # Use hardcoded up-to-date model name
     model_name = "gemma2-9b-it"
-    logger.debug(f"Calling LLM with model: {model_name}, temperature: {temperature}, max_tokens: {max_tokens}")
-    
-    # Log messages in a readable format
-    for i, msg in enumerate(messages):
-        role = msg.get('role', 'unknown')
-        content = msg.get('content', '')
-        logger.debug(f"Message {i+1} ({role}): {content[:100]}{'...' if len(content) > 100 else ''}")
-    
-    # Only log full messages at trace level
-    if logger.isEnabledFor(5):  # TRACE level (lower than DEBUG)
-        logger.log(5, f"Full messages: {json.dumps(messages, indent=2)}")
+    _log_request(messages, model_name, temperature, max_tokens)
     
     try:
         start_time = time.time()
         logger.info(f"Sending request to Groq API...")
         
+        # Only pass the format when requested, not every model supports it
+        extra_args = {"response_format": response_format} if response_format else {}
+        
         response = groq_client.chat.completions.create(
             model=model_name,
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
+            **extra_args
         )
         
-        elapsed_time = time.time() - start_time
-        response_text = response.choices[0].message.content
+        return _read_response(response, time.time() - start_time)
+    except Exception as e:
+        logger.error(f"Error calling Groq API: {str(e)}", exc_info=True)
+        return f"Error: {str(e)}"
+
+@track_llm_latency("gemma2-9b-it")
+async def call_llm_async(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    temperature: float = 0.2,
+    max_tokens: int = 2048,
+    response_format: Optional[Dict[str, str]] = None,
+) -> str:
+    """
+    Call the Groq LLM API without blocking the event loop.
+    
+    Args:
+        messages: List of message dictionaries with 'role' and 'content' keys
+        model: Optional model override
+        temperature: Sampling temperature
+        max_tokens: Maximum tokens to generate
+        response_format: Optional output format, e.g. {"type": "json_object"} for JSON mode
         
-        logger.info(f"Received response from Groq API in {elapsed_time:.2f}s")
-        logger.debug(f"Response: {response_text[:100]}{'...' if len(response_text) > 100 else ''}")
+    Returns:
+        Generated text response
+    """
+    # Use hardcoded up-to-date model name
+    model_name = "gemma2-9b-it"
+    _log_request(messages, model_name, temperature, max_tokens)
+    
+    try:
+        start_time = time.time()
+        logger.info(f"Sending async request to Groq API...")
         
-        # Log full response at trace level
-        if logger.isEnabledFor(5):  # TRACE level
-            logger.log(5, f"Full response: {response_text}")
+        # Only pass the format when requested, not every model supports it
+        extra_args = {"response_format": response_format} if response_format else {}
         
-        # Log usage information if available
-        if hasattr(response, 'usage'):
-            usage = response.usage
-            logger.debug(f"Token usage - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
+        response = await async_groq_client.chat.completions.create(
+            model=model_name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **extra_args
+        )
         
-        return response_text
+        return _read_response(response, time.time() - start_time)
     except Exception as e:
         logger.error(f"Error calling Groq API: {str(e)}", exc_info=True)
         return f"Error: {str(e)}"
 
+def _build_messages(system_prompt: str, user_input: str, context: Optional[str] = None) -> List[Dict[str, str]]:
+    """Build the messages of an agent request."""
+    logger.info(f"Generating agent response for user input: {user_input[:50]}{'...' if len(user_input) > 50 else ''}")
+    
+    messages = [{"role": "system", "content": system_prompt}]
+    
+    if context:
+        logger.debug(f"Adding context: {context[:50]}{'...' if len(context) > 50 else ''}")
+        messages.append({"role": "system", "content": f"Additional context: {context}"})
+    
+    messages.append({"role": "user", "content": user_input})
+    return messages
+
 def generate_agent_response(
     system_prompt: str,
     user_input: str,
     context: Optional[str] = None,
     model: Optional[str] = None,
     temperature: float = 0.2,
+    response_format: Optional[Dict[str, str]] = None,
 ) -> str:
     """
     Generate a response from an agent using the LLM.
@@ -103,22 +176,43 @@ def generate_agent_response(
         context: Optional additional context
         model: Optional model override
         temperature: Sampling temperature
+        response_format: Optional output format, e.g. {"type": "json_object"} for JSON mode
         
     Returns:
         Generated response from the agent
     """
-    logger.info(f"Generating agent response for user input: {user_input[:50]}{'...' if len(user_input) > 50 else ''}")
-    
-    messages = [{"role": "system", "content": system_prompt}]
-    
-    if context:
-        logger.debug(f"Adding context: {context[:50]}{'...' if len(context) > 50 else ''}")
-        messages.append({"role": "system", "content": f"Additional context: {context}"})
-    
-    messages.append({"role": "user", "content": user_input})
-    
     return call_llm(
-        messages=messages,
+        messages=_build_messages(system_prompt, user_input, context),
+        model=model,
+        temperature=temperature,
+        response_format=response_format,
+    )
+
+async def generate_agent_response_async(
+    system_prompt: str,
+    user_input: str,
+    context: Optional[str] = None,
+    model: Optional[str] = None,
+    temperature: float = 0.2,
+    response_format: Optional[Dict[str, str]] = None,
+) -> str:
+    """
+    Generate a response from an agent using the LLM, without blocking the event loop.
+    
+    Args:
+        system_prompt: The system prompt for the agent
+        user_input: The user's input
+        context: Optional additional context
+        model: Optional model override
+        temperature: Sampling temperature
+        response_format: Optional output format, e.g. {"type": "json_object"} for JSON mode
+        
+    Returns:
+        Generated response from the agent
+    """
+    return await call_llm_async(
+        messages=_build_messages(system_prompt, user_input, context),
         model=model,
         temperature=temperature,
-    ) 
\ No newline at end of file
+        response_format=response_format,
+    )
\ No newline at end of file
@@ -3,6 +3,7 @@ Metrics tracking utility for DreamOS performance monitoring.
 Tracks agent execution time, memory usage, tool hit frequency, and LLM latency.
 """
 import time
+import asyncio
 import psutil
 import threading
 import json
@@ -34,6 +35,9 @@ class MetricsTracker:
         self.agent_execution_times = defaultdict(list)  # {agent_name: [execution_times]}
         self.llm_latencies = []  # List of LLM API call latencies
         self.tool_usage = defaultdict(int)  # {tool_name: count}
+        self.cache_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})  # {cache_name: {hits, misses}}
+        self.routing_decisions = defaultdict(lambda: defaultdict(int))  # {source: {agent_name: count}}
+        self._routing_lock = threading.Lock()  # Commands are routed from several threads
         self.memory_snapshots = deque(maxlen=100)  # Limited size queue of memory usage snapshots
         
         # Initialize memory tracking
@@ -104,6 +108,17 @@ class MetricsTracker:
         """Record usage of a tool"""
         self.tool_usage[tool_name] += 1
     
+    def record_cache_access(self, cache_name, hits=0, misses=0):
+        """Record hits and misses of a cache"""
+        stats = self.cache_stats[cache_name]
+        stats['hits'] += hits
+        stats['misses'] += misses
+    
+    def record_routing_decision(self, source, agent_name):
+        """Record which agent a command was routed to, and whether the routing cache ('cache'), the local fast path ('fast_path'), a single-call LLM response ('single_call') or the routing LLM call ('llm') decided"""
+        with self._routing_lock:
+            self.routing_decisions[source][agent_name] += 1
+    
     def get_memory_usage(self, time_range_minutes=60):
         """Get memory usage data for the specified time range"""
         now = time.time()
@@ -218,13 +233,41 @@ class MetricsTracker:
             'total_usage': sum(self.tool_usage.values())
         }
     
+    def get_cache_stats(self):
+        """Get hit and miss counts and hit rates of all caches"""
+        caches = {}
+        for cache_name, stats in self.cache_stats.items():
+            total = stats['hits'] + stats['misses']
+            caches[cache_name] = {
+                'hits': stats['hits'],
+                'misses': stats['misses'],
+                'hit_rate': stats['hits'] / total if total else 0
+            }
+        return caches
+    
+    def get_routing_stats(self):
+        """Get routing decision counts by source, the fast-path hit rate and the share of decisions made without a separate routing LLM call"""
+        with self._routing_lock:
+            sources = {source: dict(agents) for source, agents in self.routing_decisions.items()}
+        fast_path = sum(sources.get('fast_path', {}).values())
+        llm = sum(sources.get('llm', {}).values())
+        total = sum(sum(agents.values()) for agents in sources.values())
+        return {
+            'sources': sources,
+            'total': total,
+            'fast_path_rate': fast_path / total if total else 0,
+            'llm_avoided_rate': (total - llm) / total if total else 0
+        }
+    
     def get_all_metrics(self, time_range_minutes=60):
         """Get all metrics in a single call"""
         return {
             'memory': self.get_memory_usage(time_range_minutes),
             'agents': self.get_agent_performance(time_range_minutes),
             'llm': self.get_llm_performance(time_range_minutes),
-            'tools': self.get_tool_usage_stats()
+            'tools': self.get_tool_usage_stats(),
+            'caches': self.get_cache_stats(),
+            'routing': self.get_routing_stats()
         }
     
     def save_metrics_snapshot(self):
@@ -246,6 +289,14 @@ class MetricsTracker:
 def track_execution_time(agent_name):
     """Decorator to track execution time of agent methods"""
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            async def async_wrapper(*args, **kwargs):
+                start_time = time.time()
+                result = await func(*args, **kwargs)
+                MetricsTracker().record_agent_execution(agent_name, time.time() - start_time)
+                return result
+            return async_wrapper
+        
         def wrapper(*args, **kwargs):
             start_time = time.time()
             result = func(*args, **kwargs)
@@ -263,6 +314,14 @@ def track_execution_time(agent_name):
 def track_llm_latency(model_name):
     """Decorator to track LLM API call latency"""
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            async def async_wrapper(*args, **kwargs):
+                start_time = time.time()
+                result = await func(*args, **kwargs)
+                MetricsTracker().record_llm_latency(model_name, time.time() - start_time)
+                return result
+            return async_wrapper
+        
         def wrapper(*args, **kwargs):
             start_time = time.time()
             result = func(*args, **kwargs)
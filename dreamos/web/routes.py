@@ -1,14 +1,17 @@
 """
 Routes for DreamOS web interface
 """
-from flask import render_template, request, jsonify, session
+from flask import render_template, request, jsonify, session, Response, stream_with_context
 from . import app, socketio
 import os
 import sys
+import asyncio
 import threading
 import json
 import time
 import uuid
+import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the parent directory to the path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
@@ -16,6 +19,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from dreamos.agents.terminal_agent import TerminalAgent
 from dreamos.utils.logging_utils import get_logger
 from dreamos.utils.metrics import MetricsTracker
+from dreamos.memory.store_manager import get_store_manager
+from dreamos.config import MEMORY_NAMESPACE_MODE, MEMORY_SESSION_TTL_SECONDS, ASYNC_WORKER_THREADS
 
 # Initialize logger
 logger = get_logger("web_interface")
@@ -23,6 +28,172 @@ logger = get_logger("web_interface")
 # Store agent instances by session ID
 terminal_agents = {}
 commands_history = {}
+session_last_seen = {}
+
+# Guards the session dicts, which the session expiry task changes while requests read them
+sessions_lock = threading.RLock()
+
+def get_session_agent(session_id, touch=False):
+    """Get the terminal agent of a session, or None if it isn't initialized, optionally marking the session as active."""
+    with sessions_lock:
+        agent = terminal_agents.get(session_id)
+        if agent is not None and touch:
+            session_last_seen[session_id] = time.time()
+        return agent
+
+def get_session_history(session_id):
+    """Get a copy of the command history of a session."""
+    with sessions_lock:
+        return list(commands_history.get(session_id, []))
+
+# With real threads, all commands run as coroutines on one event loop, so waiting on the LLM
+# doesn't hold a thread per command; their blocking memory and tool steps run in the loop's
+# worker threads. Under eventlet or gevent the loop's thread would be a green thread whose
+# blocking steps stall the hub, so commands run as Socket.IO background tasks instead.
+# The loop is started by the first initialized agent, once the async mode is configured
+command_loop = None
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background_work():
+    """Start the command loop under the threading async mode, and the session expiry task."""
+    global command_loop, _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+        
+        if socketio.async_mode == 'threading':
+            command_loop = asyncio.new_event_loop()
+            command_loop.set_default_executor(
+                ThreadPoolExecutor(max_workers=ASYNC_WORKER_THREADS, thread_name_prefix="command-worker")
+            )
+            threading.Thread(target=command_loop.run_forever, name="command-loop", daemon=True).start()
+        
+        if MEMORY_SESSION_TTL_SECONDS > 0:
+            socketio.start_background_task(expire_sessions_periodically)
+
+def submit_command(command, session_id, client_sid):
+    """Process a command in the background and emit the response to the client."""
+    if command_loop is not None:
+        asyncio.run_coroutine_threadsafe(run_command(command, session_id, client_sid), command_loop)
+    else:
+        socketio.start_background_task(run_command_sync, command, session_id, client_sid)
+
+async def run_command(command, session_id, client_sid):
+    """Process a command on the command loop, record it in the history and emit the response."""
+    try:
+        # Get agent for this session
+        agent = get_session_agent(session_id, touch=True)
+        if agent is None:
+            raise RuntimeError("Terminal agent not initialized")
+        
+        # Process the command
+        response = await agent.process_command_async(command)
+        finish_command(command, session_id, client_sid, response)
+    
+    except Exception as e:
+        fail_command(command, client_sid, e)
+
+def run_command_sync(command, session_id, client_sid):
+    """Process a command in a Socket.IO background task, record it in the history and emit the response."""
+    try:
+        agent = get_session_agent(session_id, touch=True)
+        if agent is None:
+            raise RuntimeError("Terminal agent not initialized")
+        
+        response = agent.process_command(command)
+        finish_command(command, session_id, client_sid, response)
+    
+    except Exception as e:
+        fail_command(command, client_sid, e)
+
+def finish_command(command, session_id, client_sid, response):
+    """Record a processed command in the history and emit its response via Socket.IO."""
+    with sessions_lock:
+        # The session may have expired while the command ran
+        if session_id in terminal_agents:
+            commands_history.setdefault(session_id, []).append({
+                'command': command,
+                'response': response,
+                'timestamp': time.time()
+            })
+    
+    socketio.emit('command_response', {
+        'command': command,
+        'response': response,
+        'status': 'success'
+    }, room=client_sid)
+
+def fail_command(command, client_sid, error):
+    """Log a failed command and emit the error via Socket.IO."""
+    logger.error(f"Error processing command: {str(error)}", exc_info=True)
+    socketio.emit('command_response', {
+        'command': command,
+        'response': f"Error: {str(error)}",
+        'status': 'error'
+    }, room=client_sid)
+
+def get_memory_namespace(session_id):
+    """Get the memory namespace of a session according to MEMORY_NAMESPACE_MODE."""
+    if MEMORY_NAMESPACE_MODE == 'session':
+        return f"session-{session_id}"
+    if MEMORY_NAMESPACE_MODE == 'user':
+        # Only an identity the server authenticated is trusted, anything the client
+        # sends could name another user; without one the session keeps its memories to itself
+        if request.remote_user:
+            return f"user-{request.remote_user}"
+        logger.warning(f"No authenticated user for session {session_id}, using a session namespace")
+        return f"session-{session_id}"
+    return None
+
+def pop_session(session_id):
+    """Drop the agent and history of a session, returning the agent."""
+    with sessions_lock:
+        commands_history.pop(session_id, None)
+        session_last_seen.pop(session_id, None)
+        return terminal_agents.pop(session_id, None)
+
+def close_session_agent(agent):
+    """Close the memories of a dropped session's agent, deleting them if only the session used them."""
+    if agent is not None:
+        agent.memory_agent.close(timeout=10)
+        if agent.memory_agent.namespace.startswith('session-'):
+            get_store_manager().delete_namespace(agent.memory_agent.namespace)
+
+def close_session(session_id):
+    """Drop the agent and history of a session, deleting its memories if only the session used them."""
+    close_session_agent(pop_session(session_id))
+
+def expire_sessions():
+    """Close sessions idle for longer than MEMORY_SESSION_TTL_SECONDS and delete old session namespaces."""
+    cutoff = time.time() - MEMORY_SESSION_TTL_SECONDS
+    with sessions_lock:
+        idle = [session_id for session_id, last_seen in session_last_seen.items() if last_seen < cutoff]
+    for session_id in idle:
+        with sessions_lock:
+            # Skip sessions that became active again meanwhile
+            if session_last_seen.get(session_id, 0) >= cutoff:
+                continue
+            agent = pop_session(session_id)
+        logger.info(f"Closing idle session {session_id}")
+        close_session_agent(agent)
+    
+    # Namespaces left behind by sessions of earlier server runs
+    with sessions_lock:
+        live = [agent.memory_agent.namespace for agent in terminal_agents.values() if agent is not None]
+    expired = get_store_manager().expire_namespaces('session-', MEMORY_SESSION_TTL_SECONDS, keep=live)
+    if expired:
+        logger.info(f"Deleted {len(expired)} expired session namespaces")
+
+def expire_sessions_periodically():
+    """Run expire_sessions every few minutes in a Socket.IO background task."""
+    while True:
+        try:
+            expire_sessions()
+        except Exception as e:
+            logger.error(f"Error expiring sessions: {str(e)}", exc_info=True)
+        socketio.sleep(min(MEMORY_SESSION_TTL_SECONDS, 300))
 
 @app.route('/')
 def index():
@@ -70,18 +241,29 @@ def initialize_agent():
         enable_voice = data.get('enable_voice', False)
         enable_dataviz = data.get('enable_dataviz', False)
         enable_dbquery = data.get('enable_dbquery', False)
+        start_background_work()
         
         # Check if agent already exists for this session
-        if session_id in terminal_agents and terminal_agents[session_id] is not None:
+        if get_session_agent(session_id, touch=True) is not None:
             logger.info(f"Terminal Agent already initialized for session {session_id}")
-            agent = terminal_agents[session_id]
         else:
             logger.info(f"Initializing Terminal Agent for session {session_id}")
             # Always set web_mode=True to prevent server-side speech in web interface
             # The browser will handle speech synthesis
-            agent = TerminalAgent(enable_voice=enable_voice, web_mode=True)
-            terminal_agents[session_id] = agent
-            commands_history[session_id] = []
+            agent = TerminalAgent(
+                enable_voice=enable_voice,
+                web_mode=True,
+                memory_namespace=get_memory_namespace(session_id)
+            )
+            with sessions_lock:
+                # Another request may have initialized the session meanwhile
+                duplicate = terminal_agents.get(session_id) is not None
+                if not duplicate:
+                    terminal_agents[session_id] = agent
+                    commands_history[session_id] = []
+                    session_last_seen[session_id] = time.time()
+            if duplicate:
+                agent.memory_agent.close(timeout=10)
             logger.info(f"Terminal Agent initialized successfully for session {session_id}")
         
         return jsonify({
@@ -114,7 +296,7 @@ def process_command():
             
         session_id = session['session_id']
         
-        if session_id not in terminal_agents or terminal_agents[session_id] is None:
+        if get_session_agent(session_id) is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Terminal agent not initialized'
@@ -134,42 +316,8 @@ def process_command():
         # Capture the client's Socket.IO session ID
         client_sid = request.sid
         
-        # Process the command asynchronously and emit updates via Socket.IO
-        def process_async(command, session_id, client_sid):
-            try:
-                # Get agent for this session
-                agent = terminal_agents[session_id]
-                
-                # Process the command
-                response = agent.process_command(command)
-                
-                # Store in history
-                if session_id not in commands_history:
-                    commands_history[session_id] = []
-                    
-                commands_history[session_id].append({
-                    'command': command,
-                    'response': response,
-                    'timestamp': time.time()
-                })
-                
-                # Emit the response via Socket.IO
-                socketio.emit('command_response', {
-                    'command': command,
-                    'response': response,
-                    'status': 'success'
-                }, room=client_sid)
-            
-            except Exception as e:
-                logger.error(f"Error processing command: {str(e)}", exc_info=True)
-                socketio.emit('command_response', {
-                    'command': command,
-                    'response': f"Error: {str(e)}",
-                    'status': 'error'
-                }, room=client_sid)
-        
-        # Start processing in a background thread
-        threading.Thread(target=process_async, args=(command, session_id, client_sid)).start()
+        # Process the command in the background and emit the response via Socket.IO
+        submit_command(command, session_id, client_sid)
         
         return jsonify({
             'status': 'processing',
@@ -196,11 +344,10 @@ def get_history():
             
         session_id = session['session_id']
         
-        if session_id not in commands_history:
-            commands_history[session_id] = []
-        
         limit = request.args.get('limit', 10, type=int)
-        history = commands_history[session_id][-limit:] if limit > 0 else commands_history[session_id]
+        history = get_session_history(session_id)
+        if limit > 0:
+            history = history[-limit:]
         
         return jsonify({
             'status': 'success',
@@ -214,6 +361,98 @@ def get_history():
             'message': f"Error retrieving history: {str(e)}"
         }), 500
 
+def memory_filters_from_request():
+    """Read memory filters (type, since, until, tool) from the query string."""
+    return {
+        'memory_type': request.args.getlist('type') or None,
+        'since': request.args.get('since'),
+        'until': request.args.get('until'),
+        'tools_used': request.args.getlist('tool') or None
+    }
+
+@app.route('/api/memories')
+def list_memories():
+    """List memories page by page; pass the returned next_cursor to get the next page."""
+    global terminal_agents
+    
+    try:
+        # Ensure session ID exists
+        if 'session_id' not in session:
+            session['session_id'] = str(uuid.uuid4())
+            logger.info(f"New session created: {session['session_id']}")
+            
+        session_id = session['session_id']
+        
+        terminal_agent = get_session_agent(session_id)
+        if terminal_agent is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Terminal agent not initialized'
+            }), 400
+        
+        memory_agent = terminal_agent.memory_agent
+        filters = memory_filters_from_request()
+        page_size = max(1, min(request.args.get('limit', 50, type=int), 1000))
+        
+        page = memory_agent.list_memories(
+            cursor=request.args.get('cursor', type=int),
+            page_size=page_size,
+            newest_first=request.args.get('order', 'newest') == 'newest',
+            **filters
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'memories': page['memories'],
+            'next_cursor': page['next_cursor'],
+            'total': memory_agent.count_memories(**filters)
+        })
+    
+    except Exception as e:
+        logger.error(f"Error listing memories: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': f"Error listing memories: {str(e)}"
+        }), 500
+
+@app.route('/api/memories/export')
+def export_memories():
+    """Stream all memories matching the filters as JSON lines."""
+    global terminal_agents
+    
+    try:
+        # Ensure session ID exists
+        if 'session_id' not in session:
+            session['session_id'] = str(uuid.uuid4())
+            logger.info(f"New session created: {session['session_id']}")
+            
+        session_id = session['session_id']
+        
+        terminal_agent = get_session_agent(session_id)
+        if terminal_agent is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Terminal agent not initialized'
+            }), 400
+        
+        lines = terminal_agent.memory_agent.export_memories(
+            include_vectors=request.args.get('vectors') == 'true',
+            **memory_filters_from_request()
+        )
+        
+        return Response(
+            stream_with_context(lines),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': 'attachment; filename=memories.jsonl'}
+        )
+    
+    except Exception as e:
+        logger.error(f"Error exporting memories: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': f"Error exporting memories: {str(e)}"
+        }), 500
+
 @app.route('/api/dashboard/stats')
 def get_dashboard_stats():
     """Get real-time dashboard statistics."""
@@ -227,17 +466,16 @@ def get_dashboard_stats():
             
         session_id = session['session_id']
         
-        if session_id not in terminal_agents or terminal_agents[session_id] is None:
+        # Get agent for this session
+        terminal_agent = get_session_agent(session_id)
+        if terminal_agent is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Terminal agent not initialized'
             }), 400
         
-        # Get agent for this session
-        terminal_agent = terminal_agents[session_id]
-        
         # Get memory stats
-        memory_count = len(terminal_agent.memory_agent.get_all_memories())
+        memory_count = terminal_agent.memory_agent.count_memories()
         
         # Get file stats
         files = terminal_agent.file_agent.list_files()
@@ -248,11 +486,10 @@ def get_dashboard_stats():
         tools_count = len(tools_used)
         
         # Get recent commands
-        if session_id not in commands_history:
-            commands_history[session_id] = []
+        history = get_session_history(session_id)
             
         recent_activities = []
-        for idx, history_item in enumerate(reversed(commands_history[session_id][-10:])):
+        for idx, history_item in enumerate(reversed(history[-10:])):
             timestamp = history_item.get('timestamp', 0)
             time_ago = get_time_ago(timestamp)
             
@@ -283,9 +520,11 @@ def get_dashboard_stats():
             )
             timestamps.append(day_label)
             
-            # Simulate memory growth over time since we don't store historical data
-            # In a real implementation, this would pull from actual historical data
-            memory_counts.append(max(10, memory_count - (i * 50)))
+            # Count memories stored before the end of each day
+            day_end = datetime.datetime.fromtimestamp(day_timestamp).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            ) + datetime.timedelta(days=1)
+            memory_counts.append(terminal_agent.memory_agent.count_memories(until=day_end))
         
         # Command type distribution (categories count from history)
         command_types = {
@@ -298,7 +537,7 @@ def get_dashboard_stats():
         }
         
         # Analyze command history to categorize commands
-        for item in commands_history[session_id]:
+        for item in history:
             cmd = item['command'].lower()
             if cmd.startswith(('read', 'write', 'search', 'list files')):
                 command_types['File Operations'] += 1
@@ -393,7 +632,7 @@ def handle_command(data):
         session_id = session['session_id']
         client_sid = request.sid  # Capture client's Socket.IO session ID
         
-        if session_id not in terminal_agents or terminal_agents[session_id] is None:
+        if get_session_agent(session_id) is None:
             logger.error("Terminal agent not initialized when processing Socket.IO command")
             socketio.emit('command_response', {
                 'status': 'error',
@@ -414,41 +653,8 @@ def handle_command(data):
         
         logger.info(f"Processing Socket.IO command: '{command}' from {client_sid}")
         
-        # Process the command asynchronously
-        def process_async(command, session_id, client_sid):
-            try:
-                # Get agent for this session
-                agent = terminal_agents[session_id]
-                
-                response = agent.process_command(command)
-                
-                # Store in history
-                if session_id not in commands_history:
-                    commands_history[session_id] = []
-                    
-                commands_history[session_id].append({
-                    'command': command,
-                    'response': response,
-                    'timestamp': time.time()
-                })
-                
-                # Emit the response
-                socketio.emit('command_response', {
-                    'command': command,
-                    'response': response,
-                    'status': 'success'
-                }, room=client_sid)
-            
-            except Exception as e:
-                logger.error(f"Error processing Socket.IO command: {str(e)}", exc_info=True)
-                socketio.emit('command_response', {
-                    'command': command,
-                    'response': f"Error: {str(e)}",
-                    'status': 'error'
-                }, room=client_sid)
-        
-        # Start processing in a background thread with necessary parameters
-        threading.Thread(target=process_async, args=(command, session_id, client_sid)).start()
+        # Process the command in the background
+        submit_command(command, session_id, client_sid)
     
     except Exception as e:
         logger.error(f"Error handling Socket.IO command: {str(e)}", exc_info=True)
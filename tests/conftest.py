@@ -0,0 +1,15 @@
+"""
+Shared test setup for DreamOS.
+Data files go to a temporary directory, and the LLM client gets a dummy key
+since no test calls the API.
+"""
+import os
+import tempfile
+
+_data_dir = tempfile.mkdtemp(prefix="dreamos-tests-")
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+os.environ["VECTOR_DB_PATH"] = os.path.join(_data_dir, "vector_db")
+os.environ["PSEUDO_FILES_PATH"] = os.path.join(_data_dir, "pseudo_files.json")
+os.environ["ROUTING_CACHE_PATH"] = ""
+os.environ["DEBUG_MODE"] = "false"
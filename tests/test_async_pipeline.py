@@ -0,0 +1,100 @@
+"""
+Tests for the asyncio command pipeline of the Terminal Agent.
+The LLM is replaced by a coroutine that answers after a fixed delay.
+"""
+import time
+import asyncio
+import itertools
+
+import pytest
+
+from dreamos.agents import terminal_agent as terminal_module
+from dreamos.agents import memory_agent as memory_module
+from dreamos.agents import file_agent as file_module
+from dreamos.agents import plugin_agent as plugin_module
+from dreamos.agents import router as router_module
+from dreamos.agents.terminal_agent import TerminalAgent
+
+LLM_DELAY = 0.2
+
+_namespaces = itertools.count()
+
+
+class FakeLLM:
+    """Async LLM answering after LLM_DELAY and recording the calls in flight."""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, system_prompt, user_input, context=None, **kwargs):
+        self.calls.append(user_input)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(LLM_DELAY)
+        finally:
+            self.in_flight -= 1
+        if "Decide which agent should handle" in system_prompt:
+            return "terminal_agent"
+        return f"answer to {user_input}"
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = FakeLLM()
+    for module in (terminal_module, memory_module, file_module, plugin_module):
+        monkeypatch.setattr(module, "generate_agent_response_async", fake)
+    return fake
+
+
+@pytest.fixture
+def agent(llm, monkeypatch):
+    # Routing decisions cached by other tests would skip the LLM
+    monkeypatch.setattr(router_module, "_shared_caches", {})
+    agent = TerminalAgent(memory_namespace=f"async-test-{next(_namespaces)}")
+    yield agent
+    agent.flush_memories(10)
+    agent.memory_agent.store_manager.close_namespace(agent.memory_agent.namespace)
+
+
+def test_command_is_answered_and_remembered(agent, llm):
+    response = asyncio.run(agent.process_command_async("remember that my car is blue"))
+
+    assert response == "answer to remember that my car is blue"
+    assert agent.flush_memories(10)
+    texts = [memory["text"] for memory in agent.memory_agent.get_all_memories()]
+    assert "User command: remember that my car is blue" in texts
+    assert any(text.startswith("Response to 'remember that my car is blue'") for text in texts)
+
+
+def test_unroutable_command_asks_the_llm_for_an_agent(agent, llm):
+    response = asyncio.run(agent.process_command_async("tell me a story"))
+
+    assert response == "answer to tell me a story"
+    assert llm.calls == ["tell me a story", "tell me a story"]
+
+
+def test_llm_routing_decision_is_cached(agent, llm):
+    asyncio.run(agent.process_command_async("tell me a story"))
+    asyncio.run(agent.process_command_async("Tell me a story!"))
+
+    # The second command only needs the answering call
+    assert llm.calls == ["tell me a story", "tell me a story", "Tell me a story!"]
+    assert agent.routing_cache.get("tell me a story") == "terminal_agent"
+
+
+def test_commands_wait_for_the_llm_concurrently(agent, llm):
+    commands = [f"remember that item {i} is in box {i}" for i in range(8)]
+
+    async def run_all():
+        return await asyncio.gather(*(agent.process_command_async(command) for command in commands))
+
+    start = time.monotonic()
+    responses = asyncio.run(run_all())
+    elapsed = time.monotonic() - start
+
+    assert responses == [f"answer to {command}" for command in commands]
+    assert llm.max_in_flight == len(commands)
+    assert elapsed < len(commands) * LLM_DELAY / 2
@@ -0,0 +1,73 @@
+"""
+Tests for adding many memories with one call.
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+from dreamos.agents.memory_agent import MemoryAgent
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+_namespaces = itertools.count()
+
+
+def test_batch_gets_consecutive_ids_and_metadata(tmp_path):
+    store = VectorStore(str(tmp_path))
+    vectors = np.random.default_rng(0).standard_normal((50, DIM)).astype(np.float32)
+
+    ids = store.add_memories(
+        [f"memory {i}" for i in range(50)],
+        vectors,
+        [{"type": "fact"} if i % 2 else None for i in range(50)]
+    )
+
+    assert ids == list(range(50))
+    assert store.count_memories() == 50
+    assert store.count_memories(memory_type="fact") == 25
+    assert store.get_memory_by_id(ids[7])["text"] == "memory 7"
+    assert store.search(vectors[31], k=1)[0]["id"] == ids[31]
+    assert store.add_memories(["one more"], vectors[:1]) == [50]
+    store.close()
+
+
+def test_mismatched_lengths_are_rejected(tmp_path):
+    store = VectorStore(str(tmp_path))
+    vectors = np.random.default_rng(0).standard_normal((2, DIM)).astype(np.float32)
+
+    with pytest.raises(ValueError):
+        store.add_memories(["a", "b"], vectors, [{}])
+    assert store.add_memories([], vectors[:0]) == []
+    assert store.count_memories() == 0
+    store.close()
+
+
+def test_large_batch_is_checkpointed_instead_of_logged(tmp_path):
+    store = VectorStore(str(tmp_path), checkpoint_interval=10)
+    vectors = np.random.default_rng(0).standard_normal((25, DIM)).astype(np.float32)
+
+    store.add_memories([f"memory {i}" for i in range(25)], vectors)
+
+    assert store.wal.entries == 0
+    store.close()
+
+    reopened = VectorStore(str(tmp_path))
+    assert reopened.count_memories() == 25
+    assert reopened.search(vectors[12], k=1)[0]["text"] == "memory 12"
+    reopened.close()
+
+
+def test_memory_agent_embeds_in_batches():
+    agent = MemoryAgent(namespace=f"bulk-test-{next(_namespaces)}")
+    texts = [f"note number {i} about topic {i % 3}" for i in range(25)]
+
+    ids = agent.add_memories(texts, [{"type": "fact"}] * 25, batch_size=10)
+
+    assert len(ids) == 25
+    assert agent.count_memories(memory_type="fact") == 25
+    assert agent.search_memories("note number 17 about topic 2", k=1)[0]["text"] == texts[17]
+    with pytest.raises(ValueError):
+        agent.add_memories(texts, [{}])
+    agent.store_manager.close_namespace(agent.namespace)
@@ -0,0 +1,118 @@
+"""
+Tests for concurrent use of the vector store by threads and by several
+store instances sharing the same files, as worker processes do.
+"""
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from dreamos.memory.locks import ReadWriteLock
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+
+def random_vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+def test_readers_share_the_lock_and_writers_exclude_them():
+    lock = ReadWriteLock()
+    inside = []
+    events = []
+
+    def reader():
+        with lock.read_lock():
+            inside.append(1)
+            time.sleep(0.05)
+            events.append(("read", len(inside)))
+            inside.pop()
+
+    def writer():
+        with lock.write_lock():
+            events.append(("write", len(inside)))
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    time.sleep(0.01)
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    for thread in readers + [writer_thread]:
+        thread.join()
+
+    # Readers overlapped, and the writer only ran once they had all left
+    assert max(count for kind, count in events if kind == "read") > 1
+    assert events[-1] == ("write", 0)
+
+
+def test_lock_nesting():
+    lock = ReadWriteLock()
+    with lock.write_lock():
+        with lock.write_lock(), lock.read_lock():
+            pass
+    with lock.read_lock():
+        with lock.read_lock():
+            pass
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+
+
+def test_concurrent_writes_and_searches(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.add_memories(["seed"], random_vectors(1, seed=99))
+    errors = []
+
+    def write(worker):
+        try:
+            vectors = random_vectors(25, seed=worker)
+            for i in range(0, 25, 5):
+                store.add_memories([f"memory {worker}-{j}" for j in range(i, i + 5)], vectors[i:i + 5])
+        except Exception as e:
+            errors.append(e)
+
+    def search(worker):
+        try:
+            for vector in random_vectors(20, seed=100 + worker):
+                assert store.search(vector, k=3)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+    threads += [threading.Thread(target=search, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert store.count_memories() == 101
+    assert store.get_index_stats()["ntotal"] == 101
+    assert store.search(random_vectors(25, seed=2)[7], k=1)[0]["text"] == "memory 2-7"
+    store.close()
+
+
+def test_store_instances_see_each_others_writes(tmp_path):
+    first = VectorStore(str(tmp_path))
+    second = VectorStore(str(tmp_path))
+    vectors = random_vectors(4)
+
+    first.add_memories(["a", "b"], vectors[:2])
+    assert second.count_memories() == 2
+    assert second.search(vectors[1], k=1)[0]["text"] == "b"
+
+    # IDs stay unique across the instances
+    assert second.add_memories(["c"], vectors[2:3]) == [2]
+    first.delete_memory(0)
+    assert second.get_memory_by_id(0) is None
+
+    # A checkpoint by one instance makes the other reload the index
+    first.checkpoint()
+    assert second.add_memories(["d"], vectors[3:]) == [3]
+    assert first.search(vectors[3], k=1)[0]["text"] == "d"
+    assert first.count_memories() == second.count_memories() == 3
+
+    first.close()
+    second.close()
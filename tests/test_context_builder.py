@@ -0,0 +1,62 @@
+"""
+Tests for the token-budgeted context builder.
+"""
+from contextlib import contextmanager
+
+from dreamos.utils.context_builder import ContextBuilder
+
+
+class FakeStore:
+    def __init__(self):
+        self.version = 0
+
+    def get_version(self):
+        return self.version
+
+
+class FakeMemoryAgent:
+    """Memory agent serving fixed memories and counting lookups."""
+
+    def __init__(self):
+        self.store = FakeStore()
+        self.searches = 0
+        self.memories = [{"id": i, "text": f"memory {i}", "type": "command"} for i in range(5)]
+
+    @contextmanager
+    def lease_store(self):
+        yield self.store
+
+    def get_recent_memories(self, limit):
+        return self.memories[::-1][:limit]
+
+    def search_memories(self, query, k, memory_type=None):
+        self.searches += 1
+        return [] if memory_type else self.memories[:k]
+
+
+def test_command_contexts_share_lookups_across_writes():
+    agent = FakeMemoryAgent()
+    builder = ContextBuilder(agent)
+
+    snapshot = builder.snapshot()
+    router_context = builder.build("router", "list files", snapshot=snapshot)
+    searches = agent.searches
+
+    # The background writer commits the command memory before the agent context is built
+    agent.store.version += 1
+    agent_context = builder.build("file_agent", "list files", snapshot=snapshot)
+
+    assert agent.searches == searches
+    assert "memory 0" in router_context and "memory 0" in agent_context
+    assert builder.build("router", "list files", snapshot=snapshot) == router_context
+
+
+def test_new_snapshot_sees_new_memories():
+    agent = FakeMemoryAgent()
+    builder = ContextBuilder(agent)
+    builder.build("router", "list files")
+
+    agent.memories.append({"id": 5, "text": "memory 5", "type": "command"})
+    agent.store.version += 1
+
+    assert "memory 5" in builder.build("router", "list files")
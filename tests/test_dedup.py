@@ -0,0 +1,99 @@
+"""
+Tests for merging repeated memories into the existing copy.
+"""
+import numpy as np
+
+from dreamos.memory.embeddings import get_embedder
+from dreamos.memory.metadata_store import MetadataStore
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+
+def test_exact_copy_is_merged(tmp_path):
+    store = VectorStore(str(tmp_path))
+    vector = np.random.default_rng(0).standard_normal(DIM).astype(np.float32)
+    first = store.add_memory("my car is blue", vector, {"type": "fact"}, dedup=True)
+
+    # Whitespace differences don't matter, and the hash matches before any vector search
+    other = np.random.default_rng(1).standard_normal(DIM).astype(np.float32)
+    assert store.add_memory("my  car is blue ", other, {"type": "fact"}, dedup=True) == first
+
+    assert store.count_memories() == 1
+    assert store.get_memory_by_id(first)["seen_count"] == 2
+    store.close()
+
+
+def test_copies_of_another_type_are_kept(tmp_path):
+    store = VectorStore(str(tmp_path))
+    vector = np.random.default_rng(0).standard_normal(DIM).astype(np.float32)
+    first = store.add_memory("my car is blue", vector, {"type": "fact"}, dedup=True)
+
+    assert store.add_memory("my car is blue", vector, {"type": "command"}, dedup=True) != first
+    assert store.count_memories() == 2
+    store.close()
+
+
+def test_near_duplicate_below_threshold_is_merged(tmp_path):
+    store = VectorStore(str(tmp_path))
+    rng = np.random.default_rng(0)
+    vector = rng.standard_normal(DIM).astype(np.float32)
+    first = store.add_memory("my car is blue", vector, dedup=True)
+
+    nearby = vector + 0.01 * rng.standard_normal(DIM).astype(np.float32)
+    assert store.add_memory("my car is blue!", nearby, dedup=True) == first
+
+    distant = vector + 0.5 * rng.standard_normal(DIM).astype(np.float32)
+    assert store.add_memory("my car was blue", distant, dedup=True) != first
+    assert store.count_memories() == 2
+    store.close()
+
+
+def test_distinct_short_texts_are_not_merged(tmp_path):
+    store = VectorStore(str(tmp_path))
+    embedder = get_embedder("hashing", dim=DIM)
+    texts = ["yes", "no", "call mom", "call dad", "i like tea", "i like coffee"]
+
+    ids = [store.add_memory(text, embedder.embed_one(text), dedup=True) for text in texts]
+
+    assert len(set(ids)) == len(texts)
+    assert store.count_memories() == len(texts)
+    store.close()
+
+
+def test_copies_within_a_batch_are_merged(tmp_path):
+    store = VectorStore(str(tmp_path))
+    vectors = np.random.default_rng(0).standard_normal((3, DIM)).astype(np.float32)
+
+    ids = store.add_memories(["a", "b", "a"], vectors, dedup=True)
+
+    assert ids[0] == ids[2] != ids[1]
+    assert store.get_memory_by_id(ids[0])["seen_count"] == 2
+    store.close()
+
+
+def test_dedup_is_off_unless_requested(tmp_path):
+    store = VectorStore(str(tmp_path))
+    vector = np.random.default_rng(0).standard_normal(DIM).astype(np.float32)
+
+    assert store.add_memory("hello", vector) != store.add_memory("hello", vector)
+    store.close()
+
+
+def test_record_duplicate_bumps_seen_count_and_last_seen(tmp_path):
+    metadata_store = MetadataStore(str(tmp_path / "metadata.db"))
+    metadata_store.insert_many([{"id": 0, "text": "hello", "timestamp": "2026-01-01T00:00:00"}])
+
+    metadata = metadata_store.record_duplicate(0, "2026-01-02T00:00:00")
+    assert metadata["seen_count"] == 2
+    assert metadata["last_seen"] == "2026-01-02T00:00:00"
+
+    metadata = metadata_store.record_duplicate(0, "2026-01-03T00:00:00")
+    assert metadata["seen_count"] == 3
+    assert metadata["last_seen"] == "2026-01-03T00:00:00"
+    assert metadata["timestamp"] == "2026-01-01T00:00:00"
+
+    # Deleted memories aren't counted
+    metadata_store.mark_deleted([0])
+    assert metadata_store.record_duplicate(0, "2026-01-04T00:00:00") is None
+    metadata_store.close()
@@ -0,0 +1,123 @@
+"""
+Tests for the two-tier embedding cache and the cached embedder.
+"""
+import numpy as np
+
+from dreamos.memory import embedding_cache
+from dreamos.memory.embedding_cache import EmbeddingCache, CachedEmbedder, text_key
+from dreamos.memory.embeddings import HashingEmbedder
+
+DIM = 768
+
+# Size of one row of the disk tier
+ROW_BYTES = DIM * 4 + embedding_cache._ROW_OVERHEAD
+
+
+def random_vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+class CountingEmbedder(HashingEmbedder):
+    """Hashing embedder recording the texts it is asked to embed."""
+
+    def __init__(self):
+        super().__init__(dim=DIM)
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return super().embed(texts)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2, max_disk_mb=0)
+    vectors = random_vectors(3)
+    cache.put_many("e", {b"a": vectors[0], b"b": vectors[1]})
+    cache.get_many("e", [b"a"])
+    cache.put_many("e", {b"c": vectors[2]})
+
+    found = cache.get_many("e", [b"a", b"b", b"c"])
+    assert set(found) == {b"a", b"c"}
+    assert np.array_equal(found[b"a"], vectors[0])
+    assert cache.get_stats()["memory_entries"] == 2
+
+
+def test_cached_vectors_are_read_only():
+    cache = EmbeddingCache(max_entries=10, max_disk_mb=0)
+    vector = random_vectors(1)[0]
+    cache.put_many("e", {b"a": vector})
+    vector[0] = 1000.0
+
+    cached = cache.get_many("e", [b"a"])[b"a"]
+    assert cached[0] != 1000.0
+    assert not cached.flags.writeable
+
+
+def test_disk_tier_survives_reopening(tmp_path):
+    db_path = str(tmp_path / "embeddings.db")
+    vectors = random_vectors(2)
+    cache = EmbeddingCache(db_path=db_path, max_entries=10, max_disk_mb=1)
+    cache.put_many("e", {b"a": vectors[0], b"b": vectors[1]})
+    cache.close()
+
+    reopened = EmbeddingCache(db_path=db_path, max_entries=10, max_disk_mb=1)
+    assert reopened.get_stats()["memory_entries"] == 0
+    found = reopened.get_many("e", [b"a", b"b", b"missing"])
+    assert set(found) == {b"a", b"b"}
+    assert np.array_equal(found[b"b"], vectors[1])
+
+    # Disk hits are promoted into memory
+    assert reopened.get_stats()["memory_entries"] == 2
+    reopened.close()
+
+
+def test_keys_are_scoped_by_embedder(tmp_path):
+    cache = EmbeddingCache(db_path=str(tmp_path / "embeddings.db"), max_entries=10, max_disk_mb=1)
+    cache.put_many("first", {text_key("hello"): random_vectors(1)[0]})
+
+    assert cache.get_many("second", [text_key("hello")]) == {}
+    assert text_key("hello") in cache.get_many("first", [text_key("hello")])
+    cache.close()
+
+
+def test_disk_eviction_trims_least_recently_used_rows(tmp_path):
+    budget_rows = 20
+    cache = EmbeddingCache(db_path=str(tmp_path / "embeddings.db"), max_entries=0,
+                           max_disk_mb=budget_rows * ROW_BYTES / (1024 * 1024))
+    vectors = random_vectors(budget_rows + 1)
+    cache.put_many("e", {bytes([i]): vectors[i] for i in range(budget_rows)})
+    assert cache.get_stats()["disk_bytes"] == budget_rows * ROW_BYTES
+
+    # Row i was last used i hours ago
+    with cache._conn:
+        cache._conn.executemany(
+            "UPDATE embeddings SET last_used = last_used - ? WHERE key = ?",
+            [(3600 * i, bytes([i])) for i in range(budget_rows)]
+        )
+
+    cache.put_many("e", {bytes([budget_rows]): vectors[budget_rows]})
+
+    stats = cache.get_stats()
+    assert stats["disk_bytes"] <= stats["max_disk_bytes"] * embedding_cache._EVICT_TO
+    kept = set(cache.get_many("e", [bytes([i]) for i in range(budget_rows + 1)]))
+    assert len(kept) == stats["disk_bytes"] // ROW_BYTES
+    assert kept == {bytes([i]) for i in range(len(kept) - 1)} | {bytes([budget_rows])}
+    cache.close()
+
+
+def test_cached_embedder_embeds_each_text_once(tmp_path):
+    embedder = CountingEmbedder()
+    cache = EmbeddingCache(db_path=str(tmp_path / "embeddings.db"), max_entries=10, max_disk_mb=1)
+    cached = CachedEmbedder(embedder, cache)
+    assert (cached.name, cached.dim) == (embedder.name, embedder.dim)
+
+    texts = ["list my files", "what is 5*7", "list my files"]
+    first = cached.embed(texts)
+    assert embedder.embedded == ["list my files", "what is 5*7"]
+    assert np.allclose(first, HashingEmbedder(dim=DIM).embed(texts), atol=1e-6)
+
+    second = cached.embed(["what is 5*7", "remember my car is blue"])
+    assert embedder.embedded[2:] == ["remember my car is blue"]
+    assert np.array_equal(second[0], first[1])
+    assert cached.embed([]).shape == (0, DIM)
+    cache.close()
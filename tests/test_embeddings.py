@@ -0,0 +1,75 @@
+"""
+Tests for the deterministic hashing embedder and switching embedders.
+"""
+import numpy as np
+import pytest
+
+from dreamos.memory import embeddings
+from dreamos.memory.embeddings import HashingEmbedder, get_embedder, register_embedder, available_embedders
+from dreamos.memory.vector_store import VectorStore
+
+TEXTS = ["remember my car is blue", "what colour is my car", "calculate 5 * 7", "", "Ünïcödé text ✓"]
+
+
+def test_vectors_are_deterministic_and_normalized():
+    first = HashingEmbedder(dim=768).embed(TEXTS)
+    second = get_embedder("hashing", dim=768).embed(TEXTS)
+
+    assert first.dtype == np.float32
+    assert first.shape == (len(TEXTS), 768)
+    assert np.array_equal(first, second)
+    assert np.allclose(np.linalg.norm(first[[0, 1, 2, 4]], axis=1), 1.0, atol=1e-5)
+    assert not first[3].any()
+
+
+def test_batch_matches_single_texts():
+    embedder = HashingEmbedder(dim=256)
+    batch = embedder.embed(TEXTS)
+
+    for text, row in zip(TEXTS, batch):
+        assert np.allclose(embedder.embed_one(text), row, atol=1e-6)
+    assert embedder.embed([]).shape == (0, 256)
+
+
+def test_case_is_ignored_and_shared_words_give_closer_vectors():
+    vectors = HashingEmbedder(dim=768).embed(["my car is blue", "my car is red", "the weather in paris"])
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+    assert np.allclose(HashingEmbedder(dim=768).embed_one("My CAR is Blue"), vectors[0])
+
+
+def test_settings_change_the_name_and_vectors():
+    default = HashingEmbedder(dim=768)
+    seeded = HashingEmbedder(dim=768, seed=1)
+
+    assert default.name != seeded.name
+    assert not np.allclose(default.embed_one(TEXTS[0]), seeded.embed_one(TEXTS[0]))
+
+
+def test_backends_are_registered_by_name(monkeypatch):
+    monkeypatch.setattr(embeddings, "_BACKENDS", dict(embeddings._BACKENDS))
+
+    class ConstantEmbedder(HashingEmbedder):
+        pass
+
+    register_embedder("constant-test", ConstantEmbedder)
+    assert "constant-test" in available_embedders()
+    assert isinstance(get_embedder("constant-test", dim=8), ConstantEmbedder)
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        get_embedder("missing")
+
+
+def test_store_is_reembedded_for_another_embedder(tmp_path):
+    old = HashingEmbedder(dim=768, seed=1)
+    new = HashingEmbedder(dim=768)
+    store = VectorStore(str(tmp_path), compaction_ratio=1.0)
+    store.ensure_embedder(old.name, old.embed)
+    texts = ["my car is blue", "the meeting is on friday", "my cat is called felix"]
+    ids = store.add_memories(texts, old.embed(texts))
+    store.delete_memory(ids[0])
+
+    assert store.ensure_embedder(new.name, new.embed) == 2
+    assert store.ensure_embedder(new.name, new.embed) == 0
+
+    assert store.get_index_stats()["tombstones"] == 0
+    assert store.search(new.embed_one("my cat is called felix"), k=1)[0]["id"] == ids[2]
+    store.close()
@@ -0,0 +1,148 @@
+"""
+Tests for the single-call mode: parsing the JSON envelope, running its tool
+and falling back to separate calls when the envelope is invalid.
+"""
+import json
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from dreamos.agents import terminal_agent as terminal_module
+from dreamos.agents import memory_agent as memory_module
+from dreamos.agents import file_agent as file_module
+from dreamos.agents import plugin_agent as plugin_module
+from dreamos.agents import router as router_module
+from dreamos.agents.envelope import parse_envelope, render_envelope_prompt
+from dreamos.agents.terminal_agent import TerminalAgent
+from dreamos.utils import llm_utils
+
+TOOLS = ["calculator", "web_browser"]
+
+_namespaces = itertools.count()
+
+
+def envelope(agent="terminal_agent", tool=None, arguments=None, answer="hello"):
+    return json.dumps({"agent": agent, "tool": tool, "arguments": arguments, "answer": answer})
+
+
+def test_answer_envelope_is_accepted():
+    assert parse_envelope(envelope(agent=" Memory_Agent ", answer=" Your car is blue. "), TOOLS) == {
+        "agent": "memory_agent", "tool": None, "tool_input": None, "answer": "Your car is blue."
+    }
+
+
+def test_tool_envelope_is_accepted():
+    response = "```json\n" + envelope("plugin_agent", "Calculator", {"expression": "19 * 23"}, None) + "\n```"
+    assert parse_envelope(response, TOOLS) == {
+        "agent": "plugin_agent", "tool": "calculator", "tool_input": "19 * 23", "answer": None
+    }
+
+
+def test_null_tool_is_ignored():
+    assert parse_envelope(envelope(tool="null", arguments="x"), TOOLS)["tool"] is None
+
+
+@pytest.mark.parametrize("response", [
+    "not json at all",
+    '{"agent": "terminal_agent", "answer": ',
+    "[1, 2, 3]",
+    envelope(agent="shell_agent"),
+    envelope(agent=None),
+    envelope("plugin_agent", "rm_rf", "/", None),
+    envelope("file_agent", "calculator", "1+1", None),
+    envelope("plugin_agent", "calculator", None, None),
+    envelope("plugin_agent", "calculator", {"unknown": "1+1"}, None),
+    envelope("plugin_agent", "calculator", "   ", None),
+    envelope(answer=None),
+    envelope(answer=""),
+    envelope(answer=["a list"])
+])
+def test_invalid_envelopes_are_rejected(response):
+    assert parse_envelope(response, TOOLS) is None
+
+
+def test_prompt_lists_the_tools():
+    prompt = render_envelope_prompt({"calculator": "Evaluates expressions"})
+    assert "- calculator: Evaluates expressions" in prompt
+    assert '{"agent": "<agent name>"' in prompt
+    assert "- none" in render_envelope_prompt({})
+
+
+class FakeLLM:
+    """Async LLM answering single calls with a fixed envelope and agent calls with their input."""
+
+    def __init__(self, envelope_response):
+        self.envelope_response = envelope_response
+        self.calls = []
+
+    async def __call__(self, system_prompt, user_input, context=None, response_format=None, **kwargs):
+        self.calls.append(response_format)
+        if response_format:
+            return self.envelope_response
+        if "Decide which agent should handle" in system_prompt:
+            return "terminal_agent"
+        return f"answer to {user_input}"
+
+
+def run_single_call(monkeypatch, envelope_response, command="tell me a story"):
+    llm = FakeLLM(envelope_response)
+    for module in (terminal_module, memory_module, file_module, plugin_module):
+        monkeypatch.setattr(module, "generate_agent_response_async", llm)
+    monkeypatch.setattr(terminal_module, "ROUTER_SINGLE_CALL", True)
+    monkeypatch.setattr(router_module, "_shared_caches", {})
+
+    agent = TerminalAgent(memory_namespace=f"envelope-test-{next(_namespaces)}")
+    try:
+        return asyncio.run(agent.process_command_async(command)), llm.calls
+    finally:
+        agent.flush_memories(10)
+        agent.memory_agent.store_manager.close_namespace(agent.memory_agent.namespace)
+
+
+def test_single_call_runs_the_chosen_tool(monkeypatch):
+    response, calls = run_single_call(monkeypatch, envelope("plugin_agent", "calculator", "19*23", None))
+
+    assert response == "The result of 19*23 is 437."
+    assert calls == [{"type": "json_object"}]
+
+
+def test_single_call_returns_the_answer(monkeypatch):
+    response, calls = run_single_call(monkeypatch, envelope(answer="Once upon a time"))
+
+    assert response == "Once upon a time"
+    assert len(calls) == 1
+
+
+def test_invalid_envelope_falls_back_to_separate_calls(monkeypatch):
+    response, calls = run_single_call(monkeypatch, envelope(agent="shell_agent"))
+
+    assert response == "answer to tell me a story"
+    assert calls == [{"type": "json_object"}, None, None]
+
+
+class FakeCompletions:
+    """Async chat completions endpoint recording the request arguments."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        message = SimpleNamespace(content='{"agent": "terminal_agent"}')
+        usage = SimpleNamespace(prompt_tokens=1, completion_tokens=1, total_tokens=2)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_async_client_passes_the_format_only_when_set(monkeypatch):
+    completions = FakeCompletions()
+    monkeypatch.setattr(llm_utils, "async_groq_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    messages = [{"role": "user", "content": "hi"}]
+
+    assert asyncio.run(llm_utils.call_llm_async(messages, response_format={"type": "json_object"})) == '{"agent": "terminal_agent"}'
+    asyncio.run(llm_utils.call_llm_async(messages))
+
+    assert completions.requests[0]["response_format"] == {"type": "json_object"}
+    assert "response_format" not in completions.requests[1]
+
@@ -0,0 +1,80 @@
+"""
+Tests for metadata-filtered vector search.
+"""
+import datetime
+
+import numpy as np
+
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+TYPES = ("command", "response", "fact")
+
+
+def filled_store(tmp_path, **kwargs):
+    """Store with 30 memories cycling through TYPES, one day apart, every third using the calculator."""
+    store = VectorStore(str(tmp_path), compaction_ratio=1.0, **kwargs)
+    vectors = np.random.default_rng(0).standard_normal((30, DIM)).astype(np.float32)
+    start = datetime.datetime(2026, 1, 1)
+    store.add_memories(
+        [f"memory {i}" for i in range(30)],
+        vectors,
+        [{
+            "type": TYPES[i % 3],
+            "timestamp": (start + datetime.timedelta(days=i)).isoformat(),
+            "tools_used": ["calculator"] if i % 3 == 0 else ["web_search"]
+        } for i in range(30)]
+    )
+    return store, vectors
+
+
+def test_type_filter_returns_k_matches(tmp_path):
+    store, vectors = filled_store(tmp_path)
+
+    # The nearest memory is a command, yet k facts come back
+    results = store.search(vectors[0], k=5, memory_type="fact")
+    assert len(results) == 5
+    assert all(memory["type"] == "fact" for memory in results)
+
+    results = store.search(vectors[0], k=30, memory_type=["fact", "response"])
+    assert len(results) == 20
+    assert {memory["type"] for memory in results} == {"fact", "response"}
+    store.close()
+
+
+def test_time_range_is_inclusive_then_exclusive(tmp_path):
+    store, vectors = filled_store(tmp_path)
+
+    results = store.search(vectors[0], k=30, since="2026-01-05T00:00:00", until=datetime.datetime(2026, 1, 8))
+    assert sorted(memory["text"] for memory in results) == ["memory 4", "memory 5", "memory 6"]
+    assert store.count_memories(since="2026-01-05T00:00:00", until=datetime.datetime(2026, 1, 8)) == 3
+    store.close()
+
+
+def test_tools_and_type_filters_combine(tmp_path):
+    store, vectors = filled_store(tmp_path)
+
+    results = store.search(vectors[1], k=30, tools_used=["calculator"])
+    assert len(results) == 10
+    assert all(int(memory["text"].split()[1]) % 3 == 0 for memory in results)
+    assert store.search(vectors[1], k=30, tools_used=["calculator"], memory_type="fact") == []
+    store.close()
+
+
+def test_filters_skip_deleted_memories(tmp_path):
+    store, vectors = filled_store(tmp_path)
+    store.delete_memories([2, 5])
+
+    results = store.search(vectors[2], k=30, memory_type="fact")
+    assert len(results) == 8
+    assert not {2, 5} & {memory["id"] for memory in results}
+    store.close()
+
+
+def test_selective_filter_on_approximate_index(tmp_path):
+    store, vectors = filled_store(tmp_path, index_type="hnsw")
+
+    results = store.search(vectors[9], k=3, memory_type="command", since="2026-01-10T00:00:00")
+    assert results[0]["id"] == 9
+    assert all(memory["type"] == "command" and memory["timestamp"] >= "2026-01-10" for memory in results)
+    store.close()
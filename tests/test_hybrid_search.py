@@ -0,0 +1,78 @@
+"""
+Tests for keyword (BM25) search and hybrid rank-fused memory search.
+"""
+import numpy as np
+import pytest
+
+from dreamos.config import MEMORY_RRF_K
+from dreamos.memory.metadata_store import match_query
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+TEXTS = [
+    "saved the budget to notes.txt",
+    "the weather in paris is sunny",
+    "used web_browser to read the news",
+    "budget meeting moved to friday",
+    "my cat is called felix"
+]
+
+
+@pytest.fixture
+def store(tmp_path, vectors):
+    store = VectorStore(str(tmp_path), compaction_ratio=1.0)
+    store.add_memories(TEXTS, vectors, [{"type": "fact" if i % 2 else "command"} for i in range(len(TEXTS))])
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((len(TEXTS), DIM)).astype(np.float32)
+
+
+def test_match_query_quotes_each_term():
+    assert match_query('open notes.txt "now"') == '"open" OR "notes.txt" OR """now"""'
+    assert match_query("?? !") == ""
+
+
+def test_keywords_match_whole_file_and_tool_names(store):
+    assert [memory["id"] for memory in store.search_text("notes.txt", k=5)] == [0]
+    assert [memory["id"] for memory in store.search_text("web_browser", k=5)] == [2]
+    assert store.search_text("...", k=5) == []
+
+
+def test_keyword_ranking_and_filters(store):
+    results = store.search_text("budget friday", k=5)
+    assert [memory["id"] for memory in results] == [3, 0]
+    assert results[0]["bm25"] < results[1]["bm25"]
+
+    assert [memory["id"] for memory in store.search_text("budget", k=5, memory_type="fact")] == [3]
+
+
+def test_deleted_and_compacted_memories_are_not_found(store):
+    store.delete_memory(3)
+    assert [memory["id"] for memory in store.search_text("budget", k=5)] == [0]
+
+    store.compact()
+    assert [memory["id"] for memory in store.search_text("budget", k=5)] == [0]
+
+
+def test_hybrid_search_fuses_the_rankings(store, vectors):
+    # Memory 3 is first by keywords, memory 4 is first by vector but has no keyword match
+    results = store.search_hybrid("budget friday", vectors[4], k=5)
+    by_id = {memory["id"]: memory for memory in results}
+    vector_rank = [memory["id"] for memory in store.search(vectors[4], k=5)].index(3) + 1
+
+    assert results[0]["id"] == 3
+    assert by_id[3]["rrf_score"] == pytest.approx(1 / (MEMORY_RRF_K + 1) + 1 / (MEMORY_RRF_K + vector_rank))
+    assert by_id[4]["rrf_score"] == pytest.approx(1 / (MEMORY_RRF_K + 1))
+    assert "bm25" in by_id[3] and "distance" in by_id[3]
+    assert "bm25" not in by_id[4]
+    assert [memory["rrf_score"] for memory in results] == sorted((memory["rrf_score"] for memory in results), reverse=True)
+
+
+def test_hybrid_search_applies_filters(store, vectors):
+    results = store.search_hybrid("budget", vectors[0], k=5, memory_type="fact")
+    assert {memory["id"] for memory in results} == {1, 3}
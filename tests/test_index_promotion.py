@@ -0,0 +1,145 @@
+"""
+Tests for index migration, the recall gate of automatic promotions, and
+the migrated index after crashes and compaction.
+"""
+import shutil
+
+import numpy as np
+
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+
+def add_random(store, count, seed=0):
+    """Add count random memories and return their vectors."""
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    store.add_memories([f"memory {seed}-{i}" for i in range(count)], vectors)
+    return vectors
+
+
+def test_low_recall_promotion_keeps_current_index(tmp_path):
+    store = VectorStore(str(tmp_path), ann_index_type="ivf_flat", ann_threshold=0)
+    vectors = add_random(store, 2000)
+
+    report = store.promote_index(min_recall=0.99)
+
+    assert report["rejected"]
+    assert report["recall_at_k"] < 0.99
+    stats = store.get_index_stats()
+    assert stats["index_type"] == "flat"
+    assert stats["rejected_report"]["num_vectors"] == 2000
+    assert store.search(vectors[7], k=1)[0]["text"] == "memory 0-7"
+    store.close()
+
+
+def test_promotion_without_gate_swaps_index(tmp_path):
+    store = VectorStore(str(tmp_path), ann_index_type="ivf_flat", ann_threshold=0)
+    add_random(store, 2000)
+
+    report = store.promote_index()
+
+    assert not report.get("rejected")
+    assert store.get_index_stats()["index_type"] == "ivf_flat"
+    store.close()
+
+
+def test_automatic_promotion_is_gated_and_not_retried_immediately(tmp_path):
+    store = VectorStore(str(tmp_path), ann_index_type="ivf_flat", ann_threshold=1000, min_recall=0.99)
+    add_random(store, 1200)
+    store.wait_for_maintenance()
+
+    stats = store.get_index_stats()
+    assert stats["index_type"] == "flat"
+    assert stats["rejected_report"]["rejected"]
+
+    # A little more data doesn't start another rebuild
+    rejected_thread = store._maintenance_thread
+    add_random(store, 10, seed=1)
+    assert store._maintenance_thread is rejected_thread
+    store.close()
+
+    # The rejection survives a restart
+    reopened = VectorStore(str(tmp_path), ann_index_type="ivf_flat", ann_threshold=1000, min_recall=0.99)
+    reopened.wait_for_maintenance()
+    assert reopened.get_index_stats()["index_type"] == "flat"
+    assert reopened._maintenance_thread is None
+    reopened.close()
+
+
+def test_automatic_promotion_above_minimum_recall(tmp_path):
+    store = VectorStore(str(tmp_path), ann_index_type="hnsw", ann_threshold=500, min_recall=0.5)
+    add_random(store, 600)
+    store.wait_for_maintenance()
+
+    stats = store.get_index_stats()
+    assert stats["index_type"] == "hnsw"
+    assert stats["report"]["recall_at_k"] >= 0.5
+    assert stats["rejected_report"] is None
+    store.close()
+
+
+def test_writes_after_promotion_survive_a_crash(tmp_path):
+    store = VectorStore(str(tmp_path / "store"), ann_index_type="hnsw", ann_threshold=0)
+    vectors = add_random(store, 600)
+    assert not store.promote_index(min_recall=0.5).get("rejected")
+    extra = add_random(store, 20, seed=1)
+
+    # Copy the files as they are on disk while the store is still open, as if the process had died
+    crashed = tmp_path / "crashed"
+    shutil.copytree(tmp_path / "store", crashed, ignore=shutil.ignore_patterns("*.lock"))
+    store.close()
+
+    recovered = VectorStore(str(crashed), ann_index_type="hnsw", ann_threshold=0)
+    assert recovered.count_memories() == 620
+    assert recovered.get_index_stats()["index_type"] == "hnsw"
+    assert recovered.search(extra[3], k=1)[0]["text"] == "memory 1-3"
+    assert recovered.search(vectors[3], k=1)[0]["text"] == "memory 0-3"
+    recovered.close()
+
+
+def test_filtered_search_after_promotion_and_compaction(tmp_path):
+    store = VectorStore(str(tmp_path), ann_index_type="hnsw", ann_threshold=0)
+    vectors = np.random.default_rng(0).standard_normal((600, DIM)).astype(np.float32)
+    ids = store.add_memories(
+        [f"memory {i}" for i in range(600)],
+        vectors,
+        [{"type": "fact" if i % 2 else "command"} for i in range(600)]
+    )
+    assert not store.promote_index(min_recall=0.5).get("rejected")
+
+    deleted = ids[1:100:2]
+    store.delete_memories(deleted)
+    store.wait_for_maintenance()
+    store.compact()
+
+    results = store.search(vectors[1], k=10, memory_type="fact")
+    assert results
+    assert all(memory["type"] == "fact" for memory in results)
+    assert not {memory["id"] for memory in results} & set(deleted)
+    assert ids[3] not in {memory["id"] for memory in store.search(vectors[3], k=5, memory_type="fact")}
+    assert store.search(vectors[101], k=1, memory_type="fact")[0]["id"] == ids[101]
+    store.close()
+
+
+def test_ivf_flat_with_pq_codec_keeps_its_type(tmp_path):
+    store = VectorStore(str(tmp_path), ann_index_type="ivf_flat", ann_threshold=0, codec="pq",
+                        compaction_ratio=1.0)
+    vectors = add_random(store, 2000)
+
+    report = store.promote_index()
+    assert (report["index_type"], report["codec"]) == ("ivf_flat", "pq")
+    assert report["previous_index_type"] == "flat"
+
+    store.delete_memory(store.search(vectors[0], k=1)[0]["id"])
+    assert store.compact() == 1
+    stats = store.get_index_stats()
+    assert (stats["index_type"], stats["codec"]) == ("ivf_flat", "pq")
+    store.close()
+
+    # The configured type survives a restart, although the index has the structure of ivf_pq
+    reopened = VectorStore(str(tmp_path), ann_index_type="ivf_flat", ann_threshold=0, codec="pq")
+    stats = reopened.get_index_stats()
+    assert (stats["index_type"], stats["codec"]) == ("ivf_flat", "pq")
+    assert reopened.promote_index()["previous_index_type"] == "ivf_flat"
+    reopened.close()
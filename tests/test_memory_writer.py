@@ -0,0 +1,108 @@
+"""
+Tests for the group-commit memory writer.
+"""
+import gc
+import time
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+from dreamos.memory.memory_writer import MemoryWriter
+from dreamos.memory.store_manager import VectorStoreManager
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+
+def embed(texts):
+    return np.random.default_rng(len(texts)).standard_normal((len(texts), DIM)).astype(np.float32)
+
+
+def make_writer(store, **kwargs):
+    @contextmanager
+    def lease():
+        yield store
+    kwargs.setdefault("idle_seconds", 30)
+    return MemoryWriter(embed, lease, linger_ms=5, max_batch=16, **kwargs)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_queued_memories_are_committed(tmp_path):
+    store = VectorStore(str(tmp_path))
+    writer = make_writer(store)
+
+    futures = [writer.submit(f"memory {i}") for i in range(40)]
+
+    assert writer.flush(5)
+    assert sorted(future.result() for future in futures) == list(range(40))
+    assert store.count_memories() == 40
+    writer.close()
+    store.close()
+
+
+def test_thread_exits_when_idle_and_restarts(tmp_path):
+    store = VectorStore(str(tmp_path))
+    writer = make_writer(store, idle_seconds=0.05)
+
+    writer.submit("first").result(5)
+    assert wait_until(lambda: not writer.running)
+
+    writer.submit("second").result(5)
+    assert store.count_memories() == 2
+    writer.close()
+    store.close()
+
+
+def test_idle_writer_can_be_collected(tmp_path):
+    store = VectorStore(str(tmp_path))
+    writer = make_writer(store, idle_seconds=0.05)
+    writer.submit("memory").result(5)
+    assert wait_until(lambda: not writer.running)
+
+    ref = weakref.ref(writer)
+    del writer
+    gc.collect()
+
+    assert ref() is None
+    store.close()
+
+
+def test_close_commits_queue_and_stops_thread(tmp_path):
+    store = VectorStore(str(tmp_path))
+    writer = make_writer(store)
+    futures = [writer.submit(f"memory {i}") for i in range(10)]
+
+    assert writer.close(5)
+
+    assert all(future.done() for future in futures)
+    assert not writer.running
+    assert store.count_memories() == 10
+    with pytest.raises(RuntimeError):
+        writer.submit("too late")
+    store.close()
+
+
+def test_namespace_writer_is_shared_and_closed_with_namespace(tmp_path):
+    manager = VectorStoreManager(str(tmp_path), idle_seconds=0, max_open=4)
+
+    futures = [manager.write("a", embed, f"memory {i}") for i in range(5)]
+    writer = manager._writers["a"]
+    futures.append(manager.write("a", embed, "another agent's memory"))
+    assert manager._writers["a"] is writer
+
+    manager.close_namespace("a")
+
+    assert all(future.done() for future in futures)
+    assert not writer.running
+    assert "a" not in manager._writers
+    with manager.lease("a") as store:
+        assert store.count_memories() == 6
+    manager.close_all()
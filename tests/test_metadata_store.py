@@ -0,0 +1,73 @@
+"""
+Tests for the SQLite metadata store of the vector store.
+"""
+import json
+
+from dreamos.memory.metadata_store import MetadataStore
+from dreamos.memory.vector_store import VectorStore
+
+
+def make_store(tmp_path, count=5):
+    metadata_store = MetadataStore(str(tmp_path / "metadata.db"))
+    metadata_store.insert_many([
+        {"id": i, "text": f"memory {i}", "type": "fact", "timestamp": f"2026-01-0{i + 1}T00:00:00", "tools_used": ["calc"]}
+        for i in range(count)
+    ])
+    return metadata_store
+
+
+def test_rows_round_trip_with_extra_fields(tmp_path):
+    metadata_store = make_store(tmp_path)
+
+    assert metadata_store.get(2) == {
+        "id": 2, "text": "memory 2", "type": "fact", "timestamp": "2026-01-03T00:00:00", "tools_used": ["calc"]
+    }
+    assert metadata_store.get(99) is None
+    assert set(metadata_store.get_many([0, 4, 99])) == {0, 4}
+    assert metadata_store.max_id() == 4
+    metadata_store.close()
+
+
+def test_deleted_rows_are_hidden_until_removed(tmp_path):
+    metadata_store = make_store(tmp_path)
+    metadata_store.mark_deleted([1, 3])
+
+    assert metadata_store.deleted_ids() == [1, 3]
+    assert metadata_store.get(1) is None
+    assert not metadata_store.exists(1)
+    assert metadata_store.count() == 3
+    assert metadata_store.known_ids([0, 1, 99]) == {0, 1}
+
+    metadata_store.remove([1])
+    assert metadata_store.deleted_ids() == [3]
+    assert metadata_store.known_ids([0, 1, 99]) == {0}
+    metadata_store.close()
+
+
+def test_rows_and_state_persist(tmp_path):
+    metadata_store = make_store(tmp_path)
+    metadata_store.set_state("next_id", 5)
+    metadata_store.set_state("report", {"recall_at_k": 0.97})
+    metadata_store.close()
+
+    reopened = MetadataStore(str(tmp_path / "metadata.db"))
+    assert reopened.count() == 5
+    assert reopened.get_state("next_id") == 5
+    assert reopened.get_state("report") == {"recall_at_k": 0.97}
+    assert reopened.get_state("missing", "default") == "default"
+    reopened.close()
+
+
+def test_json_metadata_is_migrated(tmp_path):
+    metadata = [{"id": i, "text": f"memory {i}", "timestamp": "2026-01-01T00:00:00"} for i in range(3)]
+    (tmp_path / "memory_metadata.json").write_text(json.dumps(metadata))
+    (tmp_path / "memory_state.json").write_text(json.dumps({"next_id": 3}))
+
+    store = VectorStore(str(tmp_path))
+
+    assert store.metadata_store.get(2)["text"] == "memory 2"
+    assert store.metadata_store.get_state("next_id") == 3
+    assert not (tmp_path / "memory_metadata.json").exists()
+    assert (tmp_path / "memory_metadata.json.migrated").exists()
+    assert (tmp_path / "memory_state.json.migrated").exists()
+    store.close()
@@ -0,0 +1,64 @@
+"""
+Tests for loading the vector index memory-mapped and read-only.
+"""
+import numpy as np
+import pytest
+
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+
+@pytest.fixture
+def saved_store(tmp_path):
+    """Directory with a checkpointed store of 20 memories, and their vectors."""
+    store = VectorStore(str(tmp_path), mmap=False)
+    vectors = np.random.default_rng(0).standard_normal((20, DIM)).astype(np.float32)
+    store.add_memories([f"memory {i}" for i in range(20)], vectors)
+    store.close()
+    return str(tmp_path), vectors
+
+
+def test_loaded_index_is_mapped_and_searchable(saved_store):
+    path, vectors = saved_store
+    store = VectorStore(path, mmap=True)
+
+    assert store.get_index_stats()["mmap"]
+    assert store.search(vectors[4], k=1)[0]["text"] == "memory 4"
+    store.close()
+
+
+def test_first_write_copies_the_mapped_index(saved_store):
+    path, vectors = saved_store
+    store = VectorStore(path, mmap=True)
+    extra = np.random.default_rng(1).standard_normal((2, DIM)).astype(np.float32)
+
+    store.add_memories(["new 0", "new 1"], extra)
+
+    assert not store.get_index_stats()["mmap"]
+    assert store.search(extra[1], k=1)[0]["text"] == "new 1"
+    assert store.search(vectors[4], k=1)[0]["text"] == "memory 4"
+    store.close()
+
+    reopened = VectorStore(path, mmap=True)
+    assert reopened.count_memories() == 22
+    assert reopened.search(extra[0], k=1)[0]["text"] == "new 0"
+    reopened.close()
+
+
+def test_compaction_of_mapped_index(saved_store):
+    path, vectors = saved_store
+    store = VectorStore(path, mmap=True, compaction_ratio=1.0)
+    store.delete_memories([0, 1, 2])
+
+    assert store.compact() == 3
+    assert store.get_index_stats()["ntotal"] == 17
+    assert store.search(vectors[5], k=1)[0]["text"] == "memory 5"
+    store.close()
+
+
+def test_mmap_can_be_disabled(saved_store):
+    path, _ = saved_store
+    store = VectorStore(path, mmap=False)
+    assert not store.get_index_stats()["mmap"]
+    store.close()
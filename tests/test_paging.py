@@ -0,0 +1,84 @@
+"""
+Tests for cursor-paginated memory listing and streaming export.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from dreamos.memory.vector_store import VectorStore
+from dreamos.memory.wal import decode_vector
+
+DIM = 768
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((25, DIM)).astype(np.float32)
+
+
+@pytest.fixture
+def store(tmp_path, vectors):
+    store = VectorStore(str(tmp_path), compaction_ratio=1.0)
+    store.add_memories(
+        [f"memory {i}" for i in range(25)], vectors, [{"type": "fact" if i % 5 == 0 else "command"} for i in range(25)]
+    )
+    yield store
+    store.close()
+
+
+def collect_pages(store, **kwargs):
+    ids, cursor = [], None
+    while True:
+        page = store.list_memories(cursor=cursor, **kwargs)
+        ids.extend(memory["id"] for memory in page["memories"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_pages_cover_every_memory_once(store):
+    assert collect_pages(store, page_size=7) == list(range(25))
+    assert collect_pages(store, page_size=7, newest_first=True) == list(range(24, -1, -1))
+    assert collect_pages(store, page_size=25) == list(range(25))
+    assert store.list_memories(page_size=25)["next_cursor"] is None
+
+
+def test_cursor_is_stable_across_deletes_and_inserts(store, vectors):
+    first = store.list_memories(page_size=10)
+    assert [memory["id"] for memory in first["memories"]] == list(range(10))
+
+    # Deleting memories on both sides of the cursor neither skips nor repeats the rest
+    store.delete_memories([3, 10, 11])
+    store.add_memories(["late"], vectors[:1])
+    store.compact()
+
+    second = store.list_memories(cursor=first["next_cursor"], page_size=10)
+    assert [memory["id"] for memory in second["memories"]] == list(range(12, 22))
+    third = store.list_memories(cursor=second["next_cursor"], page_size=10)
+    assert [memory["id"] for memory in third["memories"]] == [22, 23, 24, 25]
+    assert third["next_cursor"] is None
+
+
+def test_pages_apply_filters(store):
+    assert collect_pages(store, page_size=2, memory_type="fact") == [0, 5, 10, 15, 20]
+    assert store.count_memories(memory_type="fact") == 5
+
+
+def test_iteration_streams_all_memories(store):
+    assert [memory["id"] for memory in store.iter_memories(batch_size=4)] == list(range(25))
+    assert [memory["id"] for memory in store.iter_memories(batch_size=4, memory_type="fact")] == [0, 5, 10, 15, 20]
+
+
+def test_export_writes_json_lines_with_vectors(store, vectors):
+    store.delete_memory(1)
+    store.compact()
+
+    lines = list(store.export_memories(batch_size=4, include_vectors=True))
+
+    assert len(lines) == 24
+    assert all(line.endswith("\n") for line in lines)
+    records = [json.loads(line) for line in lines]
+    assert [record["id"] for record in records] == [0] + list(range(2, 25))
+    assert np.allclose(decode_vector(records[5]["vector"]), vectors[6])
+    assert "vector" not in json.loads(next(store.export_memories()))
@@ -0,0 +1,92 @@
+"""
+Tests for the recent-memories ring of the vector store.
+"""
+import time
+import threading
+
+import numpy as np
+
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+
+def embed(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+def add(store, texts, seed=0):
+    timestamps = [f"2024-01-01T00:00:{i:02d}" for i in range(len(texts))]
+    return store.add_memories(texts, embed(len(texts), seed), [{"timestamp": ts} for ts in timestamps])
+
+
+def test_recent_memories_newest_first_without_deleted(tmp_path):
+    store = VectorStore(str(tmp_path))
+    ids = add(store, [f"memory {i}" for i in range(10)])
+
+    store.delete_memory(ids[-1])
+
+    recent = store.get_recent_memories(3)
+    assert [meta["id"] for meta in recent] == [ids[8], ids[7], ids[6]]
+    store.close()
+
+
+def test_recent_memories_do_not_wait_for_searches(tmp_path):
+    store = VectorStore(str(tmp_path))
+    add(store, [f"memory {i}" for i in range(5)])
+
+    # A long search holds the read lock
+    searching = threading.Event()
+    release = threading.Event()
+
+    def long_search():
+        with store._lock.read_lock():
+            searching.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=long_search)
+    thread.start()
+    searching.wait(5)
+
+    start = time.monotonic()
+    recent = store.get_recent_memories(2)
+    elapsed = time.monotonic() - start
+
+    release.set()
+    thread.join()
+    assert len(recent) == 2
+    assert elapsed < 1
+    store.close()
+
+
+def test_recent_memories_under_concurrent_reads_and_writes(tmp_path):
+    store = VectorStore(str(tmp_path), checkpoint_interval=50)
+    ids = add(store, [f"seed {i}" for i in range(20)])
+    errors = []
+
+    def reader():
+        try:
+            for _ in range(200):
+                recent = store.get_recent_memories(10)
+                keys = [(meta["timestamp"], meta["id"]) for meta in recent]
+                assert keys == sorted(keys, reverse=True)
+        except Exception as e:
+            errors.append(e)
+
+    def writer():
+        try:
+            for i in range(20):
+                store.delete_memory(ids[i])
+                store.add_memory(f"new {i}", embed(1, 100 + i)[0], {"timestamp": f"2024-01-02T00:00:{i:02d}"})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [meta["text"] for meta in store.get_recent_memories(3)] == ["new 19", "new 18", "new 17"]
+    store.close()
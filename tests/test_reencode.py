@@ -0,0 +1,54 @@
+"""
+Tests for the offline re-encoding tool.
+"""
+import numpy as np
+import pytest
+
+from dreamos.memory.reencode import reencode_store
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+
+def make_store(path, count):
+    store = VectorStore(str(path))
+    ids = []
+    if count:
+        vectors = np.random.default_rng(0).standard_normal((count, DIM)).astype(np.float32)
+        ids = store.add_memories([f"memory {i}" for i in range(count)], vectors)
+    return store, ids
+
+
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_empty_store_is_reported(tmp_path, dry_run):
+    store, _ = make_store(tmp_path, 0)
+    store.close()
+
+    with pytest.raises(ValueError, match="no memories"):
+        reencode_store(str(tmp_path), "sq8", dry_run=dry_run)
+
+
+def test_store_with_only_deleted_memories_is_reported(tmp_path):
+    store, ids = make_store(tmp_path, 5)
+    store.delete_memories(ids)
+    store.close()
+
+    with pytest.raises(ValueError, match="no memories"):
+        reencode_store(str(tmp_path), "sq8")
+
+
+def test_reencode_changes_codec(tmp_path):
+    store, _ = make_store(tmp_path, 300)
+    store.close()
+
+    dry = reencode_store(str(tmp_path), "sq8", dry_run=True)
+    assert dry["after"]["codec"] == "sq8"
+    assert dry["compression_ratio"] > 3
+
+    report = reencode_store(str(tmp_path), "sq8")
+    assert report["after"]["codec"] == "sq8"
+
+    reopened = VectorStore(str(tmp_path), ann_threshold=0)
+    assert reopened.get_index_stats()["codec"] == "sq8"
+    assert reopened.count_memories() == 300
+    reopened.close()
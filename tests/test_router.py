@@ -0,0 +1,172 @@
+"""
+Tests for the local fast-path router.
+"""
+import pytest
+
+from dreamos.agents.router import FastRouter, get_fast_router, get_routing_cache
+from dreamos.memory.embeddings import get_embedder
+
+# Labelled commands used by neither the seed examples nor the threshold calibration
+LABELLED_COMMANDS = {
+    "file_agent": [
+        "create a file called plan.txt",
+        "show the contents of readme.md",
+        "delete the notes from monday",
+        "list my documents",
+        "make a new folder called photos",
+        "append a line to log.txt",
+        "what is in todo.txt",
+        "ls -la"
+    ],
+    "memory_agent": [
+        "remember my dentist is on tuesday",
+        "what is my favorite food",
+        "forget what i said about work",
+        "what did i ask you yesterday",
+        "do you remember where i parked",
+        "remind me of my goals",
+        "when is my birthday"
+    ],
+    "plugin_agent": [
+        "what is 19 * 23",
+        "calculate 20 percent of 80",
+        "search the web for rust tutorials",
+        "look up the capital of peru",
+        "convert 5 km to miles",
+        "run this python code print(2)",
+        "summarize https://example.com/article",
+        "what is 100 divided by 4"
+    ],
+    "terminal_agent": [
+        "help",
+        "status",
+        "who are you",
+        "what can you do",
+        "turn on voice mode",
+        "exit"
+    ]
+}
+
+
+@pytest.fixture(scope="module")
+def router():
+    return FastRouter(get_embedder("hashing", dim=768))
+
+
+@pytest.mark.parametrize("command, expected", [
+    ("what is 5*7", "plugin_agent"),
+    ("save the whales", None),
+    ("what time is it", None),
+    ("write a poem about cats", None),
+    ("what was the name of my cat", None)
+])
+def test_misrouted_commands(router, command, expected):
+    decision = router.route(command)
+    assert (decision[0] if decision else None) == expected
+
+
+def test_labelled_commands_are_routed_correctly(router):
+    decided = 0
+    total = 0
+    for expected, commands in LABELLED_COMMANDS.items():
+        for command in commands:
+            decision = router.route(command)
+            total += 1
+            if decision is not None:
+                decided += 1
+                assert decision[0] == expected, command
+
+    # Most commands don't need the LLM
+    assert decided / total >= 0.8
+
+
+@pytest.mark.parametrize("command, rules", [
+    ("note that my sister's name is anna", []),
+    ("take a note that the car is blue", []),
+    ("open my meeting notes", ["file_agent"]),
+    ("delete the notes from monday", ["file_agent"]),
+    ("remember that my notes are in the blue folder", ["file_agent", "memory_agent"])
+])
+def test_notes_need_a_file_verb(router, command, rules):
+    assert router.match_rules(command) == rules
+
+
+@pytest.mark.parametrize("command", [
+    "note that my sister's name is anna",
+    "remember the name of the notes file",
+    "remember that my notes are in the blue folder"
+])
+def test_memory_phrasings_mentioning_notes_dont_go_to_files(router, command):
+    decision = router.route(command)
+    assert decision is None or decision[0] == "memory_agent"
+
+
+def test_confident_classifier_overrides_a_single_rule(router, monkeypatch):
+    command = "write down that my sister's name is anna in my notes"
+    assert router.match_rules(command) == ["file_agent"]
+    monkeypatch.setattr(router, "score", lambda command: {
+        "file_agent": 0.04, "memory_agent": 0.93, "plugin_agent": 0.01, "terminal_agent": 0.02
+    })
+    assert router.route(command) is None
+
+    # An unsure classifier leaves the decision to the rule
+    monkeypatch.setattr(router, "score", lambda command: {
+        "file_agent": 0.2, "memory_agent": 0.5, "plugin_agent": 0.2, "terminal_agent": 0.1
+    })
+    assert router.route(command) == ("file_agent", 1.0)
+
+
+def test_classifier_must_agree_with_a_matching_rule(router, monkeypatch):
+    # "remember" and "file" match two rules, the classifier picks one of them or nobody
+    monkeypatch.setattr(router, "threshold", 0.0)
+    monkeypatch.setattr(router, "score", lambda command: {
+        "file_agent": 0.1, "memory_agent": 0.2, "plugin_agent": 0.6, "terminal_agent": 0.1
+    })
+    assert router.route("remember the name of the notes file") is None
+
+    monkeypatch.setattr(router, "score", lambda command: {
+        "file_agent": 0.1, "memory_agent": 0.7, "plugin_agent": 0.1, "terminal_agent": 0.1
+    })
+    assert router.route("remember the name of the notes file") == ("memory_agent", 0.7)
+
+
+def test_calibrate_picks_lowest_precise_threshold(router, monkeypatch):
+    decisions = {
+        "a file i remember": ("file_agent", 0.9),
+        "a folder i remember": ("file_agent", 0.8),
+        "a file to remember": ("memory_agent", 0.6),
+        "remember a folder": ("file_agent", 0.5)
+    }
+    monkeypatch.setattr(router, "_decide", lambda command: decisions[command])
+    examples = {"file_agent": ["a file i remember", "a folder i remember", "a file to remember", "remember a folder"]}
+
+    assert router.calibrate(examples) == 0.8
+    assert router.calibrate(examples, target_precision=0.5) == 0.5
+
+    # Wrong at the highest confidence, so the classifier is never used
+    decisions["a file i remember"] = ("memory_agent", 0.95)
+    assert router.calibrate(examples) == 1.0
+
+
+def test_explicit_threshold_is_kept():
+    assert FastRouter(get_embedder("hashing", dim=768), threshold=0.7).threshold == 0.7
+
+
+def test_learn_ignores_decisions_contradicting_rules():
+    router = FastRouter(get_embedder("hashing", dim=768))
+    before = router.get_stats()
+
+    router.learn("what is 6*7", "memory_agent")
+    assert router.get_stats() == before
+
+    router.learn("what is the weather like", "plugin_agent")
+    assert router.get_stats()["plugin_agent"] == before["plugin_agent"] + 1
+
+
+def test_sessions_share_router_and_cache():
+    first = get_fast_router(get_embedder("hashing", dim=768))
+    assert get_fast_router(get_embedder("hashing", dim=768)) is first
+
+    cache = get_routing_cache("fp")
+    assert get_routing_cache("fp") is cache
+    assert get_routing_cache("other fp") is not cache
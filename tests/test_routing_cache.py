@@ -0,0 +1,71 @@
+"""
+Tests for the routing decision cache.
+"""
+import time
+
+from dreamos.agents.router import RoutingCache, normalize_command, routing_fingerprint
+
+
+def test_commands_are_normalized():
+    assert normalize_command("  Please List   my files! ") == "list my files"
+    assert normalize_command("list my files please?") == "list my files"
+    assert normalize_command("List My Files") == "list my files"
+
+
+def test_lookup_uses_normalized_command():
+    cache = RoutingCache("fp", max_entries=10, ttl_seconds=0, db_path="")
+    cache.put("List my files", "file_agent")
+
+    assert cache.get("please list my files.") == "file_agent"
+    assert cache.get("list my notes") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RoutingCache("fp", max_entries=2, ttl_seconds=0, db_path="")
+    cache.put("a", "file_agent")
+    cache.put("b", "memory_agent")
+    cache.get("a")
+    cache.put("c", "plugin_agent")
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "file_agent"
+    assert cache.get("c") == "plugin_agent"
+
+
+def test_entries_expire():
+    cache = RoutingCache("fp", max_entries=10, ttl_seconds=0.05, db_path="")
+    cache.put("a", "file_agent")
+    assert cache.get("a") == "file_agent"
+
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_decisions_persist_for_the_same_fingerprint(tmp_path):
+    db_path = str(tmp_path / "routing.db")
+    fingerprint = routing_fingerprint("agents", "prompt")
+    cache = RoutingCache(fingerprint, max_entries=10, ttl_seconds=0, db_path=db_path)
+    cache.put("a", "file_agent")
+    cache.put("b", "memory_agent")
+    cache.invalidate("b")
+
+    reopened = RoutingCache(fingerprint, max_entries=10, ttl_seconds=0, db_path=db_path)
+    assert reopened.get("a") == "file_agent"
+    assert reopened.get("b") is None
+
+    # Another prompt invalidates every stored decision
+    changed = RoutingCache(routing_fingerprint("agents", "new prompt"), max_entries=10, ttl_seconds=0, db_path=db_path)
+    assert changed.get("a") is None
+    assert len(changed) == 0
+
+
+def test_evicted_entries_are_not_reloaded(tmp_path):
+    db_path = str(tmp_path / "routing.db")
+    cache = RoutingCache("fp", max_entries=1, ttl_seconds=0, db_path=db_path)
+    cache.put("a", "file_agent")
+    cache.put("b", "memory_agent")
+
+    reopened = RoutingCache("fp", max_entries=10, ttl_seconds=0, db_path=db_path)
+    assert reopened.get("a") is None
+    assert reopened.get("b") == "memory_agent"
@@ -0,0 +1,161 @@
+"""
+Tests for coalescing concurrent searches into batches.
+"""
+import gc
+import time
+import threading
+import weakref
+
+import numpy as np
+
+from dreamos.memory.search_coalescer import SearchCoalescer
+from dreamos.memory.vector_store import VectorStore
+
+
+class RecordingSearch:
+    """Batch search returning each query's first value, recording batch sizes."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def __call__(self, queries, k, **filters):
+        with self._lock:
+            self.batch_sizes.append(len(queries))
+        time.sleep(self.delay)
+        return [[{"id": int(query[0]), "filters": filters}] * k for query in queries]
+
+
+def run_concurrently(coalescer, count, **filters):
+    """Search count queries from as many threads; return results by query value."""
+    results = {}
+    barrier = threading.Barrier(count)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = coalescer.search(np.array([i, 0], dtype=np.float32), 1, **filters)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_searches_get_their_own_results():
+    search = RecordingSearch(delay=0.01)
+    coalescer = SearchCoalescer(search, window_ms=20, max_batch=64)
+
+    results = run_concurrently(coalescer, 16, memory_type="fact")
+
+    assert {i: result[0]["id"] for i, result in results.items()} == {i: i for i in range(16)}
+    assert all(result[0]["filters"] == {"memory_type": "fact"} for result in results.values())
+    assert sum(search.batch_sizes) == 16
+    assert len(search.batch_sizes) < 16
+
+
+def test_queued_search_does_not_wait_for_direct_caller():
+    search = RecordingSearch(delay=0.3)
+    coalescer = SearchCoalescer(search, window_ms=1000, max_batch=64)
+
+    # The first caller searches directly and stays busy; the second is queued
+    first = threading.Thread(target=coalescer.search, args=(np.zeros(2, dtype=np.float32), 1))
+    first.start()
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    coalescer.search(np.ones(2, dtype=np.float32), 1)
+    elapsed = time.monotonic() - start
+    first.join()
+
+    # Waiting out the window for the direct caller would take over a second
+    assert elapsed < 0.8
+    assert search.batch_sizes == [1, 1]
+
+
+def test_batch_errors_reach_every_caller():
+    def failing(queries, k, **filters):
+        raise RuntimeError("index unavailable")
+
+    coalescer = SearchCoalescer(failing, window_ms=5, max_batch=64)
+    errors = []
+    barrier = threading.Barrier(4)
+
+    def worker():
+        barrier.wait()
+        try:
+            coalescer.search(np.zeros(2, dtype=np.float32), 1)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["index unavailable"] * 4
+
+
+def test_requests_with_different_k_are_not_batched_together():
+    search = RecordingSearch(delay=0.05)
+    coalescer = SearchCoalescer(search, window_ms=50, max_batch=64)
+    results = {}
+    barrier = threading.Barrier(6)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = coalescer.search(np.array([i, 0], dtype=np.float32), 1 + i % 2)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {i: len(result) for i, result in results.items()} == {i: 1 + i % 2 for i in range(6)}
+    coalescer.close()
+
+
+def test_close_stops_worker_and_releases_search_function():
+    search = RecordingSearch(delay=0.01)
+    coalescer = SearchCoalescer(search, window_ms=5, max_batch=64)
+    run_concurrently(coalescer, 8)
+    thread = coalescer._thread
+    assert thread is not None
+
+    coalescer.close(5)
+
+    assert not thread.is_alive()
+    assert coalescer._thread is None
+    # Later searches run directly
+    assert coalescer.search(np.array([3, 0], dtype=np.float32), 1)[0]["id"] == 3
+    assert coalescer._thread is None
+
+
+def test_closed_store_can_be_collected(tmp_path):
+    store = VectorStore(str(tmp_path))
+    vectors = np.random.default_rng(0).standard_normal((20, 768)).astype(np.float32)
+    store.add_memories([f"memory {i}" for i in range(20)], vectors)
+    barrier = threading.Barrier(8)
+
+    def worker(i):
+        barrier.wait()
+        store.search(vectors[i], k=1)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    thread = store._search_coalescer._thread
+
+    store.close()
+    ref = weakref.ref(store)
+    del store
+    gc.collect()
+
+    assert thread is None or not thread.is_alive()
+    assert ref() is None
@@ -0,0 +1,46 @@
+"""
+Tests that memory IDs stay valid across deletes, compaction and restarts.
+"""
+import numpy as np
+import pytest
+
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+
+def add_random(store, count, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return store.add_memories([f"memory {seed}-{i}" for i in range(count)], vectors), vectors
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_ids_survive_compaction(tmp_path, index_type):
+    store = VectorStore(str(tmp_path), index_type=index_type, compaction_ratio=1.0)
+    ids, vectors = add_random(store, 20)
+    store.delete_memories(ids[::2])
+    store.compact()
+
+    for i in range(1, 20, 2):
+        hit = store.search(vectors[i], k=1)[0]
+        assert hit["id"] == ids[i]
+        assert hit["text"] == f"memory 0-{i}"
+        assert store.get_memory_by_id(ids[i])["text"] == f"memory 0-{i}"
+    store.close()
+
+
+def test_ids_of_deleted_memories_are_never_reused(tmp_path):
+    store = VectorStore(str(tmp_path), compaction_ratio=1.0)
+    ids, _ = add_random(store, 5)
+    store.delete_memory(ids[-1])
+    store.compact()
+    store.close()
+
+    reopened = VectorStore(str(tmp_path), compaction_ratio=1.0)
+    new_ids, _ = add_random(reopened, 2, seed=1)
+    assert new_ids == [ids[-1] + 1, ids[-1] + 2]
+    assert reopened.get_memory_by_id(ids[-1]) is None
+
+    reopened.clear_store()
+    assert reopened.add_memories(["after clear"], np.ones((1, DIM), dtype=np.float32)) == [new_ids[-1] + 1]
+    reopened.close()
@@ -0,0 +1,177 @@
+"""
+Tests for the namespaced store manager.
+"""
+import os
+import time
+import threading
+
+import numpy as np
+
+from dreamos.memory.store_manager import VectorStoreManager, namespace_dir
+
+DIM = 768
+
+
+def embed(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+def make_manager(tmp_path, **kwargs):
+    kwargs.setdefault("idle_seconds", 0)
+    kwargs.setdefault("max_open", 1)
+    return VectorStoreManager(str(tmp_path), **kwargs)
+
+
+def test_namespaces_are_isolated(tmp_path):
+    manager = make_manager(tmp_path, max_open=4)
+    vectors = embed(2)
+
+    with manager.lease("alice") as store:
+        store.add_memories(["alice's secret"], vectors[:1])
+    with manager.lease("bob") as store:
+        store.add_memories(["bob's secret"], vectors[1:])
+
+    with manager.lease("bob") as store:
+        texts = [memory["text"] for memory in store.search(vectors[0], 5)]
+    assert texts == ["bob's secret"]
+    with manager.lease() as store:
+        assert store.count_memories() == 0
+
+    manager.close_all()
+
+
+def test_eviction_keeps_leased_store_open(tmp_path):
+    manager = make_manager(tmp_path)
+    vectors = embed(3)
+
+    with manager.lease("a") as store:
+        store.add_memories(["kept"], vectors[:1])
+
+        # Opening more namespaces than allowed while a search is running on "a"
+        manager.get_store("b")
+        manager.get_store("c")
+        assert [memory["text"] for memory in store.search(vectors[0], 1)] == ["kept"]
+
+    # Once released it is evicted like any other idle namespace
+    manager.get_store("d")
+    assert "a" not in manager.get_stats()["memories"]
+
+    with manager.lease("a") as store:
+        assert store.count_memories() == 1
+    manager.close_all()
+
+
+def test_close_namespace_waits_for_leases(tmp_path):
+    manager = make_manager(tmp_path)
+    leased = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with manager.lease("a") as store:
+            leased.set()
+            release.wait(5)
+            store.add_memories(["late write"], embed(1))
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    leased.wait(5)
+
+    closer = threading.Thread(target=manager.close_namespace, args=("a",))
+    closer.start()
+    closer.join(0.2)
+    assert closer.is_alive()
+
+    release.set()
+    holder.join(5)
+    closer.join(5)
+    assert not closer.is_alive()
+
+    with manager.lease("a") as store:
+        assert store.count_memories() == 1
+    manager.close_all()
+
+
+def test_concurrent_searches_and_writes_during_eviction(tmp_path):
+    manager = make_manager(tmp_path)
+    vectors = embed(50)
+    errors = []
+    done = threading.Event()
+
+    def write(namespace):
+        try:
+            for i in range(25):
+                with manager.lease(namespace) as store:
+                    store.add_memories([f"{namespace} {i}"], vectors[i:i + 1])
+        except Exception as e:
+            errors.append(e)
+
+    def search(namespace):
+        try:
+            while not done.is_set():
+                with manager.lease(namespace) as store:
+                    store.search(vectors[0], 3)
+        except Exception as e:
+            errors.append(e)
+
+    # Every access to another namespace evicts the least recently used one
+    def churn():
+        try:
+            i = 0
+            while not done.is_set():
+                manager.get_store(f"other-{i % 3}")
+                i += 1
+        except Exception as e:
+            errors.append(e)
+
+    writers = [threading.Thread(target=write, args=(name,)) for name in ("a", "b")]
+    others = [threading.Thread(target=search, args=("a",)), threading.Thread(target=churn)]
+    for thread in writers + others:
+        thread.start()
+    for thread in writers:
+        thread.join(60)
+    done.set()
+    for thread in others:
+        thread.join(60)
+
+    assert errors == []
+    for name in ("a", "b"):
+        with manager.lease(name) as store:
+            assert store.count_memories() == 25
+    manager.close_all()
+
+
+def test_expire_namespaces_deletes_old_closed_namespaces(tmp_path):
+    manager = make_manager(tmp_path, max_open=4)
+    for namespace in ("session-old", "session-live", "session-open", "user-old"):
+        with manager.lease(namespace) as store:
+            store.add_memories(["memory"], embed(1))
+    for namespace in ("session-old", "session-live", "user-old"):
+        manager.close_namespace(namespace)
+
+    # Backdate every namespace's files
+    old = time.time() - 3600
+    for namespace in ("session-old", "session-live", "session-open", "user-old"):
+        path = manager.store_path(namespace)
+        for entry in os.listdir(path):
+            os.utime(os.path.join(path, entry), (old, old))
+
+    expired = manager.expire_namespaces("session-", 60, keep=["session-live"])
+
+    assert expired == [namespace_dir("session-old")]
+    assert not os.path.exists(manager.store_path("session-old"))
+    for namespace in ("session-live", "session-open", "user-old"):
+        assert os.path.isdir(manager.store_path(namespace))
+    manager.close_all()
+
+
+def test_delete_namespace(tmp_path):
+    manager = make_manager(tmp_path)
+    with manager.lease("session-x") as store:
+        store.add_memories(["memory"], embed(1))
+
+    manager.delete_namespace("session-x")
+
+    assert not os.path.exists(manager.store_path("session-x"))
+    with manager.lease("session-x") as store:
+        assert store.count_memories() == 0
+    manager.close_all()
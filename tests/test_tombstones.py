@@ -0,0 +1,74 @@
+"""
+Tests for tombstone deletes and compaction of the vector store.
+"""
+import numpy as np
+
+from dreamos.memory.vector_store import VectorStore
+
+DIM = 768
+
+
+def add_random(store, count, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return store.add_memories([f"memory {seed}-{i}" for i in range(count)], vectors), vectors
+
+
+def test_deleted_memories_are_hidden_until_compacted(tmp_path):
+    store = VectorStore(str(tmp_path), compaction_ratio=1.0)
+    ids, vectors = add_random(store, 10)
+
+    assert store.delete_memory(ids[3])
+    assert not store.delete_memory(ids[3])
+    assert store.delete_memories([ids[4], ids[4], 999]) == 1
+
+    stats = store.get_index_stats()
+    assert stats["ntotal"] == 10
+    assert stats["tombstones"] == 2
+    assert store.count_memories() == 8
+    assert store.get_memory_by_id(ids[3]) is None
+    assert not {ids[3], ids[4]} & {memory["id"] for memory in store.search(vectors[3], k=10)}
+    store.close()
+
+
+def test_tombstones_survive_a_restart(tmp_path):
+    store = VectorStore(str(tmp_path), compaction_ratio=1.0)
+    ids, vectors = add_random(store, 10)
+    store.delete_memories(ids[:2])
+    store.close()
+
+    reopened = VectorStore(str(tmp_path), compaction_ratio=1.0)
+    assert reopened.get_index_stats()["tombstones"] == 2
+    assert reopened.count_memories() == 8
+    assert reopened.search(vectors[0], k=1)[0]["id"] != ids[0]
+    reopened.close()
+
+
+def test_compaction_removes_tombstoned_vectors(tmp_path):
+    store = VectorStore(str(tmp_path), compaction_ratio=1.0)
+    ids, vectors = add_random(store, 10)
+    store.delete_memories(ids[:3])
+
+    assert store.compact() == 3
+    assert store.compact() == 0
+
+    stats = store.get_index_stats()
+    assert stats["ntotal"] == 7
+    assert stats["tombstones"] == 0
+    assert store.search(vectors[5], k=1)[0]["id"] == ids[5]
+    store.close()
+
+
+def test_compaction_starts_in_background_past_the_ratio(tmp_path):
+    store = VectorStore(str(tmp_path), compaction_ratio=0.25)
+    ids, _ = add_random(store, 8)
+
+    store.delete_memory(ids[0])
+    store.wait_for_maintenance()
+    assert store.get_index_stats()["tombstones"] == 1
+
+    store.delete_memory(ids[1])
+    store.wait_for_maintenance()
+    stats = store.get_index_stats()
+    assert stats["tombstones"] == 0
+    assert stats["ntotal"] == 6
+    store.close()
@@ -0,0 +1,110 @@
+"""
+Tests for the write-ahead log and recovery of the vector store from it,
+including a crash between saving a checkpoint and truncating the log.
+"""
+import shutil
+
+import numpy as np
+
+from dreamos.memory.vector_store import VectorStore
+from dreamos.memory.wal import WriteAheadLog, encode_vector, decode_vector
+
+DIM = 768
+
+
+def random_vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+def crash_copy(tmp_path):
+    """Copy the store files as they are on disk, as if the process had died."""
+    crashed = tmp_path / "crashed"
+    shutil.copytree(tmp_path / "store", crashed, ignore=shutil.ignore_patterns("*.lock"))
+    return str(crashed)
+
+
+def test_vectors_round_trip():
+    vector = random_vectors(1)[0]
+    assert np.array_equal(decode_vector(encode_vector(vector)), vector)
+
+
+def test_torn_final_record_is_dropped(tmp_path):
+    path = str(tmp_path / "wal.log")
+    wal = WriteAheadLog(path, fsync=False)
+    wal.append_many([{"op": "delete", "id": 1}, {"op": "delete", "id": 2}])
+    wal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op":"delete","i')
+
+    reopened = WriteAheadLog(path, fsync=False)
+    assert [record["id"] for record in reopened.replay()] == [1, 2]
+    assert reopened.entries == 2
+
+    # Later appends start on a clean line
+    reopened.append({"op": "delete", "id": 3})
+    assert [record["id"] for record in WriteAheadLog(path).replay()] == [1, 2, 3]
+    reopened.close()
+
+
+def test_logged_writes_survive_a_crash(tmp_path):
+    store = VectorStore(str(tmp_path / "store"))
+    vectors = random_vectors(5)
+    ids = store.add_memories([f"memory {i}" for i in range(5)], vectors)
+    store.delete_memory(ids[2])
+
+    crashed = crash_copy(tmp_path)
+    store.close()
+
+    recovered = VectorStore(crashed)
+    assert recovered.count_memories() == 4
+    assert recovered.get_memory_by_id(ids[2]) is None
+    assert recovered.search(vectors[4], k=1)[0]["id"] == ids[4]
+    recovered.close()
+
+
+def test_replay_after_checkpoint_without_truncate_is_idempotent(tmp_path, monkeypatch):
+    store = VectorStore(str(tmp_path / "store"), compaction_ratio=1.0)
+    vectors = random_vectors(5)
+    ids = store.add_memories([f"memory {i}" for i in range(5)], vectors)
+    store.delete_memory(ids[2])
+
+    # The index is saved but the process dies before the log is truncated
+    monkeypatch.setattr(store.wal, "truncate", lambda: None)
+    store.checkpoint()
+    crashed = crash_copy(tmp_path)
+    monkeypatch.undo()
+    store.close()
+
+    recovered = VectorStore(crashed)
+    stats = recovered.get_index_stats()
+    assert stats["ntotal"] == 5
+    assert stats["tombstones"] == 1
+    assert recovered.count_memories() == 4
+
+    results = recovered.search(vectors[0], k=5)
+    result_ids = [memory["id"] for memory in results]
+    assert len(result_ids) == len(set(result_ids)) == 4
+    assert ids[2] not in result_ids
+    recovered.close()
+
+
+def test_replay_after_compaction_without_truncate_is_idempotent(tmp_path, monkeypatch):
+    store = VectorStore(str(tmp_path / "store"), compaction_ratio=1.0)
+    vectors = random_vectors(5)
+    ids = store.add_memories([f"memory {i}" for i in range(5)], vectors)
+    store.delete_memory(ids[2])
+
+    monkeypatch.setattr(store.wal, "truncate", lambda: None)
+    assert store.compact() == 1
+    crashed = crash_copy(tmp_path)
+    monkeypatch.undo()
+    store.close()
+
+    # The compacted memory is neither re-added nor counted as a tombstone
+    recovered = VectorStore(crashed)
+    stats = recovered.get_index_stats()
+    assert stats["ntotal"] == 4
+    assert stats["tombstones"] == 0
+    assert recovered.count_memories() == 4
+    assert ids[2] not in {memory["id"] for memory in recovered.search(vectors[2], k=5)}
+    recovered.close()